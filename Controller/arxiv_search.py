@@ -193,9 +193,9 @@ def run():
 
     logger.info("Timezone: %s", tzinfo)
     logger.info("Window  : %s -> %s", window_start.strftime("%Y-%m-%d %H:%M:%S %Z"), window_end.strftime("%Y-%m-%d %H:%M:%S %Z"))
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     out_filename = now_local.strftime(FILENAME_FMT)
-    out_path = os.path.join(OUTPUT_DIR, out_filename)
+    out_path = OUTPUT_DIR / out_filename
     logger.info("Output  : %s", out_path)
     logger.info("min-score: %d", args.min_score)
     logger.info("Proxy from env enabled: %s", args.use_proxy)
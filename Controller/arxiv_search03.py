@@ -387,12 +387,12 @@ def run():
 
     out_path = args.out.strip()
     if not out_path:
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
         if used_anchor_window and anchor_date_for_name is not None:
             out_filename = anchor_date_for_name.strftime(FILENAME_FMT)
         else:
             out_filename = datetime.now(timezone.utc).strftime(FILENAME_FMT)
-        out_path = os.path.join(OUTPUT_DIR, out_filename)
+        out_path = OUTPUT_DIR / out_filename
 
     os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
     with open(out_path, "w", encoding="utf-8") as f:
@@ -3,7 +3,6 @@
 
 import argparse
 import logging
-import json
 import re
 import time
 import traceback
@@ -15,6 +14,13 @@ import requests
 import feedparser
 import os
 import sys
+
+# 可选：lxml.iterparse 边下载边解析 Atom，逐条 entry 产出后立即释放，不再先物化整页文档；
+# 未安装时退回 feedparser
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # pragma: no cover
+    lxml_etree = None
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 try:
     if hasattr(sys.stdout, "reconfigure"):
@@ -39,6 +45,7 @@ from config.config import (
     PROGRESS_SINGLE_LINE,
 )
 from Controller.http_session import build_session
+from Controller.json_io import write_json
 
 try:
     from zoneinfo import ZoneInfo  # py3.9+
@@ -267,14 +274,57 @@ def build_search_query(
     return " AND ".join(clauses)
 
 
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_OPENSEARCH_TOTAL = "{http://a9.com/-/spec/opensearch/1.1/}totalResults"
+
+
+def parse_atom_stream(stream) -> feedparser.FeedParserDict:
+    """
+    用 lxml.iterparse 流式解析 arXiv Atom 响应，只取下游用到的字段
+    （id/title/summary/published/authors 与 totalResults），返回与 feedparser 结果同形的对象。
+    每个 entry 处理完即 clear 并删掉已处理的兄弟节点，整页常驻内存只有一条 entry。
+    """
+    entries = []
+    total = None
+    for _event, elem in lxml_etree.iterparse(stream, events=("end",), tag=(f"{_ATOM}entry", _OPENSEARCH_TOTAL)):
+        if elem.tag == _OPENSEARCH_TOTAL:
+            total = (elem.text or "").strip()
+            continue
+        entry = feedparser.FeedParserDict(
+            id=elem.findtext(f"{_ATOM}id") or "",
+            title=elem.findtext(f"{_ATOM}title") or "",
+            summary=elem.findtext(f"{_ATOM}summary") or "",
+            authors=[
+                {"name": a.findtext(f"{_ATOM}name") or ""}
+                for a in elem.iterfind(f"{_ATOM}author")
+            ],
+        )
+        published = elem.findtext(f"{_ATOM}published")
+        if published:
+            entry["published"] = published.strip()
+        entries.append(entry)
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+    feed_meta = feedparser.FeedParserDict()
+    if total is not None:
+        feed_meta["opensearch_totalresults"] = total
+    return feedparser.FeedParserDict(entries=entries, feed=feed_meta)
+
+
 def fetch_page_with_retry(session: requests.Session, params: dict, logger, retries: int = 5):
     backoff = 1.0
     last_exc = None
     for attempt in range(1, retries + 1):
         try:
-            r = session.get(ARXIV_API, params=params, timeout=60)
-            r.raise_for_status()
-            return feedparser.parse(r.text)
+            if lxml_etree is None:
+                r = session.get(ARXIV_API, params=params, timeout=60)
+                r.raise_for_status()
+                return feedparser.parse(r.text)
+            with session.get(ARXIV_API, params=params, timeout=60, stream=True) as r:
+                r.raise_for_status()
+                r.raw.decode_content = True  # 由 urllib3 解 gzip
+                return parse_atom_stream(r.raw)
         except Exception as e:
             last_exc = e
             logger.warning("Request failed (attempt %d/%d): %s", attempt, retries, repr(e))
@@ -284,6 +334,15 @@ def fetch_page_with_retry(session: requests.Session, params: dict, logger, retri
     raise last_exc
 
 
+def feed_total_results(feed) -> Optional[int]:
+    """Atom 响应里的 opensearch:totalResults；缺失或无法解析时返回 None。"""
+    raw = (getattr(feed, "feed", None) or {}).get("opensearch_totalresults")
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        return None
+
+
 @dataclass
 class Paper:
     title: str
@@ -373,6 +432,7 @@ def run():
     page_size = max(1, min(args.page_size, 2000))
     candidates = 0
     pages = 0
+    next_request_at = 0.0
     print("============开始获取初始可下载列表==============", flush=True)
 
     while len(results) < args.max_papers:
@@ -392,6 +452,12 @@ def run():
             "sortBy": "submittedDate",
             "sortOrder": "descending",
         }
+        # arXiv 要求两次请求间隔 >= sleep 秒：从上一次发请求时开始计时，
+        # 解析上一页的耗时计入间隔内，不再叠加在 sleep 之上
+        wait = next_request_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        next_request_at = time.monotonic() + float(args.sleep)
         feed = fetch_page_with_retry(session, params, logger, retries=int(args.retries))
 
         if not feed.entries:
@@ -425,7 +491,11 @@ def run():
                     break
 
         start_idx += page_size
-        time.sleep(args.sleep)
+        total_results = feed_total_results(feed)
+        if total_results and start_idx >= total_results:
+            # 已取完全部结果，不必再等一个间隔去拿一页空结果
+            logger.info("Reached end of results (total=%d); stopping.", total_results)
+            break
 
     print()
     print("============结束获取初始可下载列表==============", flush=True)
@@ -433,24 +503,24 @@ def run():
 
     out_path = args.out.strip()
     if not out_path:
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
         if used_anchor_window and anchor_date_for_name is not None:
             out_filename = anchor_date_for_name.strftime(FILENAME_FMT)
         else:
             out_filename = datetime.now(timezone.utc).strftime(FILENAME_FMT)
-        out_path = os.path.join(OUTPUT_DIR, out_filename)
+        out_path = OUTPUT_DIR / out_filename
 
     out_json_path = args.out_json.strip()
     if not out_json_path:
         if args.out.strip():
             out_json_path = os.path.splitext(out_path)[0] + ".json"
         else:
-            os.makedirs(ARXIV_JSON_DIR, exist_ok=True)
+            ARXIV_JSON_DIR.mkdir(parents=True, exist_ok=True)
             if used_anchor_window and anchor_date_for_name is not None:
                 out_json_name = anchor_date_for_name.strftime(JSON_FILENAME_FMT)
             else:
                 out_json_name = datetime.now(timezone.utc).strftime(JSON_FILENAME_FMT)
-            out_json_path = os.path.join(ARXIV_JSON_DIR, out_json_name)
+            out_json_path = ARXIV_JSON_DIR / out_json_name
 
     os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
     with open(out_path, "w", encoding="utf-8") as f:
@@ -506,8 +576,7 @@ def run():
             for p in results
         ],
     }
-    with open(out_json_path, "w", encoding="utf-8") as f:
-        json.dump(json_payload, f, ensure_ascii=False, indent=2)
+    write_json(out_json_path, json_payload)
 
     logger.info("Candidates in window: %d", candidates)
     logger.info("Selected papers     : %d", len(results))
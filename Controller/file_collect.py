@@ -116,7 +116,7 @@ def run() -> None:
     select_image_dir, _ = select_date_dir(select_image_root, date_str)
 
     # 输出根目录
-    out_root = Path(FILE_COLLECT_DIR) / date_str
+    out_root = FILE_COLLECT_DIR / date_str
     out_root.mkdir(parents=True, exist_ok=True)
 
     # 查找所有 PDF 文件
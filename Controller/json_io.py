@@ -0,0 +1,30 @@
+import json
+import os
+from typing import Any, Union
+
+# 可选加速：orjson 直接输出 UTF-8 bytes，比标准库 json 快数倍（中文内容尤甚），省掉 str -> UTF-8 的再编码；
+# 未安装时退回 json，输出内容一致（非 ASCII 原样保留，缩进 2 空格）
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """编码为 2 空格缩进的 UTF-8 JSON bytes，格式同 json.dumps(obj, ensure_ascii=False, indent=2)。"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def dumps_line(obj: Any) -> bytes:
+    """把一条 JSONL 记录编码为以换行结尾的紧凑 UTF-8 bytes。"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def write_json(path: Union[str, os.PathLike], obj: Any) -> None:
+    """一次 write 写出整个 JSON 文件（manifest、结果列表等）。"""
+    with open(path, "wb") as f:
+        f.write(dumps_bytes(obj))
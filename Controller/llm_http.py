@@ -0,0 +1,26 @@
+from typing import Optional
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+
+    _HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    _HTTP2_AVAILABLE = False
+
+from config.config import dashscope_http2
+
+
+def dashscope_http_client(workers: int = 8, timeout: Optional[httpx.Timeout] = None) -> httpx.AsyncClient:
+    """
+    给 AsyncOpenAI 用的 httpx 客户端：连接池按并发度放大，避免高并发时反复建连/TLS 握手；
+    装了 h2 且 dashscope_http2 打开时走 HTTP/2，同一主机的并发请求在少量连接上多路复用。
+    客户端绑定创建它的事件循环，每个步骤（一次 asyncio.run）各建一个。
+    """
+    transport = httpx.AsyncHTTPTransport(retries=2, http2=bool(dashscope_http2) and _HTTP2_AVAILABLE)
+    return httpx.AsyncClient(
+        transport=transport,
+        limits=httpx.Limits(max_keepalive_connections=max(64, workers * 2), max_connections=max(100, workers * 4)),
+        timeout=timeout or httpx.Timeout(600.0, connect=10.0),
+    )
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from config.config import dashscope_rpm_limit, dashscope_tpm_limit
+
+
+class RateLimiter:
+    """
+    RPM/TPM 双令牌桶（思路同 openai-cookbook 的 api_request_parallel_processor）：
+    按流逝时间回填请求数与 token 额度，额度不足时 sleep 到够用为止，
+    让并发请求贴着限额匀速发出，而不是撞 429 后集体重试。limit<=0 表示不限。
+    """
+
+    def __init__(self, rpm: int, tpm: int) -> None:
+        self.rpm = max(0, int(rpm or 0))
+        self.tpm = max(0, int(tpm or 0))
+        self.request_capacity = float(self.rpm)
+        self.token_capacity = float(self.tpm)
+        self.last = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        # 单个请求的预估超过整桶容量时按整桶计，避免永远等不到
+        tokens = min(int(tokens), self.tpm) if self.tpm else 0
+        while True:
+            async with self.lock:
+                now = time.monotonic()
+                elapsed = now - self.last
+                self.last = now
+                if self.rpm:
+                    self.request_capacity = min(self.rpm, self.request_capacity + self.rpm * elapsed / 60.0)
+                if self.tpm:
+                    self.token_capacity = min(self.tpm, self.token_capacity + self.tpm * elapsed / 60.0)
+                wait = 0.0
+                if self.rpm and self.request_capacity < 1:
+                    wait = (1 - self.request_capacity) * 60.0 / self.rpm
+                if self.tpm and self.token_capacity < tokens:
+                    wait = max(wait, (tokens - self.token_capacity) * 60.0 / self.tpm)
+                if wait <= 0:
+                    if self.rpm:
+                        self.request_capacity -= 1
+                    if self.tpm:
+                        self.token_capacity -= tokens
+                    return
+            await asyncio.sleep(wait)
+
+
+def estimate_tokens(*texts: str, max_tokens: int = 0) -> int:
+    """
+    限速用的粗略 token 预估：UTF-8 字节数 / 4（中英文混排时与 Qwen 分词大致相当），
+    再加上本次请求的输出上限；只用于占用额度，不需要精确。
+    """
+    return sum(len(t.encode("utf-8", errors="ignore")) for t in texts if t) // 4 + int(max_tokens or 0)
+
+
+def dashscope_limiter() -> RateLimiter:
+    """按 config 中 DashScope 账号级 RPM/TPM 建一个限速器；需在事件循环内创建，每次 asyncio.run 各建一个。"""
+    return RateLimiter(dashscope_rpm_limit, dashscope_tpm_limit)
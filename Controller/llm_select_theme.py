@@ -1,19 +1,18 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import json
 import logging
 import os
 import re
 import sys
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 
-from openai import OpenAI
+from openai import AsyncOpenAI, BadRequestError
 
 ROOT = Path(os.path.dirname(os.path.dirname(__file__)))
 sys.path.insert(0, str(ROOT))
@@ -26,9 +25,16 @@ from config.config import (  # noqa: E402
     theme_select_max_tokens,
     theme_select_temperature,
     theme_select_concurrency,
+    theme_select_batch_size,
     theme_select_system_prompt,
+    theme_select_batch_system_prompt,
     PAPER_DEDUP_DIR,
 )
+from Controller.llm_http import dashscope_http_client  # noqa: E402
+from Controller.llm_rate_limit import RateLimiter, dashscope_limiter, estimate_tokens  # noqa: E402
+
+# 发请求前按预估 token 占用 DashScope 限速额度；由 score_all 在事件循环内创建
+_RATE_LIMITER: Optional[RateLimiter] = None
 
 
 def setup_logging() -> logging.Logger:
@@ -91,12 +97,12 @@ class PaperRecord:
     arxiv_id: str
 
 
-def make_client() -> OpenAI:
+def make_client() -> AsyncOpenAI:
     key = (qwen_api_key or "").strip()
     if not key:
         raise SystemExit("qwen_api_key missing in config.config")
     base = (theme_select_base_url or "").strip() or "https://dashscope.aliyuncs.com/compatible-mode/v1"
-    return OpenAI(api_key=key, base_url=base)
+    return AsyncOpenAI(api_key=key, base_url=base, http_client=dashscope_http_client(int(theme_select_concurrency or 8)))
 
 
 def build_user_prompt(title: str, abstract: str) -> str:
@@ -122,14 +128,17 @@ def parse_score(text: str) -> float:
     return val
 
 
-def score_one(client: OpenAI, block: PaperRecord) -> float:
+async def score_one(client: AsyncOpenAI, block: PaperRecord) -> float:
     user_content = build_user_prompt(block.title, block.abstract)
     kwargs = {}
     if theme_select_temperature is not None:
         kwargs["temperature"] = float(theme_select_temperature)
     if theme_select_max_tokens is not None:
         kwargs["max_tokens"] = int(theme_select_max_tokens)
-    resp = client.chat.completions.create(
+    if _RATE_LIMITER is not None:
+        est = estimate_tokens(theme_select_system_prompt, user_content, max_tokens=kwargs.get("max_tokens", 0))
+        await _RATE_LIMITER.acquire(est)
+    resp = await client.chat.completions.create(
         model=theme_select_model,
         messages=[
             {"role": "system", "content": theme_select_system_prompt},
@@ -142,12 +151,148 @@ def score_one(client: OpenAI, block: PaperRecord) -> float:
     return parse_score(content)
 
 
+def parse_json_reply(text: str) -> Any:
+    raw = (text or "").strip()
+    if raw.startswith("```"):
+        raw = raw.strip("`").strip()
+        if raw.lower().startswith("json"):
+            raw = raw[4:]
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def batch_scores_from_reply(obj: Any, size: int) -> Dict[int, float]:
+    """
+    从批量评分回复中取出 {下标: 分数}。除约定的 {编号: 分数} 外，也接受模型常见的变体：
+    包一层的 {"scores": {...}} / {"scores": [...]}，以及直接给出的分数数组。
+    数组只有长度恰为 size 时才按顺序对应，长度不符说明顺序不可信，整批交给逐篇回退。
+    """
+    if isinstance(obj, dict) and len(obj) == 1:
+        inner = next(iter(obj.values()))
+        if isinstance(inner, (dict, list)):
+            obj = inner
+    if isinstance(obj, list):
+        if len(obj) != size:
+            return {}
+        obj = {str(i): v for i, v in enumerate(obj)}
+    if not isinstance(obj, dict):
+        return {}
+    scores: Dict[int, float] = {}
+    for key, value in obj.items():
+        if not str(key).isdigit() or int(key) >= size:
+            continue
+        if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+            scores[int(key)] = parse_score(str(value))
+    return scores
+
+
+async def score_batch(client: AsyncOpenAI, chunk: List[PaperRecord]) -> Dict[int, float]:
+    """
+    一次请求给多篇论文评分：输入 {编号: {title, abstract}} 的 JSON，要求按 JSON 返回 {编号: 分数}。
+    系统提示词只预填充一次，请求数降为 1/len(chunk)。返回成功解析出的 {下标: 分数}，
+    缺失或解析失败的论文由调用方逐篇回退到 score_one。
+    """
+    sys_prompt = (theme_select_batch_system_prompt or "").strip()
+    if not sys_prompt:
+        return {}
+    user_content = json.dumps(
+        {str(i): {"title": blk.title, "abstract": blk.abstract or "无"} for i, blk in enumerate(chunk)},
+        ensure_ascii=False,
+    )
+    kwargs: Dict[str, Any] = {"response_format": {"type": "json_object"}}
+    if theme_select_temperature is not None:
+        kwargs["temperature"] = float(theme_select_temperature)
+    # 单篇回复的 token 上限按篇数放大
+    kwargs["max_tokens"] = int(theme_select_max_tokens or 16) * len(chunk)
+    if _RATE_LIMITER is not None:
+        await _RATE_LIMITER.acquire(estimate_tokens(sys_prompt, user_content, max_tokens=kwargs["max_tokens"]))
+    try:
+        resp = await client.chat.completions.create(
+            model=theme_select_model,
+            messages=[
+                {"role": "system", "content": sys_prompt},
+                {"role": "user", "content": user_content},
+            ],
+            stream=False,
+            **kwargs,
+        )
+    except BadRequestError:
+        # 服务端不支持 JSON 模式等情况
+        return {}
+    content = resp.choices[0].message.content if resp.choices else ""
+    return batch_scores_from_reply(parse_json_reply(content), len(chunk))
+
+
+async def score_all(
+    client: AsyncOpenAI,
+    records: List[PaperRecord],
+    workers: int,
+    logger: logging.Logger,
+    batch_size: int = 1,
+) -> Dict[str, float]:
+    """
+    评分请求都是十几个 token 的短回复，耗时几乎全在网络往返上：
+    按 batch_size 篇打包成一个请求，用协程 + Semaphore(workers) 控制在途请求数。
+    批量结果里缺失的论文再逐篇补评。
+    """
+    global _RATE_LIMITER
+    _RATE_LIMITER = dashscope_limiter()
+    sem = asyncio.Semaphore(workers)
+    Scored = Tuple[List[Tuple[PaperRecord, float]], List[PaperRecord]]
+
+    async def guarded_one(blk: PaperRecord) -> Scored:
+        async with sem:
+            try:
+                return [(blk, await score_one(client, blk))], []
+            except Exception as exc:
+                logger.warning("Score failed for %s: %r", blk.title, exc)
+                return [(blk, 0.0)], []
+
+    async def guarded_batch(chunk: List[PaperRecord]) -> Scored:
+        async with sem:
+            try:
+                got = await score_batch(client, chunk)
+            except Exception as exc:
+                logger.warning("Batch score failed for %d paper(s): %r", len(chunk), exc)
+                got = {}
+        scored = [(blk, got[i]) for i, blk in enumerate(chunk) if i in got]
+        missing = [blk for i, blk in enumerate(chunk) if i not in got]
+        return scored, missing
+
+    size = max(1, int(batch_size or 1))
+    if size == 1:
+        pending = {asyncio.ensure_future(guarded_one(blk)) for blk in records}
+    else:
+        pending = {asyncio.ensure_future(guarded_batch(records[i:i + size])) for i in range(0, len(records), size)}
+
+    scores: Dict[str, float] = {}
+    total = len(records)
+    done = 0
+    try:
+        while pending:
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in finished:
+                scored, missing = fut.result()
+                for blk, score in scored:
+                    scores[blk.arxiv_id or blk.title] = score
+                    done += 1
+                    sys.stdout.write(f"\r[PROGRESS] scoring {done}/{total}")
+                    sys.stdout.flush()
+                pending |= {asyncio.ensure_future(guarded_one(blk)) for blk in missing}
+    finally:
+        await client.close()
+    return scores
+
+
 def run() -> None:
     logger = setup_logging()
     print("============开始主题相关性评分==============", flush=True)
     ap = argparse.ArgumentParser("llm_select_theme")
     ap.add_argument("--json", default=None, help="input json from paperList_remove_duplications")
     ap.add_argument("--outdir", default=None, help="output dir (default data/llm_select_theme)")
+    ap.add_argument("--batch-size", type=int, default=theme_select_batch_size, help="papers scored per request")
     args = ap.parse_args()
 
     input_dir = ROOT / PAPER_DEDUP_DIR
@@ -171,24 +316,10 @@ def run() -> None:
     client = make_client()
     scores: Dict[str, float] = {}
     workers = max(1, int(theme_select_concurrency or 1))
-    logger.info("Scoring %d paper(s) with %d worker(s)", len(records), workers)
+    batch_size = max(1, int(args.batch_size or 1))
+    logger.info("Scoring %d paper(s) with %d worker(s), batch size %d", len(records), workers, batch_size)
 
-    total = len(records)
-    done = 0
-    with ThreadPoolExecutor(max_workers=workers) as pool:
-        future_map = {pool.submit(score_one, client, blk): blk for blk in records}
-        for future in as_completed(future_map):
-            blk = future_map[future]
-            try:
-                score = future.result()
-            except Exception as exc:
-                logger.warning("Score failed for %s: %r", blk.title, exc)
-                score = 0.0
-            scores[blk.arxiv_id or blk.title] = score
-            done += 1
-            sys.stdout.write(f"\r[PROGRESS] scoring {done}/{total}")
-            sys.stdout.flush()
-            time.sleep(0.05)
+    scores.update(asyncio.run(score_all(client, records, workers, logger, batch_size)))
     print()
 
     for p in papers:
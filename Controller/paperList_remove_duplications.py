@@ -4,6 +4,7 @@ import argparse
 import json
 import os
 import re
+import sqlite3
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
@@ -12,9 +13,10 @@ from typing import List, Dict, Any, Tuple
 
 ROOT = Path(os.path.dirname(os.path.dirname(__file__)))
 sys.path.insert(0, str(ROOT))
-from config.config import DATA_ROOT, ARXIV_JSON_DIR, PAPER_DEDUP_DIR, JSON_FILENAME_FMT  # noqa: E402
+from config.config import DATA_ROOT, ARXIV_JSON_DIR, PAPER_DEDUP_DIR, DEDUP_DB, JSON_FILENAME_FMT  # noqa: E402
 
 CONFIG_PATH = ROOT / "config" / "paperList.json"
+DEDUP_DB_PATH = ROOT / DEDUP_DB
 DATA_DIR = ROOT / DATA_ROOT
 ARXIV_LIST_DIR = DATA_DIR / "arxivList" / "md"
 ARXIV_JSON_ROOT = ROOT / ARXIV_JSON_DIR
@@ -36,14 +38,32 @@ def load_existing() -> List[Dict[str, Any]]:
     return []
 
 
-def build_seen_keys(items: List[Dict[str, Any]]) -> set:
-    seen = set()
-    for item in items:
-        title = str(item.get("title", "")).strip()
-        source = str(item.get("source", "")).strip()
-        if title or source:
-            seen.add((title, source))
-    return seen
+def open_seen_db(path: Path = DEDUP_DB_PATH) -> sqlite3.Connection:
+    """
+    打开已处理论文集合。查重与登记都是主键上的 O(log N) 操作，
+    不再每次运行都整体读入并重写 config/paperList.json。
+    表为空且存在旧 paperList.json 时，一次性导入历史记录。
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS seen ("
+        "source TEXT NOT NULL, title TEXT NOT NULL, writing_datetime TEXT, "
+        "PRIMARY KEY (source, title)) WITHOUT ROWID"
+    )
+    if conn.execute("SELECT 1 FROM seen LIMIT 1").fetchone() is None:
+        rows = []
+        for item in load_existing():
+            title = str(item.get("title", "")).strip()
+            source = str(item.get("source", "")).strip()
+            if title or source:
+                rows.append((source, title, str(item.get("writing_datetime", ""))))
+        if rows:
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?, ?)", rows)
+    return conn
 
 
 def find_latest_md(explicit: str | None = None) -> Path:
@@ -134,16 +154,20 @@ def parse_md(md_path: Path) -> List[Dict[str, str]]:
     return result
 
 
-def filter_new_items(today_items: List[Dict[str, str]], seen: set) -> List[Dict[str, str]]:
+def filter_new_items(conn: sqlite3.Connection, today_items: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    逐条 INSERT OR IGNORE：插入成功即为新论文（同批内重复也会被挡掉）。
+    整批在一个事务内提交。
+    """
     new_items: List[Dict[str, str]] = []
-    for item in today_items:
-        title = str(item.get("title", "")).strip()
-        source = str(item.get("source", "")).strip()
-        key = (title, source)
-        if key in seen:
-            continue
-        new_items.append(item)
-        seen.add(key)
+    now = datetime.now(timezone.utc).isoformat()
+    with conn:
+        for item in today_items:
+            title = str(item.get("title", "")).strip()
+            source = str(item.get("source", "")).strip()
+            cur = conn.execute("INSERT OR IGNORE INTO seen VALUES (?, ?, ?)", (source, title, now))
+            if cur.rowcount == 1:
+                new_items.append(item)
     return new_items
 
 
@@ -152,21 +176,6 @@ def extract_date_from_name(name: str) -> str:
     return m.group(0) if m else datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
 
-def append_to_config(existing: List[Dict[str, Any]], new_items: List[Dict[str, str]]) -> None:
-    if not new_items:
-        return
-    now = datetime.now(timezone.utc).isoformat()
-    for item in new_items:
-        rec = {
-            "title": str(item.get("title", "")).strip(),
-            "source": str(item.get("source", "")).strip(),
-            "writing_datetime": now,
-        }
-        existing.append(rec)
-    CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    CONFIG_PATH.write_text(json.dumps(existing, ensure_ascii=False, indent=2), encoding="utf-8")
-
-
 def collect_blocks(lines: List[str]) -> List[Dict[str, Any]]:
     blocks: List[Dict[str, Any]] = []
     current_start = None
@@ -269,8 +278,6 @@ def run() -> None:
 
     json_path = find_latest_json(args.json if args.json else None)
     json_obj, papers = load_json_papers(json_path)
-    existing = load_existing()
-    seen = build_seen_keys(existing)
 
     today_items = []
     for p in papers:
@@ -278,8 +285,11 @@ def run() -> None:
         arxiv_id = str(p.get("arxiv_id", "")).strip()
         if title or arxiv_id:
             today_items.append({"title": title, "source": arxiv_id})
-    new_items = filter_new_items(today_items, seen)
-    append_to_config(existing, new_items)
+    conn = open_seen_db()
+    try:
+        new_items = filter_new_items(conn, today_items)
+    finally:
+        conn.close()
 
     keep_keys = {(it["title"], it["source"]) for it in new_items}
     kept_papers = []
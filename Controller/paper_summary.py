@@ -1,14 +1,23 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import functools
+import json
 import os
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
-from openai import OpenAI
+from openai import AsyncOpenAI
+
+# 可选：tiktoken 按真实 BPE 计数，中文约为 UTF-8 字节数的 1/3，长论文不再被过早截断；
+# 未安装或编码表无法加载（需联网下载一次）时退回字节数估算
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover
+    tiktoken = None
 
 import sys
 
@@ -22,14 +31,62 @@ from config.config import (
     summary_input_hard_limit,
     summary_input_safety_margin,
     summary_concurrency,
+    summary_gptgod_apikey,
+    summary_base_url_2,
+    summary_model_2,
+    summary_apikey_3,
+    summary_base_url_3,
+    summary_model_3,
+    summary_hedge_providers,
+    summary_hedge_delay_ms,
+    summary_stream,
     system_prompt,
+    summary_tokenizer_name,
+    summary_prefer_batch,
+    summary_batch_min_items,
+    summary_batch_poll_sec,
+    summary_batch_max_wait_sec,
+    summary_batch_base_url,
+    summary_batch_api_key,
+    summary_batch_completion_window,
+    summary_batch_endpoint,
+    summary_batch_out_root,
+    summary_batch_jsonl_root,
     DATA_ROOT,
 )
+from Controller.json_io import dumps_line  # noqa: E402
+from Controller.llm_http import dashscope_http_client  # noqa: E402
+from Controller.llm_rate_limit import RateLimiter, dashscope_limiter, estimate_tokens  # noqa: E402
+
+# 发请求前按预估 token 占用 DashScope 限速额度；由 summarize_all 在事件循环内创建
+_RATE_LIMITER: Optional[RateLimiter] = None
+# 对冲用的备用服务商 (名称, 客户端, 模型)，按补发顺序排列；由 summarize_all 设置，为空即不对冲
+_HEDGE_ROUTES: List[Tuple[str, AsyncOpenAI, str]] = []
+_HEDGE_DELAY_SEC = 0.0
+
+# 备用服务商名 -> (api_key, base_url, model)
+_HEDGE_PROVIDERS = {
+    "claude": (summary_gptgod_apikey, summary_base_url_2, summary_model_2),
+    "vectorengine": (summary_apikey_3, summary_base_url_3, summary_model_3),
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _token_encoder():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(summary_tokenizer_name)
+    except Exception:
+        return None
 
 
 def approx_input_tokens(text: str) -> int:
     if not text:
         return 0
+    enc = _token_encoder()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
     return len(text.encode("utf-8", errors="ignore"))
 
 
@@ -37,12 +94,26 @@ def crop_to_input_tokens(text: str, limit_tokens: int) -> str:
     budget = int(limit_tokens)
     if budget <= 0:
         return ""
+    # 每个 BPE token 至少覆盖 1 个字节，字节数不超预算时 token 数必然也不超，无需分词
     b = text.encode("utf-8", errors="ignore")
     if len(b) <= budget:
         return text
+    enc = _token_encoder()
+    if enc is not None:
+        # 只编码一次，按 token 切开后解码，末尾被截断的半个字符直接丢弃
+        tokens = enc.encode(text, disallowed_special=())
+        if len(tokens) <= budget:
+            return text
+        return enc.decode_bytes(tokens[:budget]).decode("utf-8", errors="ignore")
     return b[:budget].decode("utf-8", errors="ignore")
 
 
+@functools.lru_cache(maxsize=32)
+def prompt_tokens(prompt: str) -> int:
+    """系统提示词来自 config 常量（或其固定组合），token 数按字符串缓存，只在首次用到时编码一次。"""
+    return approx_input_tokens(prompt)
+
+
 def list_md_files(root: Path) -> List[Path]:
     return sorted(root.rglob("*.md"))
 
@@ -72,53 +143,146 @@ def write_gather(single_dir: Path, gather_dir: Path, date_str: str) -> Path:
     return gather_path
 
 
-def make_client() -> OpenAI:
+def make_client() -> AsyncOpenAI:
     key = (qwen_api_key or "").strip()
     if not key:
         raise SystemExit("qwen_api_key missing in config.config")
     base = (summary_base_url or "").strip()
     if not base:
         raise SystemExit("summary_base_url missing in config.config")
-    return OpenAI(api_key=key, base_url=base)
+    return AsyncOpenAI(api_key=key, base_url=base, http_client=dashscope_http_client(int(summary_concurrency or 8)))
 
 
-def summarize_one(client: OpenAI, md_path: Path) -> Tuple[Path, str]:
-    md_text = md_path.read_text(encoding="utf-8", errors="ignore")
-    if not md_text.strip():
-        return md_path, ""
-    sys_prompt = system_prompt
-    user_content = md_text
+def make_hedge_routes() -> List[Tuple[str, AsyncOpenAI, str]]:
+    routes: List[Tuple[str, AsyncOpenAI, str]] = []
+    for name in summary_hedge_providers or []:
+        if name == "qwen" or name not in _HEDGE_PROVIDERS:
+            continue
+        key, base, model = (str(v or "").strip() for v in _HEDGE_PROVIDERS[name])
+        if key and base and model:
+            routes.append((name, AsyncOpenAI(api_key=key, base_url=base), model))
+    return routes
+
+
+def crop_user_content(sys_prompt: str, md_text: str) -> str:
     hard_limit = int(summary_input_hard_limit)
     safety_margin = int(summary_input_safety_margin)
     limit_total = hard_limit - safety_margin
-    sys_tokens = approx_input_tokens(sys_prompt)
+    sys_tokens = prompt_tokens(sys_prompt)
     user_budget = max(1, limit_total - sys_tokens)
-    user_content = crop_to_input_tokens(user_content, user_budget)
+    return crop_to_input_tokens(md_text, user_budget)
+
+
+def finalize_summary(md_path: Path, content: str) -> str:
+    lines = content.splitlines()
+    for i, line in enumerate(lines):
+        if line.strip().startswith("🌐来源"):
+            arxiv_id = md_path.stem
+            lines[i] = f"🌐来源：arXiv,{arxiv_id}"
+            break
+    return normalize_summary_format("\n".join(lines))
+
+
+async def acquire_qwen_budget(messages: List[dict], kwargs: Dict[str, Any]) -> None:
+    # 只有 DashScope（qwen）这一路占用 _RATE_LIMITER 额度
+    if _RATE_LIMITER is not None:
+        est = estimate_tokens(*(m["content"] for m in messages), max_tokens=kwargs.get("max_tokens", 0))
+        await _RATE_LIMITER.acquire(est)
+
+
+async def complete_text(
+    client: AsyncOpenAI,
+    model: str,
+    messages: List[dict],
+    kwargs: Dict[str, Any],
+    limited: bool,
+    started: Optional[asyncio.Event] = None,
+) -> str:
+    """
+    summary_stream 打开时流式接收，收到第一段内容即 set started，供对冲判断该路是否仍在正常生成。
+    """
+    if limited:
+        await acquire_qwen_budget(messages, kwargs)
+    if not summary_stream:
+        resp = await client.chat.completions.create(model=model, messages=messages, stream=False, **kwargs)
+        return (resp.choices[0].message.content if resp.choices else "") or ""
+    parts: List[str] = []
+    stream = await client.chat.completions.create(model=model, messages=messages, stream=True, **kwargs)
+    async with stream:
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                if started is not None:
+                    started.set()
+    return "".join(parts)
+
+
+async def hedged_complete(client: AsyncOpenAI, messages: List[dict], kwargs: Dict[str, Any]) -> str:
+    """
+    先发 qwen 主请求；每隔 _HEDGE_DELAY_SEC 仍无可用结果（或已有请求失败/返回空）就补发下一家备用服务商。
+    流式时，在途请求只要已开始输出 token 就继续等它，不再补发。
+    返回最先到达的非空结果并取消其余在途请求；全部失败时抛出最后一个异常。
+    """
+    # 先拿到 qwen 的限速额度再开始计时：在客户端限速器上排队不算“请求慢”，不应触发对冲
+    await acquire_qwen_budget(messages, kwargs)
+    waiting = [(client, summary_model)] + [(c, m) for _, c, m in _HEDGE_ROUTES]
+    pending: set = set()
+    started: Dict[asyncio.Task, asyncio.Event] = {}
+    last_exc: Optional[BaseException] = None
+    launch = True
+    try:
+        while waiting or pending:
+            if launch and waiting:
+                c, m = waiting.pop(0)
+                ev = asyncio.Event()
+                t = asyncio.create_task(complete_text(c, m, messages, kwargs, False, ev))
+                started[t] = ev
+                pending.add(t)
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=_HEDGE_DELAY_SEC if waiting else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for t in done:
+                if t.exception() is not None:
+                    last_exc = t.exception()
+                elif t.result():
+                    return t.result()
+            launch = bool(done) or not any(started[t].is_set() for t in pending)
+    finally:
+        for t in pending:
+            t.cancel()
+        if pending:
+            # 等被取消的请求真正收尾（关闭连接），不把未回收的任务留在事件循环里
+            await asyncio.gather(*pending, return_exceptions=True)
+    if last_exc is not None:
+        raise last_exc
+    return ""
+
+
+async def summarize_one(client: AsyncOpenAI, md_path: Path) -> Tuple[Path, str]:
+    md_text = md_path.read_text(encoding="utf-8", errors="ignore")
+    if not md_text.strip():
+        return md_path, ""
+    sys_prompt = system_prompt
+    user_content = crop_user_content(sys_prompt, md_text)
     kwargs = {}
     if summary_temperature is not None:
         kwargs["temperature"] = float(summary_temperature)
     if summary_max_tokens is not None:
         kwargs["max_tokens"] = int(summary_max_tokens)
-    resp = client.chat.completions.create(
-        model=summary_model,
-        messages=[
-            {"role": "system", "content": sys_prompt},
-            {"role": "user", "content": user_content},
-        ],
-        stream=False,
-        **kwargs,
-    )
-    content = resp.choices[0].message.content if resp.choices else ""
+    messages = [
+        {"role": "system", "content": sys_prompt},
+        {"role": "user", "content": user_content},
+    ]
+    if _HEDGE_ROUTES:
+        content = await hedged_complete(client, messages, kwargs)
+    else:
+        content = await complete_text(client, summary_model, messages, kwargs, limited=True)
     if not content:
         return md_path, ""
-    lines = content.splitlines()
-    for i, line in enumerate(lines):
-        if line.strip().startswith("🌐来源"):
-            arxiv_id = md_path.stem
-            lines[i] = f"🌐来源：arXiv,{arxiv_id}"
-            break
-    content = normalize_summary_format("\n".join(lines))
-    return md_path, content
+    return md_path, finalize_summary(md_path, content)
 
 
 def normalize_summary_format(text: str) -> str:
@@ -169,12 +333,228 @@ def normalize_summary_format(text: str) -> str:
     return "\n".join(out).rstrip() + "\n"
 
 
+async def summarize_all(
+    client: AsyncOpenAI,
+    to_run: List[Path],
+    single_dir: Path,
+    workers: int,
+    hedge_routes: Optional[List[Tuple[str, AsyncOpenAI, str]]] = None,
+    hedge_delay_sec: float = 0.0,
+) -> None:
+    """所有论文共用一个 AsyncOpenAI 客户端，Semaphore 限制同时在途的请求数，RPM/TPM 由限速器兜底。"""
+    global _RATE_LIMITER, _HEDGE_ROUTES, _HEDGE_DELAY_SEC
+    _RATE_LIMITER = dashscope_limiter()
+    _HEDGE_ROUTES = list(hedge_routes or [])
+    _HEDGE_DELAY_SEC = max(0.0, float(hedge_delay_sec))
+    sem = asyncio.Semaphore(workers)
+
+    async def task(md_path: Path) -> Tuple[Path, str, Optional[BaseException]]:
+        # 异常连同源路径一起返回，主循环直接遍历结果，无需 future -> 路径 的映射
+        async with sem:
+            try:
+                path, content = await summarize_one(client, md_path)
+                if not content.strip():
+                    return path, "", None
+                out_path = single_dir / f"{path.stem}.md"
+                out_path.write_text(content, encoding="utf-8")
+                return path, content, None
+            except Exception as e:
+                return md_path, "", e
+
+    total = len(to_run)
+    start = time.monotonic()
+    done = 0
+    empty = 0
+    try:
+        for fut in asyncio.as_completed([task(p) for p in to_run]):
+            src, content, err = await fut
+            if err is not None:
+                print(f"\r[SUMMARY] error on {src.name}: {err!r}", end="", flush=True)
+            elif not content.strip():
+                empty += 1
+            done += 1
+            elapsed = time.monotonic() - start
+            rate = done / elapsed if elapsed > 0 else 0.0
+            print(f"\r[SUMMARY] progress done={done}/{total} empty={empty} rate={rate:.2f}/s", end="", flush=True)
+    finally:
+        await client.close()
+        for _, hedge_client, _ in _HEDGE_ROUTES:
+            await hedge_client.close()
+
+
+_BATCH_FINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+# 超时取消后，最多再等这么久让任务从 cancelling 进入终态，以便取回已完成部分的结果文件
+_BATCH_CANCEL_WAIT_SEC = 120.0
+
+
+def make_batch_client() -> AsyncOpenAI:
+    key = (summary_batch_api_key or qwen_api_key or "").strip()
+    if not key:
+        raise SystemExit("summary_batch_api_key missing in config.config")
+    base = (summary_batch_base_url or "").strip()
+    if not base:
+        raise SystemExit("summary_batch_base_url missing in config.config")
+    return AsyncOpenAI(api_key=key, base_url=base)
+
+
+def write_batch_jsonl(to_run: List[Path], jsonl_path: Path) -> Dict[str, Path]:
+    """
+    把待摘要论文写成 Batch API 的输入 JSONL，返回 custom_id -> 源 md；空文件不入批。
+    请求体与实时接口一致（同一模型、提示词与温度），摘要风格不随待处理篇数走哪条路径而变化。
+    """
+    sys_prompt = system_prompt
+    body_extra: Dict[str, object] = {}
+    if summary_temperature is not None:
+        body_extra["temperature"] = float(summary_temperature)
+    if summary_max_tokens is not None:
+        body_extra["max_tokens"] = int(summary_max_tokens)
+    id_map: Dict[str, Path] = {}
+    jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+    with jsonl_path.open("wb") as f:
+        for p in to_run:
+            md_text = p.read_text(encoding="utf-8", errors="ignore")
+            if not md_text.strip():
+                continue
+            custom_id = p.stem
+            n = 1
+            while custom_id in id_map:
+                n += 1
+                custom_id = f"{p.stem}-{n}"
+            id_map[custom_id] = p
+            line = {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": summary_batch_endpoint,
+                "body": {
+                    "model": summary_model,
+                    "messages": [
+                        {"role": "system", "content": sys_prompt},
+                        {"role": "user", "content": crop_user_content(sys_prompt, md_text)},
+                    ],
+                    **body_extra,
+                },
+            }
+            f.write(dumps_line(line))
+    return id_map
+
+
+def batch_reply_content(record: dict) -> str:
+    resp = record.get("response") or {}
+    if resp.get("status_code") != 200:
+        return ""
+    choices = (resp.get("body") or {}).get("choices") or []
+    if not choices:
+        return ""
+    return ((choices[0] or {}).get("message") or {}).get("content") or ""
+
+
+async def summarize_via_batch(
+    to_run: List[Path], single_dir: Path, date_str: str, poll_sec: float, max_wait_sec: float = 0.0
+) -> List[Path]:
+    """
+    走 Batch API：写 JSONL -> 上传 -> 创建批量任务 -> 轮询 -> 下载结果按 custom_id 落盘。
+    批量任务 id 记在 JSONL 旁的状态文件里，中途退出后重跑会接着轮询同一个任务，不会重复提交。
+    轮询超过 max_wait_sec（>0 时）即取消任务，避免流水线被 24h 完成窗口卡住。
+    返回没有拿到摘要、需要回退实时接口的论文。
+    """
+    work_dir = summary_batch_jsonl_root / date_str
+    jsonl_path = work_dir / f"{date_str}_paper_summary.jsonl"
+    state_path = work_dir / f"{date_str}_paper_summary.batch.json"
+    id_map = write_batch_jsonl(to_run, jsonl_path)
+    if not id_map:
+        return to_run
+
+    client = make_batch_client()
+    try:
+        batch_id = ""
+        if state_path.exists():
+            try:
+                state = json.loads(state_path.read_text(encoding="utf-8"))
+            except ValueError:
+                state = {}
+            if sorted(state.get("custom_ids") or []) == sorted(id_map):
+                batch_id = str(state.get("batch_id") or "")
+        batch = None
+        if batch_id:
+            batch = await client.batches.retrieve(batch_id)
+            # 上次超时取消（或过期）的任务若已有部分结果，先收取这些结果，不重新提交
+            if batch.status in {"failed", "expired", "cancelled"} and not batch.output_file_id:
+                batch = None
+            else:
+                print(f"[SUMMARY] resume batch {batch_id} status={batch.status}", flush=True)
+        if batch is None:
+            uploaded = await client.files.create(file=jsonl_path, purpose="batch")
+            batch = await client.batches.create(
+                input_file_id=uploaded.id,
+                endpoint=summary_batch_endpoint,
+                completion_window=summary_batch_completion_window,
+            )
+            state_path.write_text(
+                json.dumps({"batch_id": batch.id, "custom_ids": sorted(id_map)}, ensure_ascii=False),
+                encoding="utf-8",
+            )
+            print(f"[SUMMARY] batch submitted id={batch.id} requests={len(id_map)}", flush=True)
+
+        deadline = time.monotonic() + max_wait_sec if max_wait_sec > 0 else None
+        while batch.status not in _BATCH_FINAL_STATES:
+            if deadline is not None and time.monotonic() >= deadline:
+                print()
+                print(f"[SUMMARY] batch {batch.id} still {batch.status} after {max_wait_sec:.0f}s, cancel", flush=True)
+                batch = await client.batches.cancel(batch.id)
+                # 取消是异步的：等任务进入 cancelled 等终态后，结果文件里才有已完成部分，这些已计费的结果照常收取
+                cancel_deadline = time.monotonic() + _BATCH_CANCEL_WAIT_SEC
+                while batch.status not in _BATCH_FINAL_STATES and time.monotonic() < cancel_deadline:
+                    await asyncio.sleep(min(poll_sec, 5.0))
+                    batch = await client.batches.retrieve(batch.id)
+                break
+            counts = batch.request_counts
+            done = f"{counts.completed + counts.failed}/{counts.total}" if counts else "?"
+            print(f"\r[SUMMARY] batch {batch.id} status={batch.status} done={done}", end="", flush=True)
+            await asyncio.sleep(poll_sec)
+            batch = await client.batches.retrieve(batch.id)
+        print()
+        print(f"[SUMMARY] batch {batch.id} finished status={batch.status}", flush=True)
+
+        written = set()
+        if batch.output_file_id:
+            raw = (await client.files.content(batch.output_file_id)).text
+            out_dir = summary_batch_out_root / date_str
+            out_dir.mkdir(parents=True, exist_ok=True)
+            (out_dir / f"{date_str}_{batch.id}.jsonl").write_text(raw, encoding="utf-8")
+            for line in raw.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                src = id_map.get(str(record.get("custom_id") or ""))
+                content = batch_reply_content(record)
+                if src is None or not content:
+                    continue
+                (single_dir / f"{src.stem}.md").write_text(finalize_summary(src, content), encoding="utf-8")
+                written.add(src)
+        print(f"[SUMMARY] batch wrote {len(written)}/{len(id_map)} summaries", flush=True)
+        # 任务已到终态且结果已落盘时才清掉续跑状态；仍在 cancelling 时保留，下次运行可接着取结果
+        if batch.status in _BATCH_FINAL_STATES or len(written) == len(id_map):
+            state_path.unlink(missing_ok=True)
+    finally:
+        await client.close()
+    return [p for p in to_run if p not in written]
+
+
 def run() -> None:
     ap = argparse.ArgumentParser("paper_summary")
     ap.add_argument("--input-dir", default=str(Path(DATA_ROOT) / "selectedpaper_to_mineru"))
     ap.add_argument("--out-root", default=str(Path(DATA_ROOT) / "paper_summary"))
     ap.add_argument("--date", default="")
     ap.add_argument("--concurrency", type=int, default=summary_concurrency)
+    ap.add_argument("--no-batch", action="store_true", help="always use the realtime endpoint, never the Batch API")
+    ap.add_argument("--batch-min-items", type=int, default=summary_batch_min_items)
+    ap.add_argument("--batch-poll-sec", type=float, default=summary_batch_poll_sec)
+    ap.add_argument("--batch-max-wait-sec", type=float, default=summary_batch_max_wait_sec, help="cancel the batch and fall back to realtime after this many seconds (0 = wait for it)")
+    ap.add_argument("--no-hedge", action="store_true", help="realtime requests go to qwen only, no backup providers")
+    ap.add_argument("--hedge-delay-ms", type=int, default=summary_hedge_delay_ms)
     args = ap.parse_args()
 
     in_root = Path(args.input_dir)
@@ -234,38 +614,33 @@ def run() -> None:
         print(f"[SUMMARY] gather_path={gather_path}", flush=True)
         return
 
-    client = make_client()
-    workers = max(1, int(args.concurrency or 0))
-    print(f"[SUMMARY] input_dir={in_dir} total={total} concurrency={workers}", flush=True)
-
-    start = time.monotonic()
-    done = 0
-    empty = 0
-
-    def task(md_path: Path) -> Tuple[Path, str]:
-        path, content = summarize_one(client, md_path)
-        if not content.strip():
-            return path, ""
-        out_path = single_dir / f"{path.stem}.md"
-        out_path.write_text(content, encoding="utf-8")
-        return path, content
-
-    with ThreadPoolExecutor(max_workers=workers) as ex:
-        future_map = {ex.submit(task, p): p for p in to_run}
-        for fut in as_completed(future_map):
-            src = future_map[fut]
-            try:
-                _, content = fut.result()
-                if not content.strip():
-                    empty += 1
-            except Exception as e:
-                print(f"\r[SUMMARY] error on {src.name}: {e!r}", end="", flush=True)
-            done += 1
-            elapsed = time.monotonic() - start
-            rate = done / elapsed if elapsed > 0 else 0.0
-            print(f"\r[SUMMARY] progress done={done}/{total} empty={empty} rate={rate:.2f}/s", end="", flush=True)
+    if summary_prefer_batch and not args.no_batch and total >= max(1, int(args.batch_min_items or 0)):
+        print(f"[SUMMARY] input_dir={in_dir} total={total} mode=batch", flush=True)
+        try:
+            to_run = asyncio.run(
+                summarize_via_batch(
+                    to_run,
+                    single_dir,
+                    date_str,
+                    max(1.0, float(args.batch_poll_sec)),
+                    max(0.0, float(args.batch_max_wait_sec or 0)),
+                )
+            )
+        except Exception as e:
+            print(f"[SUMMARY] batch failed: {e!r}", flush=True)
+        total = len(to_run)
+        if to_run:
+            print(f"[SUMMARY] {total} file(s) not covered by the batch, fall back to realtime", flush=True)
+
+    if to_run:
+        client = make_client()
+        workers = max(1, int(args.concurrency or 0))
+        hedge_routes = [] if args.no_hedge else make_hedge_routes()
+        hedge_note = f" hedge={','.join(n for n, _, _ in hedge_routes)}" if hedge_routes else ""
+        print(f"[SUMMARY] input_dir={in_dir} total={total} concurrency={workers}{hedge_note}", flush=True)
+        asyncio.run(summarize_all(client, to_run, single_dir, workers, hedge_routes, args.hedge_delay_ms / 1000.0))
+        print()
 
-    print()
     gather_path = write_gather(single_dir, gather_dir, date_str)
     print(f"[SUMMARY] single_dir={single_dir}", flush=True)
     print(f"[SUMMARY] gather_path={gather_path}", flush=True)
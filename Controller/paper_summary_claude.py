@@ -6,7 +6,7 @@ import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from openai import OpenAI
 
@@ -22,6 +22,7 @@ from config.config import (  # noqa: E402
     summary_input_hard_limit,
     summary_input_safety_margin,
     summary_concurrency,
+    summary_claude_prompt_cache,
     system_prompt,
     DATA_ROOT,
 )
@@ -82,6 +83,16 @@ def make_client() -> OpenAI:
     return OpenAI(api_key=key, base_url=base)
 
 
+def system_message(sys_prompt: str) -> dict:
+    # 系统提示词各篇相同，开启时附 cache_control 请求显式前缀缓存
+    if not summary_claude_prompt_cache:
+        return {"role": "system", "content": sys_prompt}
+    return {
+        "role": "system",
+        "content": [{"type": "text", "text": sys_prompt, "cache_control": {"type": "ephemeral"}}],
+    }
+
+
 def summarize_one(client: OpenAI, md_path: Path) -> Tuple[Path, str]:
     md_text = md_path.read_text(encoding="utf-8", errors="ignore")
     if not md_text.strip():
@@ -102,7 +113,7 @@ def summarize_one(client: OpenAI, md_path: Path) -> Tuple[Path, str]:
     resp = client.chat.completions.create(
         model=summary_model_2,
         messages=[
-            {"role": "system", "content": sys_prompt},
+            system_message(sys_prompt),
             {"role": "user", "content": user_content},
         ],
         stream=False,
@@ -194,24 +205,26 @@ def run() -> None:
     done = 0
     empty = 0
 
-    def task(md_path: Path) -> Tuple[Path, str]:
-        path, content = summarize_one(client, md_path)
-        if not content.strip():
-            return path, ""
-        out_path = single_dir / f"{path.stem}.md"
-        out_path.write_text(content, encoding="utf-8")
-        return path, content
+    def task(md_path: Path) -> Tuple[Path, str, Optional[BaseException]]:
+        # 异常连同源路径一起返回，主循环直接遍历 future 列表，无需 future -> 路径 的映射
+        try:
+            path, content = summarize_one(client, md_path)
+            if not content.strip():
+                return path, "", None
+            out_path = single_dir / f"{path.stem}.md"
+            out_path.write_text(content, encoding="utf-8")
+            return path, content, None
+        except Exception as e:
+            return md_path, "", e
 
     with ThreadPoolExecutor(max_workers=workers) as ex:
-        future_map = {ex.submit(task, p): p for p in to_run}
-        for fut in as_completed(future_map):
-            src = future_map[fut]
-            try:
-                _, content = fut.result()
-                if not content.strip():
-                    empty += 1
-            except Exception as e:
-                print(f"\r[SUMMARY] error on {src.name}: {e!r}", end="", flush=True)
+        futures = [ex.submit(task, p) for p in to_run]
+        for fut in as_completed(futures):
+            src, content, err = fut.result()
+            if err is not None:
+                print(f"\r[SUMMARY] error on {src.name}: {err!r}", end="", flush=True)
+            elif not content.strip():
+                empty += 1
             done += 1
             elapsed = time.monotonic() - start
             rate = done / elapsed if elapsed > 0 else 0.0
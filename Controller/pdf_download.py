@@ -254,6 +254,7 @@ from config.config import (
     MANIFEST_FILENAME,
 )  # noqa: E402
 from Controller.http_session import build_session
+from Controller.json_io import write_json
 
 
 def setup_logging():
@@ -460,8 +461,7 @@ def run():
         "items": manifest_items,
     }
     manifest_path = os.path.join(PDF_OUTPUT_DIR, date_str, MANIFEST_FILENAME)
-    with open(manifest_path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    write_json(manifest_path, manifest)
     logger.info("Saved manifest: %s", manifest_path)
     print("============结束下载原始 PDF 列表==============", flush=True)
 
@@ -1,15 +1,22 @@
 import argparse
-import concurrent.futures
+import asyncio
 import json
 import os
 import re
+import sqlite3
 import sys
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
+import httpx
+from openai import AsyncOpenAI
+
+try:
+    from blake3 import blake3 as _hasher
+except ImportError:  # pragma: no cover
+    from hashlib import blake2b as _hasher
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from config.config import qwen_api_key as CFG_QWEN_KEY  # noqa: E402
@@ -20,6 +27,14 @@ from config.config import org_max_tokens as CFG_MAX_TOKENS  # noqa: E402
 from config.config import pdf_info_system_prompt as CFG_INFO_PROMPT  # noqa: E402
 from config.config import DATA_ROOT, PAPER_THEME_FILTER_DIR  # noqa: E402
 from config.config import pdf_info_concurrency  # noqa: E402
+from config.config import pdf_info_prompt_cache  # noqa: E402
+from config.config import PDF_INFO_CACHE  # noqa: E402
+from Controller.json_io import write_json  # noqa: E402
+from Controller.llm_http import dashscope_http_client  # noqa: E402
+from Controller.llm_rate_limit import RateLimiter, dashscope_limiter, estimate_tokens  # noqa: E402
+
+# 发请求前按预估 token 占用 DashScope 限速额度；由 run 在事件循环内创建
+_RATE_LIMITER: Optional[RateLimiter] = None
 
 
 def ensure_dir(p: Path) -> Path:
@@ -93,36 +108,67 @@ def parse_arxiv_json(json_path: Path) -> Dict[str, Dict[str, str]]:
     return meta
 
 
-def call_qwen(api_key: str, base_url: str, model: str, system_prompt: str, user_content: str, temperature: float, max_tokens: int) -> str:
-    url = base_url.rstrip("/") + "/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "Accept": "application/json",
+def make_client(api_key: str, base_url: str) -> AsyncOpenAI:
+    # 超时与原先 requests 的 (connect=20, read=120) 一致
+    http_client = dashscope_http_client(pdf_info_concurrency, httpx.Timeout(120.0, connect=20.0))
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+
+
+def system_message(system_prompt: str) -> Dict[str, Any]:
+    """
+    系统提示词对所有论文逐字节相同（不拼入任何逐篇内容），是天然的共享前缀。
+    开启 pdf_info_prompt_cache 时以 content 块形式附 cache_control，显式请求前缀缓存。
+    """
+    if not pdf_info_prompt_cache:
+        return {"role": "system", "content": system_prompt}
+    return {
+        "role": "system",
+        "content": [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}],
     }
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": system_prompt},
+
+
+async def call_qwen(client: AsyncOpenAI, model: str, system_prompt: str, user_content: str, temperature: float, max_tokens: int) -> str:
+    max_tokens = int(max_tokens) if max_tokens is not None else 1024
+    if _RATE_LIMITER is not None:
+        await _RATE_LIMITER.acquire(estimate_tokens(system_prompt, user_content, max_tokens=max_tokens))
+    resp = await client.chat.completions.create(
+        model=model,
+        messages=[
+            system_message(system_prompt),
             {"role": "user", "content": user_content},
         ],
-        "temperature": float(temperature) if temperature is not None else 1.0,
-        "max_tokens": int(max_tokens) if max_tokens is not None else 1024,
-        "stream": False,
-    }
-    r = requests.post(url, headers=headers, json=payload, timeout=(20, 120))
-    r.raise_for_status()
-    data = r.json()
-    if not isinstance(data, dict):
-        return "{}"
-    choices = data.get("choices") or []
-    if not choices:
+        temperature=float(temperature) if temperature is not None else 1.0,
+        max_tokens=max_tokens,
+        stream=False,
+    )
+    if not resp.choices:
         return "{}"
-    msg = choices[0].get("message") or {}
-    content = msg.get("content") or ""
+    content = resp.choices[0].message.content or ""
     return content or "{}"
 
 
+def open_cache(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS cache (k TEXT PRIMARY KEY, v TEXT NOT NULL) WITHOUT ROWID")
+    return conn
+
+
+def cache_key(model: str, system_prompt: str, user_content: str, temperature: float, max_tokens: int) -> str:
+    h = _hasher()
+    payload = json.dumps([model, system_prompt, user_content, temperature, max_tokens], ensure_ascii=False)
+    h.update(payload.encode("utf-8"))
+    return h.hexdigest()
+
+
+def is_json_object(text: str) -> bool:
+    try:
+        return isinstance(json.loads(text), dict)
+    except ValueError:
+        return False
+
+
 def parse_json_or_fallback(text: str) -> Dict[str, Any]:
     try:
         obj = json.loads(text)
@@ -144,11 +190,11 @@ def run(args: argparse.Namespace) -> None:
     if arxiv_json_path and not arxiv_json_path.exists():
         raise SystemExit(f"missing arxiv json file: {arxiv_json_path}")
     if not arxiv_json_path:
-        candidate = Path(PAPER_THEME_FILTER_DIR) / f"{date_dir}.json"
+        candidate = PAPER_THEME_FILTER_DIR / f"{date_dir}.json"
         if candidate.exists():
             arxiv_json_path = candidate
         else:
-            arxiv_json_path = find_latest_json(Path(PAPER_THEME_FILTER_DIR))
+            arxiv_json_path = find_latest_json(PAPER_THEME_FILTER_DIR)
     meta_map = parse_arxiv_json(arxiv_json_path)
     out_root = ensure_dir(Path(args.outdir))
     out_path = out_root / f"{date_dir}.json"
@@ -189,7 +235,7 @@ def run(args: argparse.Namespace) -> None:
             if m:
                 dedup[m.group(1)] = it
         agg = list(dedup.values())
-        out_path.write_text(json.dumps(agg, ensure_ascii=False, indent=2), encoding="utf-8")
+        write_json(out_path, agg)
     remaining_files = [p for p in md_files if p.stem not in existing_ids]
     if args.limit and args.limit > 0:
         remaining_files = remaining_files[: args.limit]
@@ -204,49 +250,69 @@ def run(args: argparse.Namespace) -> None:
     print(f"[process] total={total} concurrency={workers}", flush=True)
     start = time.monotonic()
 
-    def task(p: Path) -> Tuple[str, Dict[str, Any] | None, str]:
+    client = make_client(api_key, base_url)
+    sem = asyncio.Semaphore(workers)
+    # 所有读写都在事件循环线程内完成，单个连接即可；只缓存能解析成 JSON 对象的回复
+    cache = open_cache(Path(args.cache)) if args.cache else None
+    hits = 0
+
+    async def task(p: Path) -> Tuple[str, Dict[str, Any] | None, str]:
+        nonlocal hits
         arxiv_id = p.stem
-        try:
-            content = read_text_clip(p, max_chars=args.max_chars)
-            user_content = f"文件名：{p.name}\n文本：\n{content}"
-            out_text = call_qwen(api_key, base_url, model, system_prompt, user_content, temperature, max_tokens)
-            obj_small = parse_json_or_fallback(out_text)
-            meta = meta_map.get(arxiv_id, {"title": "", "source": f"arxiv, {arxiv_id}", "published": ""})
-            item = {
-                "title": meta.get("title", ""),
-                "source": meta.get("source", ""),
-                "published": meta.get("published", ""),
-                "instution": obj_small.get("instution", ""),
-                "is_large": bool(obj_small.get("is_large", False)),
-                "abstract": obj_small.get("abstract", ""),
-            }
-            return arxiv_id, item, ""
-        except Exception as e:
-            return arxiv_id, None, repr(e)
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as ex:
-        futures = [ex.submit(task, p) for p in remaining_files]
-        for fut in concurrent.futures.as_completed(futures):
+        async with sem:
             try:
-                arxiv_id, item, err = fut.result()
+                content = read_text_clip(p, max_chars=args.max_chars)
+                user_content = f"文件名：{p.name}\n文本：\n{content}"
+                key = cache_key(model, system_prompt, user_content, temperature, max_tokens)
+                row = cache.execute("SELECT v FROM cache WHERE k=?", (key,)).fetchone() if cache else None
+                if row is not None:
+                    out_text = row[0]
+                    hits += 1
+                else:
+                    out_text = await call_qwen(client, model, system_prompt, user_content, temperature, max_tokens)
+                    if cache is not None and is_json_object(out_text):
+                        cache.execute("INSERT OR REPLACE INTO cache (k, v) VALUES (?, ?)", (key, out_text))
+                        cache.commit()
+                obj_small = parse_json_or_fallback(out_text)
+                meta = meta_map.get(arxiv_id, {"title": "", "source": f"arxiv, {arxiv_id}", "published": ""})
+                item = {
+                    "title": meta.get("title", ""),
+                    "source": meta.get("source", ""),
+                    "published": meta.get("published", ""),
+                    "instution": obj_small.get("instution", ""),
+                    "is_large": bool(obj_small.get("is_large", False)),
+                    "abstract": obj_small.get("abstract", ""),
+                }
+                return arxiv_id, item, ""
             except Exception as e:
+                return arxiv_id, None, repr(e)
+
+    async def run_all() -> None:
+        # 一个事件循环内以协程并发请求，Semaphore 控制在途数量，代替线程池
+        global _RATE_LIMITER
+        nonlocal processed, errors
+        _RATE_LIMITER = dashscope_limiter()
+        try:
+            for fut in asyncio.as_completed([task(p) for p in remaining_files]):
+                arxiv_id, item, err = await fut
                 processed += 1
-                errors += 1
+                if item is None:
+                    errors += 1
+                else:
+                    agg.append(item)
+                    write_json(out_path, agg)
                 elapsed = time.monotonic() - start
                 rate = processed / elapsed if elapsed > 0 else 0.0
                 print(f"\r[process] {processed}/{total} err={errors} rate={rate:.2f}/s", end="", flush=True)
-                continue
-
-            processed += 1
-            if item is None:
-                errors += 1
-            else:
-                agg.append(item)
-                out_path.write_text(json.dumps(agg, ensure_ascii=False, indent=2), encoding="utf-8")
-            elapsed = time.monotonic() - start
-            rate = processed / elapsed if elapsed > 0 else 0.0
-            print(f"\r[process] {processed}/{total} err={errors} rate={rate:.2f}/s", end="", flush=True)
+        finally:
+            await client.close()
+            if cache is not None:
+                cache.close()
+
+    asyncio.run(run_all())
     print()
+    if cache is not None:
+        print(f"[cache] hit={hits}/{total}", flush=True)
     print("============结束机构识别与信息写入==============", flush=True)
 
 
@@ -258,6 +324,7 @@ def main() -> None:
     ap.add_argument("--limit", type=int, default=None)
     ap.add_argument("--concurrency", type=int, default=pdf_info_concurrency)
     ap.add_argument("--max-chars", type=int, default=120000)
+    ap.add_argument("--cache", default=str(PDF_INFO_CACHE), help="回复缓存 SQLite 路径，传空字符串关闭缓存")
     args = ap.parse_args()
     run(args)
 
@@ -22,6 +22,7 @@ from config.config import (
     PAPER_THEME_FILTER_DIR,
     LLM_SELECT_THEME_DIR,
 )  # noqa: E402
+from Controller.json_io import write_json  # noqa: E402
 
 
 def setup_logging():
@@ -187,20 +188,17 @@ def run():
         sys.stdout.flush()
     logger.info("Done. created=%d, skipped=%d, missing=%d, total=%d", processed, skipped, missing, total)
     manifest_path = os.path.join(PDF_PREVIEW_DIR, date_str, MANIFEST_FILENAME)
-    with open(manifest_path, "w", encoding="utf-8") as f:
-        json.dump(
-            {
-                "date": date_str,
-                "total": total,
-                "created": processed,
-                "skipped": skipped,
-                "missing": missing,
-                "items": manifest_items,
-            },
-            f,
-            ensure_ascii=False,
-            indent=2,
-        )
+    write_json(
+        manifest_path,
+        {
+            "date": date_str,
+            "total": total,
+            "created": processed,
+            "skipped": skipped,
+            "missing": missing,
+            "items": manifest_items,
+        },
+    )
     logger.info("Saved manifest: %s", manifest_path)
     print("============结束切分预览 PDF==============", flush=True)
 
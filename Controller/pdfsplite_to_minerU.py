@@ -12,6 +12,7 @@ import requests
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from config.config import PDF_PREVIEW_DIR, PREVIEW_MINERU_DIR, MANIFEST_FILENAME, minerU_Token  # noqa: E402
+from Controller.json_io import write_json  # noqa: E402
 
 
 def setup_logging():
@@ -69,8 +70,8 @@ def pick_first_md(zip_path: Path) -> str:
         names = [n for n in zf.namelist() if n.lower().endswith(".md")]
         if not names:
             raise RuntimeError(f"no .md in zip: {zip_path}")
-        names.sort(key=lambda s: (s.count("/"), len(s)))
-        name = names[0]
+        # 只取层级最浅、同层路径最短的一个，线性 min 即可（与稳定排序取首个等价）
+        name = min(names, key=lambda s: (s.count("/"), len(s)))
         raw = zf.read(name)
     return raw.decode("utf-8", errors="replace")
 
@@ -189,7 +190,7 @@ def run():
     ap.add_argument("--limit", type=int, default=None)
     ap.add_argument("--date", default="")
     ap.add_argument("--manifest", default="")
-    ap.add_argument("--outdir", default=PREVIEW_MINERU_DIR)
+    ap.add_argument("--outdir", default=str(PREVIEW_MINERU_DIR))
     ap.add_argument("--base-url", default=os.environ.get("MINERU_BASE_URL", "https://mineru.net"))
     ap.add_argument("--model-version", default=os.environ.get("MINERU_MODEL_VERSION", "vlm"))
     ap.add_argument("--timeout-sec", type=int, default=900)
@@ -201,7 +202,7 @@ def run():
     if not token:
         raise SystemExit("MinerU token missing in config.config.minerU_Token")
 
-    root = Path(PDF_PREVIEW_DIR)
+    root = PDF_PREVIEW_DIR
     manifest_items: List[dict] = []
     manifest_path: Path | None
     if args.manifest:
@@ -275,7 +276,7 @@ def run():
                 for p in pdfs
             ],
         }
-        manifest_path.write_text(json.dumps(manifest_payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        write_json(manifest_path, manifest_payload)
         return
 
     client = MinerUClient(args.base_url, token)
@@ -342,7 +343,7 @@ def run():
             }
         )
     manifest_path = out_root / MANIFEST_FILENAME
-    manifest_path.write_text(json.dumps({"date": date_str, "total": len(pdfs), "items": manifest_items}, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_json(manifest_path, {"date": date_str, "total": len(pdfs), "items": manifest_items})
     print("============结束预览 PDF 的 MinerU 解析==============", flush=True)
 
 
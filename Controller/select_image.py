@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 import argparse
+import atexit
+import functools
 import html
 import json
 import os
+import posixpath
 import re
+import shutil
 import textwrap
 import urllib.parse
 from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
@@ -15,10 +20,29 @@ from pathlib import Path
 import fitz  # PyMuPDF
 from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageStat
 
+# 重采样常量在导入时确定一次（Pillow >= 9.1 使用 Image.Resampling）
+try:
+    _RESAMPLE_LANCZOS = Image.Resampling.LANCZOS
+except AttributeError:  # pragma: no cover
+    _RESAMPLE_LANCZOS = getattr(Image, "LANCZOS", getattr(Image, "BICUBIC", 3))
+
+# 可选加速：Stage 4 的逐对合并判定优先用 numba，其次 numpy 广播，都不可用时走纯 Python 实现
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+try:
+    from numba import njit as _njit
+except ImportError:  # pragma: no cover
+    _njit = None
+if np is None:
+    _njit = None
+
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from config.config import DATA_ROOT  # noqa: E402
+from config.config import select_image_workers  # noqa: E402
 
 
 @dataclass
@@ -81,6 +105,35 @@ class RenderConfig:
         ]
     )
     caption_negative: list[str] = field(default_factory=list)
+    prune_by_heading: bool = False  # results_only 时在解析 md 阶段直接丢弃负向章节下的图片
+    # 以下为 keyword 列表的小写 tuple，构造时生成一次，供 keep_entry / parse_md_images 复用
+    heading_positive_lc: tuple[str, ...] = field(init=False, repr=False)
+    heading_negative_lc: tuple[str, ...] = field(init=False, repr=False)
+    caption_positive_lc: tuple[str, ...] = field(init=False, repr=False)
+    caption_negative_lc: tuple[str, ...] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.heading_positive_lc = _normalize_keywords(self.heading_positive)
+        self.heading_negative_lc = _normalize_keywords(self.heading_negative)
+        self.caption_positive_lc = _normalize_keywords(self.caption_positive)
+        self.caption_negative_lc = _normalize_keywords(self.caption_negative)
+
+
+def _normalize_keywords(keys: Iterable[str]) -> tuple[str, ...]:
+    """
+    小写、去重，并去掉包含其他关键词的冗余项（如已有 "result" 时的 "results"）。
+    关键词只用于 any(k in text) 子串判断，结果不变，但每次判断要扫的关键词更少。
+    """
+    uniq = list(dict.fromkeys(k.lower() for k in keys))
+    return tuple(k for k in uniq if not any(o != k and o in k for o in uniq))
+
+
+def split_keywords(text: str) -> list[str]:
+    """解析逗号分隔的关键词参数，忽略空项。"""
+    return [k for k in (part.strip() for part in text.split(",")) if k]
+
+
+_DATE_DIR_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
 
 
 def today_str() -> str:
@@ -94,15 +147,20 @@ def select_date_dir(root: Path, date_str: str) -> tuple[Path, str]:
     candidate = root / today
     if candidate.is_dir():
         return candidate, today
-    subdirs = [d for d in root.iterdir() if d.is_dir() and re.fullmatch(r"\d{4}-\d{2}-\d{2}", d.name)]
+    # DirEntry.is_dir() 复用 scandir 的缓存结果，不再逐个 stat；ISO 日期按字符串排序即按时间排序
+    with os.scandir(root) as it:
+        subdirs = [e.name for e in it if _DATE_DIR_RE.fullmatch(e.name) and e.is_dir()]
     if subdirs:
-        subdirs.sort(key=lambda p: p.name)
-        return subdirs[-1], subdirs[-1].name
+        latest = max(subdirs)
+        return root / latest, latest
     return root, today
 
 
 def list_paper_dirs(root: Path) -> list[Path]:
-    return sorted([p for p in root.iterdir() if p.is_dir()])
+    with os.scandir(root) as it:
+        names = [e.name for e in it if e.is_dir()]
+    names.sort()
+    return [root / n for n in names]
 
 
 def find_md_path(paper_dir: Path, stem: str) -> Path | None:
@@ -116,21 +174,42 @@ def find_md_path(paper_dir: Path, stem: str) -> Path | None:
     return md_files[0] if md_files else None
 
 
-def parse_md_images(md_path: Path) -> list[dict[str, str]]:
-    image_re = re.compile(r"!\[.*?\]\((.*?)\)")
-    caption_re = re.compile(r"(figure|fig\.?|图)\s*\d+", re.IGNORECASE)
-    heading_re = re.compile(r"^#+\s+")
+_MD_IMAGE_RE = re.compile(r"!\[.*?\]\((.*?)\)")
+_MD_CAPTION_RE = re.compile(r"(figure|fig\.?|图)\s*\d+", re.IGNORECASE)
+_MD_HEADING_RE = re.compile(r"^#+\s+")
+
+
+def parse_md_images(md_path: Path, cfg: RenderConfig | None = None) -> list[dict[str, str]]:
+    """
+    解析 md 中的图片及其 caption。
+    传入 cfg 且 cfg.results_only / cfg.prune_by_heading 同时开启时，
+    负向章节（命中 heading_negative 且未命中 heading_positive）下的图片直接跳过，
+    避免后续对注定被丢弃的图片做 caption 纯化和分组。
+    """
+    image_re = _MD_IMAGE_RE
+    caption_re = _MD_CAPTION_RE
+    heading_re = _MD_HEADING_RE
+
+    prune = cfg is not None and cfg.results_only and cfg.prune_by_heading
+    pos_keys = cfg.heading_positive_lc if prune else ()
+    neg_keys = cfg.heading_negative_lc if prune else ()
 
     entries: list[dict[str, str]] = []
     pending: list[int] = []
     heading = ""
+    heading_ok = True
     lines = md_path.read_text(encoding="utf-8", errors="ignore").splitlines()
     for line in lines:
         raw = line.strip()
         if heading_re.match(raw):
             heading = heading_re.sub("", raw).strip()
+            if prune:
+                h = heading.lower()
+                heading_ok = any(k in h for k in pos_keys) or not any(k in h for k in neg_keys)
         m = image_re.search(raw)
         if m:
+            if not heading_ok:
+                continue
             rel = m.group(1).strip()
             idx = len(entries)
             entries.append({"image_rel": rel, "heading": heading, "caption": ""})
@@ -139,7 +218,7 @@ def parse_md_images(md_path: Path) -> list[dict[str, str]]:
         if caption_re.search(raw):
             if pending:
                 # 对 caption 进行纯化验证
-                purified_caption, is_valid = purify_caption(raw)
+                purified_caption, is_valid, _ = purify_caption(raw)
                 caption_text = purified_caption if is_valid else raw  # 如果纯化失败，保留原始文本（可能是 md 格式不同）
                 for idx in pending:
                     entries[idx]["caption"] = caption_text
@@ -266,24 +345,17 @@ def group_figures_by_proximity(entries: list[dict], figures: list[dict], caption
     # 先匹配 figures 到 captions
     matched = match_figures_to_captions(figures, captions) if figures and captions else {}
     
-    # 构建 img_path -> figure 的映射（用于匹配 entries 和 figures）
-    figure_by_path: dict[str, dict] = {}
-    for i, fig in enumerate(figures):
-        img_path = fig.get("img_path", "")
-        if img_path:
-            normalized_path = _normalize_path(img_path)
-            if normalized_path:
-                figure_by_path[normalized_path] = fig
-                fig["_index"] = i
+    # 构建 img_path / 文件名 -> figure 的映射（用于匹配 entries 和 figures）
+    figure_by_path, figure_by_basename = _index_figures_by_path(figures)
     
     # 为每个 entry 关联 figure 信息（基于 img_path 匹配）
     entry_figures: list[dict] = []
     for i, entry in enumerate(entries):
         raw_caption = entry.get("caption", "").strip()
         if raw_caption:
-            purified_caption, is_valid = purify_caption(raw_caption)
+            purified_caption, is_valid, caption_number = purify_caption(raw_caption)
         else:
-            purified_caption, is_valid = ("", False)
+            purified_caption, is_valid, caption_number = ("", False, None)
         entry_fig = {
             "entry": entry,
             "entry_idx": i,
@@ -301,18 +373,7 @@ def group_figures_by_proximity(entries: list[dict], figures: list[dict], caption
         # 通过 img_path 匹配到 figures
         entry_image_rel = entry.get("image_rel", "")
         if entry_image_rel:
-            normalized_entry_path = _normalize_path(entry_image_rel)
-            matched_figure = None
-            for fig_path, fig in figure_by_path.items():
-                if normalized_entry_path == fig_path:
-                    matched_figure = fig
-                    break
-                # 文件名匹配
-                entry_filename = Path(entry_image_rel).name
-                fig_filename = Path(fig_path).name
-                if entry_filename and fig_filename and entry_filename == fig_filename:
-                    matched_figure = fig
-                    break
+            matched_figure = _lookup_figure(entry_image_rel, figure_by_path, figure_by_basename)
             
             if matched_figure:
                 entry_fig["figure_idx"] = matched_figure.get("_index")
@@ -326,9 +387,10 @@ def group_figures_by_proximity(entries: list[dict], figures: list[dict], caption
                     if isinstance(image_caption, list) and len(image_caption) > 0:
                         for cap in image_caption:
                             if isinstance(cap, str) and cap.strip():
-                                purified_caption, is_valid = purify_caption(cap.strip())
+                                purified_caption, is_valid, fig_num = purify_caption(cap.strip())
                                 if is_valid:
                                     entry_fig["caption"] = purified_caption
+                                    caption_number = fig_num
                                     entry_fig["has_caption"] = True
                                     entry_fig["caption_valid"] = True
                                     # image_caption 没有独立 bbox，用 figure_bbox 兜底
@@ -339,21 +401,19 @@ def group_figures_by_proximity(entries: list[dict], figures: list[dict], caption
                 fig_index = matched_figure.get("_index")
                 if fig_index is not None and fig_index in matched:
                     raw_cap = matched[fig_index]["text"]
-                    purified_caption, is_valid = purify_caption(str(raw_cap))
+                    purified_caption, is_valid, fig_num = purify_caption(str(raw_cap))
                     if is_valid:
                         # 只有当已有 caption 不可信，或 figure 编号一致时才覆盖
-                        if (not entry_fig["caption_valid"]) or (
-                            extract_figure_number(entry_fig.get("caption", "")) == extract_figure_number(purified_caption)
-                        ):
+                        if (not entry_fig["caption_valid"]) or caption_number == fig_num:
                             entry_fig["caption"] = purified_caption
+                            caption_number = fig_num
                             entry_fig["caption_bbox"] = matched[fig_index]["bbox"]
                             entry_fig["has_caption"] = True
                             entry_fig["caption_valid"] = True
         
-        # 提取 figure 编号（用于强绑定分组）
-        caption_text = entry_fig.get("caption", "")
-        if caption_text and entry_fig.get("caption_valid"):
-            entry_fig["figure_number"] = extract_figure_number(str(caption_text))
+        # figure 编号（用于强绑定分组），已在 purify_caption 中一并解析
+        if entry_fig.get("caption") and entry_fig.get("caption_valid"):
+            entry_fig["figure_number"] = caption_number
         
         entry_figures.append(entry_fig)
     
@@ -404,10 +464,7 @@ def group_figures_by_proximity(entries: list[dict], figures: list[dict], caption
         if entry_fig["figure_number"] is not None:
             num = entry_fig["figure_number"]
             page = entry_fig.get("page_idx", 0) or 0
-            key = (int(page), int(num))
-            if key not in groups_by_number:
-                groups_by_number[key] = []
-            groups_by_number[key].append(entry_fig)
+            groups_by_number.setdefault((int(page), int(num)), []).append(entry_fig)
         else:
             ungrouped.append(entry_fig)
     
@@ -416,10 +473,7 @@ def group_figures_by_proximity(entries: list[dict], figures: list[dict], caption
     # 按页面分组处理
     by_page: dict[int, list[dict]] = {}
     for entry_fig in ungrouped:
-        page = entry_fig.get("page_idx", 0)
-        if page not in by_page:
-            by_page[page] = []
-        by_page[page].append(entry_fig)
+        by_page.setdefault(entry_fig.get("page_idx", 0), []).append(entry_fig)
     
     # 对每页内的 entry 进行分组
     for page, page_entries in by_page.items():
@@ -510,10 +564,7 @@ def group_figures_by_proximity(entries: list[dict], figures: list[dict], caption
     # 同一页内，bbox 水平相邻、高度相近，且其中一个有 caption，另一个没有
     remaining_by_page: dict[int, list[dict]] = {}
     for entry_fig in ungrouped:
-        page = entry_fig.get("page_idx", 0)
-        if page not in remaining_by_page:
-            remaining_by_page[page] = []
-        remaining_by_page[page].append(entry_fig)
+        remaining_by_page.setdefault(entry_fig.get("page_idx", 0), []).append(entry_fig)
     
     for page, page_entries in remaining_by_page.items():
         if len(page_entries) <= 1:
@@ -659,12 +710,8 @@ def group_figures_by_proximity(entries: list[dict], figures: list[dict], caption
             if ra != rb:
                 parent[rb] = ra
 
-        for i in range(len(gs)):
-            for j in range(i + 1, len(gs)):
-                if gb[i] is None or gb[j] is None:
-                    continue
-                if _should_merge_group_bboxes(gb[i], gb[j], page_w, page_h):
-                    union(i, j)
+        for i, j in _pairwise_merge_edges(gb, page_w, page_h):
+            union(i, j)
 
         comps: dict[int, list[int]] = {}
         for i in range(len(gs)):
@@ -701,17 +748,18 @@ def group_figures_by_proximity(entries: list[dict], figures: list[dict], caption
                     "caption": best_caption,
                     "caption_bbox": best_caption_bbox,
                     "page_idx": page,
+                    # 各组 union 已在上面算过，缓存下来供排序使用
+                    "_union_bbox": _bbox_union([gb[i] for i in idxs if gb[i] is not None]),
                 }
             )
 
     def _group_sort_key(g: dict) -> tuple[int, float, float]:
         page = int(g.get("page_idx", 0) or 0)
-        bboxes: list[list[float]] = []
-        for img in g.get("images", []):
-            bb = img.get("figure_bbox")
-            if isinstance(bb, list) and len(bb) == 4:
-                bboxes.append(bb)
-        ub = _bbox_union(bboxes) or [0.0, 0.0, 0.0, 0.0]
+        if "_union_bbox" in g:
+            ub = g["_union_bbox"]
+        else:
+            ub = _bbox_union([img.get("figure_bbox") for img in g.get("images", [])])
+        ub = ub or [0.0, 0.0, 0.0, 0.0]
         return (page, float(ub[1]), float(ub[0]))
 
     merged_all.sort(key=_group_sort_key)
@@ -727,6 +775,37 @@ def _normalize_path(path: str) -> str:
     return path
 
 
+def _index_figures_by_path(figures: list[dict]) -> tuple[dict[str, dict], dict[str, dict]]:
+    """
+    构建 规范化路径 -> figure 与 文件名 -> figure 两个索引，并在 figure 上记录 _index。
+    文件名重复时保留第一个出现的 figure。
+    """
+    figure_by_path: dict[str, dict] = {}
+    figure_by_basename: dict[str, dict] = {}
+    for i, fig in enumerate(figures):
+        img_path = fig.get("img_path", "")
+        if img_path:
+            normalized_path = _normalize_path(img_path)
+            if normalized_path:
+                figure_by_path[normalized_path] = fig
+                fig["_index"] = i
+                basename = posixpath.basename(normalized_path)
+                if basename:
+                    figure_by_basename.setdefault(basename, fig)
+    return figure_by_path, figure_by_basename
+
+
+def _lookup_figure(image_rel: str, figure_by_path: dict[str, dict], figure_by_basename: dict[str, dict]) -> dict | None:
+    """按完整路径匹配 figure，失败时退回文件名匹配。"""
+    normalized = _normalize_path(image_rel)
+    if not normalized:
+        return None
+    fig = figure_by_path.get(normalized)
+    if fig is None:
+        fig = figure_by_basename.get(posixpath.basename(normalized))
+    return fig
+
+
 def assign_captions_by_bbox(entries: list[dict[str, str]], figures: list[dict], captions: list[dict], paper_dir: Path) -> None:
     """
     改进的caption匹配：通过img_path匹配figures到entries，然后关联captions。
@@ -739,16 +818,8 @@ def assign_captions_by_bbox(entries: list[dict[str, str]], figures: list[dict],
     matched = match_figures_to_captions(figures, captions) if captions else {}
     
     # 通过 img_path 匹配 entries 和 figures
-    # 构建 img_path -> figure 的映射
-    figure_by_path: dict[str, dict] = {}
-    for i, fig in enumerate(figures):
-        img_path = fig.get("img_path", "")
-        if img_path:
-            normalized_path = _normalize_path(img_path)
-            if normalized_path:
-                figure_by_path[normalized_path] = fig
-                # 也保存索引，用于匹配 caption
-                fig["_index"] = i
+    # 构建 img_path / 文件名 -> figure 的映射（同时保存索引，用于匹配 caption）
+    figure_by_path, figure_by_basename = _index_figures_by_path(figures)
     
     # 将匹配结果关联到entries
     for entry in entries:
@@ -756,22 +827,8 @@ def assign_captions_by_bbox(entries: list[dict[str, str]], figures: list[dict],
         if not entry_image_rel:
             continue
         
-        # 规范化 entry 的 image_rel 路径
-        normalized_entry_path = _normalize_path(entry_image_rel)
-        
-        # 查找匹配的 figure
-        matched_figure = None
-        for fig_path, fig in figure_by_path.items():
-            # 路径匹配：可以是完全匹配，或者文件名匹配
-            if normalized_entry_path == fig_path:
-                matched_figure = fig
-                break
-            # 文件名匹配（处理路径差异）
-            entry_filename = Path(entry_image_rel).name
-            fig_filename = Path(fig_path).name
-            if entry_filename and fig_filename and entry_filename == fig_filename:
-                matched_figure = fig
-                break
+        # 查找匹配的 figure：先完整路径，再文件名（处理路径差异）
+        matched_figure = _lookup_figure(entry_image_rel, figure_by_path, figure_by_basename)
         
         if matched_figure:
             # 添加figure的bbox信息
@@ -787,7 +844,7 @@ def assign_captions_by_bbox(entries: list[dict[str, str]], figures: list[dict],
             fig_index = matched_figure.get("_index")
             if fig_index is not None and fig_index in matched:
                 raw_caption = matched[fig_index]["text"]
-                purified_caption, is_valid = purify_caption(raw_caption)
+                purified_caption, is_valid, _ = purify_caption(raw_caption)
                 if is_valid:
                     entry["caption"] = purified_caption
                     entry["caption_bbox"] = matched[fig_index]["bbox"]
@@ -803,7 +860,7 @@ def assign_captions_by_bbox(entries: list[dict[str, str]], figures: list[dict],
                     for cap in image_caption:
                         if isinstance(cap, str) and cap.strip():
                             raw_caption = cap.strip()
-                            purified_caption, is_valid = purify_caption(raw_caption)
+                            purified_caption, is_valid, _ = purify_caption(raw_caption)
                             if is_valid:
                                 entry["caption"] = purified_caption
                                 # 使用 figure 的 bbox 作为 caption_bbox（因为 caption 在 image_caption 中）
@@ -816,16 +873,23 @@ def has_keyword(text: str, keywords: Iterable[str]) -> bool:
     return any(k in t for k in keywords)
 
 
+_FIGURE_NUMBER_RE = re.compile(r"(?:Figure|Fig\.?|图|Table|表)\s*(\d+)", re.IGNORECASE)
+_FIGURE_PREFIX_LOOSE_RE = re.compile(r"(?:Figure|Fig\.?|图|Table|表)", re.IGNORECASE)
+_SECTION_HEAD_UPPER_RE = re.compile(r"[A-Z][A-Z\s]+$")
+_SECTION_HEAD_NUM_RE = re.compile(r"\d+\.\s+[A-Z]")
+
+
+@functools.lru_cache(maxsize=4096)
 def extract_figure_number(caption: str) -> int | None:
     """
     从 caption 文本中提取 figure 编号。
     例如："Figure 8: ..." -> 8, "Fig. 3:" -> 3
+    结果按 caption 字符串缓存：同一 caption 在多轮匹配中会被反复查询。
     """
     if not caption:
         return None
     # 匹配 Figure/Fig/图 + 数字
-    pattern = r"(?:Figure|Fig\.?|图|Table|表)\s*(\d+)"
-    match = re.search(pattern, caption, re.IGNORECASE)
+    match = _FIGURE_NUMBER_RE.search(caption)
     if match:
         try:
             return int(match.group(1))
@@ -834,70 +898,74 @@ def extract_figure_number(caption: str) -> int | None:
     return None
 
 
-def purify_caption(text: str) -> tuple[str, bool]:
+def purify_caption(text: str) -> tuple[str, bool, int | None]:
     """
     纯化 caption 文本，确保是可信的 caption（不是正文段落）。
     
-    返回: (purified_text, is_valid)
+    返回: (purified_text, is_valid, figure_number)
     - is_valid=True: caption 符合模式（包含 Figure X: 等）
     - is_valid=False: 不符合模式，可能是正文段落
+    - figure_number: 纯化后文本中的 figure 编号（与 extract_figure_number 结果一致），无效时为 None
     """
     if not text:
-        return "", False
+        return "", False, None
     
     text = text.strip()
     
     # 验证规则：必须包含 Figure|Fig|图|Table|表 + 编号
-    figure_pattern = r"(?:Figure|Fig\.?|图|Table|表)\s*\d+"
-    has_figure_prefix = bool(re.search(figure_pattern, text, re.IGNORECASE))
+    match = _FIGURE_NUMBER_RE.search(text)
     
     # 放宽限制：如果文本以 Figure 开头，认为是有效的 caption
-    if not has_figure_prefix:
+    if not match:
         # 检查是否以 Figure 相关词汇开头（不一定带编号）
-        loose_pattern = r"^(?:Figure|Fig\.?|图|Table|表)"
-        if not re.search(loose_pattern, text, re.IGNORECASE):
-            return "", False
+        if not _FIGURE_PREFIX_LOOSE_RE.match(text):
+            return "", False, None
     
     # 截断规则：从 Figure X: 开始，截断到合理位置
-    # 找到 Figure X: 的位置
-    match = re.search(figure_pattern, text, re.IGNORECASE)
     if match:
         start_pos = match.start()
         # 从 Figure X: 开始
         text = text[start_pos:]
     
     # 截断到：遇到空行 + 首字母大写且非续行，或超过 5 行
-    lines = text.split('\n')
+    # 用 str.find 逐行推进，截断后不再切分剩余文本（caption 后面常跟着整段正文）
     purified_lines = []
-    for i, line in enumerate(lines):
-        line = line.strip()
+    n = len(text)
+    pos = 0
+    while True:
+        end = text.find("\n", pos)
+        if end == -1:
+            end = n
+        line = text[pos:end].strip()
+        pos = end + 1
         if not line:
             # 遇到空行，检查下一行是否是新的段落开始
-            if i + 1 < len(lines):
-                next_line = lines[i + 1].strip()
+            if end < n:
+                next_end = text.find("\n", pos)
+                next_line = text[pos:next_end if next_end != -1 else n].strip()
                 if next_line and next_line[0].isupper() and len(next_line) > 10:
                     # 可能是新段落，截断到这里
                     break
-            continue
-        
         # 检查是否是 section heading 风格（全大写或编号标题）
-        if re.match(r'^[A-Z][A-Z\s]+$', line) or re.match(r'^\d+\.\s+[A-Z]', line):
+        elif _SECTION_HEAD_UPPER_RE.match(line) or _SECTION_HEAD_NUM_RE.match(line):
             # 可能是 section heading，截断
             break
-        
-        purified_lines.append(line)
-        
-        # 最多保留 5 行
-        if len(purified_lines) >= 5:
+        else:
+            purified_lines.append(line)
+            # 最多保留 5 行
+            if len(purified_lines) >= 5:
+                break
+        if end >= n:
             break
     
     purified = '\n'.join(purified_lines).strip()
     
-    # 再次验证：确保仍然包含 figure 模式
-    if re.search(figure_pattern, purified, re.IGNORECASE):
-        return purified, True
+    # 再次验证：确保仍然包含 figure 模式，同时取出编号
+    match = _FIGURE_NUMBER_RE.search(purified)
+    if match:
+        return purified, True, int(match.group(1))
     
-    return "", False
+    return "", False, None
 
 
 def _vertical_distance(bbox1: list[float], bbox2: list[float]) -> float:
@@ -935,11 +1003,12 @@ def _bbox_union(bboxes: list[list[float]]) -> list[float] | None:
     valid = [b for b in bboxes if isinstance(b, list) and len(b) == 4]
     if not valid:
         return None
-    x0 = min(float(b[0]) for b in valid)
-    y0 = min(float(b[1]) for b in valid)
-    x1 = max(float(b[2]) for b in valid)
-    y1 = max(float(b[3]) for b in valid)
-    return [x0, y0, x1, y1]
+    if len(valid) == 1:
+        b = valid[0]
+        return [float(b[0]), float(b[1]), float(b[2]), float(b[3])]
+    # 一次 zip 转置出四列，再各取 min/max，代替四次遍历 + 逐元素 float()
+    xs0, ys0, xs1, ys1 = zip(*valid)
+    return [float(min(xs0)), float(min(ys0)), float(max(xs1)), float(max(ys1))]
 
 
 def _bbox_vertical_gap(a: list[float], b: list[float]) -> float:
@@ -962,86 +1031,177 @@ def _should_merge_group_bboxes(a: list[float], b: list[float], page_w: float, pa
     """
     Aggressive merge heuristic: treat as connected if close in either direction with
     reasonable overlap/alignment. This favors not splitting a multi-panel figure.
+
+    a / b 为 _bbox_union 的输出（4 个 float 的 list），调用方已过滤 None，这里不再逐项校验和转换。
     """
-    if not (isinstance(a, list) and isinstance(b, list) and len(a) == 4 and len(b) == 4):
+    ax0, ay0, ax1, ay1 = a
+    bx0, by0, bx1, by1 = b
+    # 与 _bbox_vertical_gap / _bbox_horizontal_gap 相同，内联以省去函数调用
+    vgap = by0 - ay1 if by0 >= ay1 else (ay0 - by1 if ay0 >= by1 else 0.0)
+    hgap = bx0 - ax1 if bx0 >= ax1 else (ax0 - bx1 if ax0 >= bx1 else 0.0)
+    v_close = vgap <= max(1.0, float(page_h)) * 0.18
+    h_close = hgap <= max(1.0, float(page_w)) * 0.08
+    # 多数组对在两个方向上都离得很远，先做最便宜的排除
+    if not (v_close or h_close):
         return False
-    page_w = max(1.0, float(page_w))
-    page_h = max(1.0, float(page_h))
-    vgap = _bbox_vertical_gap(a, b)
-    hgap = _bbox_horizontal_gap(a, b)
-    hover = _horizontal_overlap(a, b)
-    ay0, ay1 = float(a[1]), float(a[3])
-    by0, by1 = float(b[1]), float(b[3])
+    # 两个方向都接近时直接合并（也覆盖了 vgap == hgap == 0 的接触/重叠情况）
+    if v_close and h_close:
+        return True
+    if v_close:
+        x_inter = max(0.0, min(ax1, bx1) - max(ax0, bx0))
+        return x_inter / max(1.0, min(ax1 - ax0, bx1 - bx0)) >= 0.12
+    # 只有水平方向接近：vgap 已超过 18%，自然也超过 10%，只需看纵向重叠
     y_inter = max(0.0, min(ay1, by1) - max(ay0, by0))
-    y_denom = max(1.0, min(ay1 - ay0, by1 - by0))
-    yover = y_inter / y_denom
+    return y_inter / max(1.0, min(ay1 - ay0, by1 - by0)) >= 0.12
+
+
+if _njit is not None:
+
+    @_njit(cache=True)
+    def _pairwise_merge_edges_jit(boxes, page_w, page_h):  # pragma: no cover - 依赖 numba
+        """_should_merge_group_bboxes 的逐对判定（boxes: (n, 4) float64），返回 (k, 2) 的边。"""
+        n = boxes.shape[0]
+        page_w = max(1.0, page_w)
+        page_h = max(1.0, page_h)
+        out = np.empty((n * (n - 1) // 2, 2), dtype=np.int64)
+        k = 0
+        for i in range(n):
+            ax0, ay0, ax1, ay1 = boxes[i, 0], boxes[i, 1], boxes[i, 2], boxes[i, 3]
+            for j in range(i + 1, n):
+                bx0, by0, bx1, by1 = boxes[j, 0], boxes[j, 1], boxes[j, 2], boxes[j, 3]
+                if by0 >= ay1:
+                    vgap = by0 - ay1
+                elif ay0 >= by1:
+                    vgap = ay0 - by1
+                else:
+                    vgap = 0.0
+                if bx0 >= ax1:
+                    hgap = bx0 - ax1
+                elif ax0 >= bx1:
+                    hgap = ax0 - bx1
+                else:
+                    hgap = 0.0
+                hover = max(0.0, min(ax1, bx1) - max(ax0, bx0)) / max(1.0, min(ax1 - ax0, bx1 - bx0))
+                yover = max(0.0, min(ay1, by1) - max(ay0, by0)) / max(1.0, min(ay1 - ay0, by1 - by0))
+                if (
+                    (vgap <= page_h * 0.18 and (hover >= 0.12 or hgap <= page_w * 0.08))
+                    or (hgap <= page_w * 0.08 and (yover >= 0.12 or vgap <= page_h * 0.10))
+                    or (vgap == 0.0 and hgap == 0.0)
+                ):
+                    out[k, 0] = i
+                    out[k, 1] = j
+                    k += 1
+        return out[:k]
+
+else:
+    _pairwise_merge_edges_jit = None
+
+
+# 组数少于该值时 numba/numpy 调用和数组构建的开销大于收益，直接走纯 Python 判定
+_JIT_MIN_GROUPS = 8
+
+
+def _pairwise_merge_mask_np(boxes, page_w: float, page_h: float):
+    """_should_merge_group_bboxes 的 numpy 广播版本，返回 (n, n) bool 矩阵（对称，对角线无意义）。"""
+    page_w = max(1.0, page_w)
+    page_h = max(1.0, page_h)
+    x0, y0, x1, y1 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    ax0, ay0, ax1, ay1 = x0[:, None], y0[:, None], x1[:, None], y1[:, None]
+    bx0, by0, bx1, by1 = x0[None, :], y0[None, :], x1[None, :], y1[None, :]
+    vgap = np.where(by0 >= ay1, by0 - ay1, np.where(ay0 >= by1, ay0 - by1, 0.0))
+    hgap = np.where(bx0 >= ax1, bx0 - ax1, np.where(ax0 >= bx1, ax0 - bx1, 0.0))
+    w = x1 - x0
+    h = y1 - y0
+    hover = np.maximum(0.0, np.minimum(ax1, bx1) - np.maximum(ax0, bx0)) / np.maximum(1.0, np.minimum(w[:, None], w[None, :]))
+    yover = np.maximum(0.0, np.minimum(ay1, by1) - np.maximum(ay0, by0)) / np.maximum(1.0, np.minimum(h[:, None], h[None, :]))
+    v_close = vgap <= page_h * 0.18
+    h_close = hgap <= page_w * 0.08
+    return (
+        (v_close & ((hover >= 0.12) | h_close))
+        | (h_close & ((yover >= 0.12) | (vgap <= page_h * 0.10)))
+        | ((vgap == 0.0) & (hgap == 0.0))
+    )
 
-    if vgap <= page_h * 0.18 and (hover >= 0.12 or hgap <= page_w * 0.08):
-        return True
-    if hgap <= page_w * 0.08 and (yover >= 0.12 or vgap <= page_h * 0.10):
-        return True
-    if vgap == 0.0 and hgap == 0.0:
-        return True
-    return False
 
+def _pairwise_merge_edges(gb: list[list[float] | None], page_w: float, page_h: float) -> list[tuple[int, int]]:
+    """
+    返回同页内所有需要合并的组下标对 (i, j)，i < j；bbox 为 None 的组不参与合并。
+    组数较多时优先使用 numba JIT 内核，其次 numpy 广播一次算出整张判定矩阵，
+    否则逐对调用 _should_merge_group_bboxes。
+    """
+    valid = [i for i, ub in enumerate(gb) if ub is not None]
+    if np is not None and len(valid) >= _JIT_MIN_GROUPS:
+        boxes = np.array([gb[i] for i in valid], dtype=np.float64)
+        if _pairwise_merge_edges_jit is not None:
+            edges = _pairwise_merge_edges_jit(boxes, float(page_w), float(page_h))
+        else:
+            edges = np.argwhere(np.triu(_pairwise_merge_mask_np(boxes, float(page_w), float(page_h)), k=1))
+        return [(valid[a], valid[b]) for a, b in edges.tolist()]
+
+    edges_py: list[tuple[int, int]] = []
+    for pos, i in enumerate(valid):
+        for j in valid[pos + 1:]:
+            if _should_merge_group_bboxes(gb[i], gb[j], page_w, page_h):
+                edges_py.append((i, j))
+    return edges_py
 
-def keep_entry(entry: dict[str, str], cfg: RenderConfig) -> tuple[bool, str]:
-    heading = entry.get("heading", "")
-    caption = entry.get("caption", "")
-    heading_pos = has_keyword(heading, cfg.heading_positive)
-    heading_neg = has_keyword(heading, cfg.heading_negative)
-    caption_pos = has_keyword(caption, cfg.caption_positive)
-    caption_neg = has_keyword(caption, cfg.caption_negative)
 
+def keep_entry(entry: dict[str, str], cfg: RenderConfig) -> tuple[bool, str]:
     if not cfg.results_only:
         return True, "all_figures"
-    if caption_pos:
+    # heading / caption 各只小写一次，keyword 使用 cfg 中预先小写的 tuple，按需求值
+    heading = entry.get("heading", "").lower()
+    caption = entry.get("caption", "").lower()
+    if any(k in caption for k in cfg.caption_positive_lc):
         return True, "caption_positive"
-    if heading_pos and not caption_neg:
+    if any(k in heading for k in cfg.heading_positive_lc) and not any(k in caption for k in cfg.caption_negative_lc):
         return True, "heading_positive"
-    if heading_neg and not caption_pos:
+    if any(k in heading for k in cfg.heading_negative_lc):
         return False, "heading_negative"
     return False, "no_results_signal"
 
 
 def load_caption_font(cfg: RenderConfig):
-    if cfg.caption_font_path:
-        p = Path(cfg.caption_font_path)
+    return _load_caption_font_cached(cfg.caption_font_path, cfg.caption_font_size)
+
+
+_IS_WINDOWS = os.name == "nt"
+# 按优先级尝试的 Windows 常见字体；只在导入时检查一次是否存在
+_WINDOWS_FONT_DIR = Path("C:/Windows/Fonts")
+_WINDOWS_FONT_NAMES = (
+    "arial.ttf", "Arial.ttf", "calibri.ttf", "Calibri.ttf",
+    "tahoma.ttf", "Tahoma.ttf", "segoeui.ttf", "SegoeUI.ttf",
+)
+_SYSTEM_FONT_PATHS: tuple[str, ...] = (
+    tuple(str(_WINDOWS_FONT_DIR / name) for name in _WINDOWS_FONT_NAMES if (_WINDOWS_FONT_DIR / name).exists())
+    if _IS_WINDOWS and _WINDOWS_FONT_DIR.exists()
+    else ()
+)
+_FALLBACK_FONT_NAMES = ("DejaVuSans.ttf", "arial.ttf", "Arial.ttf", "calibri.ttf", "simhei.ttf", "simsun.ttc")
+
+
+@functools.lru_cache(maxsize=16)
+def _load_caption_font_cached(font_path: str, font_size: int):
+    """按 (字体路径, 字号) 缓存字体对象，避免每次渲染 caption 都重新查找和解析字体文件。"""
+    if font_path:
+        p = Path(font_path)
         if p.is_file():
             try:
-                return ImageFont.truetype(str(p), cfg.caption_font_size)
+                return ImageFont.truetype(str(p), font_size)
             except Exception:
                 pass
     
-    # 尝试系统字体路径（Windows）
-    system_font_paths = []
-    if os.name == 'nt':  # Windows
-        windows_fonts = Path("C:/Windows/Fonts")
-        if windows_fonts.exists():
-            # 按优先级尝试常见字体
-            system_font_paths = [
-                windows_fonts / "arial.ttf",
-                windows_fonts / "Arial.ttf",
-                windows_fonts / "calibri.ttf",
-                windows_fonts / "Calibri.ttf",
-                windows_fonts / "tahoma.ttf",
-                windows_fonts / "Tahoma.ttf",
-                windows_fonts / "segoeui.ttf",
-                windows_fonts / "SegoeUI.ttf",
-            ]
-    
-    # 尝试系统字体路径
-    for font_path in system_font_paths:
-        if font_path.exists():
-            try:
-                return ImageFont.truetype(str(font_path), cfg.caption_font_size)
-            except Exception:
-                continue
+    # 尝试系统字体路径（Windows，导入时已过滤为存在的文件）
+    for font_file in _SYSTEM_FONT_PATHS:
+        try:
+            return ImageFont.truetype(font_file, font_size)
+        except Exception:
+            continue
     
     # 尝试直接使用字体名称（PIL 可能会在系统路径中查找）
-    for fallback in ("DejaVuSans.ttf", "arial.ttf", "Arial.ttf", "calibri.ttf", "simhei.ttf", "simsun.ttc"):
+    for fallback in _FALLBACK_FONT_NAMES:
         try:
-            return ImageFont.truetype(fallback, cfg.caption_font_size)
+            return ImageFont.truetype(fallback, font_size)
         except Exception:
             continue
     
@@ -1054,19 +1214,23 @@ def wrap_lines(text: str, font, max_width: int, max_lines: int) -> list[str]:
     words = text.replace("\n", " ").split()
     if not words:
         return []
-    img = Image.new("RGB", (max_width, 1))
-    draw = ImageDraw.Draw(img)
+    # 逐词累加宽度，而不是每加一个词就重新 join 整行再测量
+    space_w = font.getlength(" ")
     lines: list[str] = []
     current: list[str] = []
+    current_w = 0.0
     truncated = False
     for w in words:
-        test = " ".join(current + [w])
-        if draw.textbbox((0, 0), test, font=font)[2] <= max_width:
+        word_w = font.getlength(w)
+        test_w = current_w + space_w + word_w if current else word_w
+        if test_w <= max_width:
             current.append(w)
+            current_w = test_w
             continue
         if current:
             lines.append(" ".join(current))
         current = [w]
+        current_w = word_w
         if len(lines) >= max_lines:
             truncated = True
             break
@@ -1078,47 +1242,135 @@ def wrap_lines(text: str, font, max_width: int, max_lines: int) -> list[str]:
     if truncated and lines:
         last = lines[-1]
         ellipsis = "..."
-        while draw.textbbox((0, 0), last + ellipsis, font=font)[2] > max_width and last:
+        while font.getlength(last + ellipsis) > max_width and last:
             last = last[:-1].rstrip()
         lines[-1] = last + ellipsis if last else ellipsis
     return lines
 
 
-def render_caption_bar(text: str, width: int, cfg: RenderConfig) -> Image.Image | None:
-    if not text:
-        return None
-    font = load_caption_font(cfg)
-    max_width = max(1, width - cfg.caption_bar_padding * 2)
-    lines = wrap_lines(text, font, max_width, cfg.caption_max_lines)
+@functools.lru_cache(maxsize=1024)
+def _measure_caption_bar_cached(
+    text: str, width: int, font_path: str, font_size: int, max_lines: int, bar_padding: int
+) -> tuple[int, tuple[str, ...], tuple[int, ...]]:
+    font = _load_caption_font_cached(font_path, font_size)
+    max_width = max(1, width - bar_padding * 2)
+    lines = wrap_lines(text, font, max_width, max_lines)
     if not lines:
-        return None
-    img = Image.new("RGB", (width, 1))
-    draw = ImageDraw.Draw(img)
-    line_heights = [draw.textbbox((0, 0), line, font=font)[3] for line in lines]
+        return 0, (), ()
+    line_heights = tuple(font.getbbox(line)[3] for line in lines)
     text_h = sum(line_heights) + (len(lines) - 1) * 2
-    bar_h = text_h + cfg.caption_bar_padding * 2
-    bar = Image.new("RGB", (width, bar_h), cfg.caption_bg)
-    draw = ImageDraw.Draw(bar)
-    y = cfg.caption_bar_padding
+    return text_h + bar_padding * 2, tuple(lines), line_heights
+
+
+def measure_caption_bar(text: str, width: int, cfg: RenderConfig) -> tuple[int, tuple[str, ...], tuple[int, ...]]:
+    """
+    计算 caption bar 的排版结果（不分配图像）。
+    返回: (bar_height, lines, line_heights)；无可渲染文本时 bar_height 为 0。
+    结果按 (text, width, 字体, 行数, padding) 缓存，尺寸探测与最终渲染共用同一次换行计算。
+    """
+    if not text:
+        return 0, (), ()
+    return _measure_caption_bar_cached(
+        text, width, cfg.caption_font_path, cfg.caption_font_size, cfg.caption_max_lines, cfg.caption_bar_padding
+    )
+
+
+def measure_caption_height(text: str, width: int, cfg: RenderConfig) -> int:
+    """caption bar 的高度（无可渲染文本时为 0），仅用于排版探测，不分配图像。"""
+    return measure_caption_bar(text, width, cfg)[0]
+
+
+def _draw_caption_lines(
+    draw: ImageDraw.ImageDraw,
+    xy: tuple[int, int],
+    lines: tuple[str, ...],
+    line_heights: tuple[int, ...],
+    font,
+    cfg: RenderConfig,
+) -> None:
+    x, y = xy
+    ty = y + cfg.caption_bar_padding
     for line, lh in zip(lines, line_heights):
-        draw.text((cfg.caption_bar_padding, y), line, fill=cfg.caption_color, font=font)
-        y += lh + 2
+        draw.text((x + cfg.caption_bar_padding, ty), line, fill=cfg.caption_color, font=font)
+        ty += lh + 2
+
+
+def _caption_lines_fit(
+    draw: ImageDraw.ImageDraw,
+    lines: tuple[str, ...],
+    line_heights: tuple[int, ...],
+    width: int,
+    bar_h: int,
+    font,
+    cfg: RenderConfig,
+) -> bool:
+    """各行文字的实际包围盒是否都落在 (0, 0, width, bar_h) 的 bar 内（无法断开的长词可能超出）。"""
+    ty = cfg.caption_bar_padding
+    for line, lh in zip(lines, line_heights):
+        left, top, right, bottom = draw.textbbox((cfg.caption_bar_padding, ty), line, font=font)
+        if left < 0 or top < 0 or right > width or bottom > bar_h:
+            return False
+        ty += lh + 2
+    return True
+
+
+def draw_caption_bar_onto(
+    canvas: Image.Image,
+    xy: tuple[int, int],
+    lines: tuple[str, ...],
+    line_heights: tuple[int, ...],
+    width: int,
+    bar_h: int,
+    cfg: RenderConfig,
+) -> None:
+    """
+    把 caption bar 直接画到 canvas 的 xy 处（先填背景色再写字），省去单独分配 bar 图像再 paste。
+    ImageDraw 没有裁剪区域：有文字超出 bar 时改为先画到独立的 bar 图像再 paste，
+    超出部分被裁掉，不会画进相邻的 tile。
+    """
+    font = load_caption_font(cfg)
+    draw = ImageDraw.Draw(canvas)
+    if not _caption_lines_fit(draw, lines, line_heights, width, bar_h, font, cfg):
+        canvas.paste(draw_caption_bar(lines, line_heights, width, bar_h, cfg), xy)
+        return
+    x, y = xy
+    canvas.paste(cfg.caption_bg, (x, y, x + width, y + bar_h))
+    _draw_caption_lines(draw, xy, lines, line_heights, font, cfg)
+
+
+def draw_caption_bar(lines: tuple[str, ...], line_heights: tuple[int, ...], width: int, bar_h: int, cfg: RenderConfig) -> Image.Image:
+    bar = Image.new("RGB", (width, bar_h), cfg.caption_bg)
+    _draw_caption_lines(ImageDraw.Draw(bar), (0, 0), lines, line_heights, load_caption_font(cfg), cfg)
     return bar
 
 
+def render_caption_bar(text: str, width: int, cfg: RenderConfig) -> Image.Image | None:
+    bar_h, lines, line_heights = measure_caption_bar(text, width, cfg)
+    if not lines:
+        return None
+    return draw_caption_bar(lines, line_heights, width, bar_h, cfg)
+
+
 def is_text_like(tile: Image.Image, cfg: RenderConfig) -> bool:
-    small = tile.resize((256, 256), Image.LANCZOS)
-    gray = small.convert("L")
-    hist = gray.histogram()
-    total = sum(hist)
+    # 先转灰度再缩放（单通道，重采样量减为 1/3）；reducing_gap 先做整数倍 box 缩小再 LANCZOS，质量基本不变
+    gray = tile.convert("L").resize((256, 256), _RESAMPLE_LANCZOS, reducing_gap=3.0)
+    total = gray.width * gray.height
     if total == 0:
         return True
-    white = sum(hist[245:])
-    nonwhite_ratio = 1.0 - white / float(total)
-    edges = gray.filter(ImageFilter.FIND_EDGES)
-    edge_mean = ImageStat.Stat(edges).mean[0] / 255.0
+    if np is not None:
+        nonwhite_ratio = np.count_nonzero(np.asarray(gray) < 245) / float(total)
+    else:
+        nonwhite_ratio = 1.0 - sum(gray.histogram()[245:]) / float(total)
     if nonwhite_ratio < cfg.nonwhite_min_ratio:
         return True
+    # 下面两条规则都要求 nonwhite_ratio < 0.2，否则不必再做边缘检测
+    if nonwhite_ratio >= 0.2:
+        return False
+    edges = gray.filter(ImageFilter.FIND_EDGES)
+    if np is not None:
+        edge_mean = float(np.asarray(edges).mean()) / 255.0
+    else:
+        edge_mean = ImageStat.Stat(edges).mean[0] / 255.0
     if edge_mean > cfg.edge_density_max and nonwhite_ratio < 0.2:
         return True
     if edge_mean > cfg.textlike_edge_max and nonwhite_ratio < 0.12:
@@ -1126,7 +1378,9 @@ def is_text_like(tile: Image.Image, cfg: RenderConfig) -> bool:
     return False
 
 
-def compose_figure_group(group: dict, paper_dir: Path, cfg: RenderConfig) -> tuple[Image.Image, str]:
+def compose_figure_group(
+    group: dict, paper_dir: Path, cfg: RenderConfig, max_size: tuple[int, int] | None = None
+) -> tuple[Image.Image, str]:
     """
     将 figure group 内的子图拼接成一个 tile。
     
@@ -1134,6 +1388,7 @@ def compose_figure_group(group: dict, paper_dir: Path, cfg: RenderConfig) -> tup
     - group: 包含 images 列表（每个 image 是 entry_fig 字典）
     - paper_dir: 论文目录
     - cfg: 配置
+    - max_size: 可选的尺寸上界（通常是页面画布大小），JPEG 会按此用 draft 模式降采样解码
     
     输出：
     - (composed_image, caption_text): 拼接后的图片（纯图，不含caption）和 caption 文本
@@ -1165,9 +1420,7 @@ def compose_figure_group(group: dict, paper_dir: Path, cfg: RenderConfig) -> tup
         if not img_path.exists():
             raise FileNotFoundError(f"Image not found: {img_path}")
         
-        fig = Image.open(img_path).convert("RGB")
-        fig = strip_embedded_caption(fig, entry, cfg)
-        fig = add_image_padding(fig, cfg)  # 添加白边防止边缘内容被裁剪
+        fig = load_processed_image(img_path, entry, cfg, max_size)
         caption = group.get("caption", "")
         return fig, caption
     
@@ -1187,9 +1440,8 @@ def compose_figure_group(group: dict, paper_dir: Path, cfg: RenderConfig) -> tup
             continue  # 跳过不存在的图片
         
         try:
-            fig = Image.open(img_path).convert("RGB")
-            fig = strip_embedded_caption(fig, entry, cfg)
-            fig = add_image_padding(fig, cfg)  # 添加白边防止边缘内容被裁剪
+            # 子图先不加白边：拼接画布本身是白底，最后对整张拼图统一加一次
+            fig = load_processed_image(img_path, entry, cfg, max_size, pad=False)
             subfigs.append(fig)
             subfig_sizes.append(fig.size)
         except Exception:
@@ -1200,7 +1452,7 @@ def compose_figure_group(group: dict, paper_dir: Path, cfg: RenderConfig) -> tup
     
     if len(subfigs) == 1:
         caption = group.get("caption", "")
-        return subfigs[0], caption
+        return add_image_padding(subfigs[0], cfg), caption
     
     # 判断布局方式
     if len(subfigs) == 2:
@@ -1219,8 +1471,8 @@ def compose_figure_group(group: dict, paper_dir: Path, cfg: RenderConfig) -> tup
             new_h1 = int(h1 * scale1)
             new_h2 = int(h2 * scale2)
             
-            img1 = subfigs[0].resize((target_w, new_h1), Image.Resampling.LANCZOS)
-            img2 = subfigs[1].resize((target_w, new_h2), Image.Resampling.LANCZOS)
+            img1 = _resize_image(subfigs[0], (target_w, new_h1))
+            img2 = _resize_image(subfigs[1], (target_w, new_h2))
             
             spacing = 10  # 子图之间的间距
             total_h = new_h1 + spacing + new_h2
@@ -1229,7 +1481,7 @@ def compose_figure_group(group: dict, paper_dir: Path, cfg: RenderConfig) -> tup
             composed.paste(img2, (0, new_h1 + spacing))
             
             caption = group.get("caption", "")
-            return composed, caption
+            return add_image_padding(composed, cfg), caption
         
         elif height_sim > 0.8:
             # 高度相近，横向排列（左右布局）
@@ -1240,8 +1492,8 @@ def compose_figure_group(group: dict, paper_dir: Path, cfg: RenderConfig) -> tup
             new_w1 = int(w1 * scale1)
             new_w2 = int(w2 * scale2)
             
-            img1 = subfigs[0].resize((new_w1, target_h), Image.Resampling.LANCZOS)
-            img2 = subfigs[1].resize((new_w2, target_h), Image.Resampling.LANCZOS)
+            img1 = _resize_image(subfigs[0], (new_w1, target_h))
+            img2 = _resize_image(subfigs[1], (new_w2, target_h))
             
             spacing = 10  # 子图之间的间距
             total_w = new_w1 + spacing + new_w2
@@ -1250,7 +1502,7 @@ def compose_figure_group(group: dict, paper_dir: Path, cfg: RenderConfig) -> tup
             composed.paste(img2, (new_w1 + spacing, 0))
             
             caption = group.get("caption", "")
-            return composed, caption
+            return add_image_padding(composed, cfg), caption
     
     # 多张图片：使用简单的网格布局
     # 计算合适的列数（尽量接近正方形）
@@ -1269,7 +1521,7 @@ def compose_figure_group(group: dict, paper_dir: Path, cfg: RenderConfig) -> tup
     for fig, (w, h) in zip(subfigs, subfig_sizes):
         scale = target_h / h if h > 0 else 1.0
         new_w = int(w * scale)
-        scaled_img = fig.resize((new_w, target_h), Image.Resampling.LANCZOS)
+        scaled_img = _resize_image(fig, (new_w, target_h))
         scaled_images.append(scaled_img)
         scaled_widths.append(new_w)
     
@@ -1301,7 +1553,70 @@ def compose_figure_group(group: dict, paper_dir: Path, cfg: RenderConfig) -> tup
         y_offset += target_h + 10  # 10px 行间距
     
     caption = group.get("caption", "")
-    return composed, caption
+    return add_image_padding(composed, cfg), caption
+
+
+def _bbox_key(bbox) -> tuple | None:
+    # strip_embedded_caption 只认 list 形式的 bbox，其余一律视为缺失
+    return tuple(bbox) if isinstance(bbox, list) else None
+
+
+def load_processed_image(
+    img_path: Path, entry: dict, cfg: RenderConfig, max_size: tuple[int, int] | None = None, pad: bool = True
+) -> Image.Image:
+    """
+    加载图片并依次做 strip_embedded_caption / add_image_padding。
+    结果按 (路径, mtime, entry 中影响裁剪的字段, 相关 cfg, max_size) 缓存，同一张图被多个 group 引用时只解码一次。
+    pad=False 时跳过 add_image_padding（由调用方对拼接结果统一加白边）。
+    max_size 给定时，JPEG 用 draft 模式在 DCT 阶段按 1/2~1/8 缩小解码（结果不小于 max_size）。
+    返回的图片是共享对象，调用方不能原地修改。
+    """
+    return _load_processed_image_cached(
+        str(img_path),
+        os.stat(img_path).st_mtime_ns,
+        entry.get("caption", "").strip(),
+        _bbox_key(entry.get("figure_bbox")),
+        _bbox_key(entry.get("caption_bbox")),
+        cfg.remove_embedded_caption,
+        cfg.image_padding_ratio if pad else 0.0,
+        tuple(max_size) if max_size else None,
+    )
+
+
+@functools.lru_cache(maxsize=16)  # 解码后的整图较大，只保留少量
+def _load_processed_image_cached(
+    img_path: str,
+    mtime_ns: int,
+    caption: str,
+    figure_bbox: tuple | None,
+    caption_bbox: tuple | None,
+    remove_embedded_caption: bool,
+    image_padding_ratio: float,
+    draft_size: tuple[int, int] | None,
+) -> Image.Image:
+    cfg = RenderConfig(remove_embedded_caption=remove_embedded_caption, image_padding_ratio=image_padding_ratio)
+    entry = {
+        "caption": caption,
+        "figure_bbox": list(figure_bbox) if figure_bbox is not None else None,
+        "caption_bbox": list(caption_bbox) if caption_bbox is not None else None,
+    }
+    im = Image.open(img_path)
+    if draft_size and im.format == "JPEG":
+        im.draft("RGB", draft_size)
+    fig = im.convert("RGB")
+    fig = strip_embedded_caption(fig, entry, cfg)
+    fig = add_image_padding(fig, cfg)  # 添加白边防止边缘内容被裁剪
+    return fig
+
+
+def _resize_image(img: Image.Image, size: tuple[int, int]) -> Image.Image:
+    """
+    LANCZOS 缩放；尺寸不变时直接返回原图（paste 本身会拷贝像素）。
+    reducing_gap 让大倍率缩小先走整数倍 box 缩小，再做 LANCZOS，质量基本不变。
+    """
+    if img.size == tuple(size):
+        return img
+    return img.resize(size, _RESAMPLE_LANCZOS, reducing_gap=2.0)
 
 
 def add_image_padding(fig: Image.Image, cfg: RenderConfig) -> Image.Image:
@@ -1343,26 +1658,27 @@ def strip_embedded_caption(fig: Image.Image, entry: dict, cfg: RenderConfig) ->
     
     # 如果有明确的caption bbox，精确去除
     if isinstance(fig_bbox, list) and isinstance(cap_bbox, list) and len(fig_bbox) == 4 and len(cap_bbox) == 4:
-        fig_w = max(1.0, fig_bbox[2] - fig_bbox[0])
-        fig_h = max(1.0, fig_bbox[3] - fig_bbox[1])
-        scale_x = fig.width / fig_w
-        scale_y = fig.height / fig_h
-        x0 = int(max(0.0, (cap_bbox[0] - fig_bbox[0]) * scale_x))
+        # 先只算纵向坐标（去除与否只取决于它），确定要去除时再算横向坐标
+        scale_y = fig.height / max(1.0, fig_bbox[3] - fig_bbox[1])
         y0 = int(max(0.0, (cap_bbox[1] - fig_bbox[1]) * scale_y))
-        x1 = int(min(fig.width, (cap_bbox[2] - fig_bbox[0]) * scale_x))
         y1 = int(min(fig.height, (cap_bbox[3] - fig_bbox[1]) * scale_y))
-        if x1 > x0 and y1 > y0:
-            # 如果有外部caption，必须去除图片中的caption（避免重复）
-            # 即使没有外部caption，如果caption在底部且高度较小，也应该去除（可能是正文）
-            caption_height_ratio = (y1 - y0) / fig.height
-            if has_external_caption or (y0 > fig.height * 0.85 and caption_height_ratio < 0.15):
-                # 去除caption区域，确保tile是纯图
-                masked = fig.copy()
-                draw = ImageDraw.Draw(masked)
-                draw.rectangle([x0, y0, x1, y1], fill="white")
-                return masked
+        if y1 <= y0:
+            return fig
+        # 如果有外部caption，必须去除图片中的caption（避免重复）
+        # 即使没有外部caption，如果caption在底部且高度较小，也应该去除（可能是正文）
+        caption_height_ratio = (y1 - y0) / fig.height
+        if not (has_external_caption or (y0 > fig.height * 0.85 and caption_height_ratio < 0.15)):
             # 如果caption不在最底部或高度较大，可能是复合图的总caption，不去除
             return fig
+        scale_x = fig.width / max(1.0, fig_bbox[2] - fig_bbox[0])
+        x0 = int(max(0.0, (cap_bbox[0] - fig_bbox[0]) * scale_x))
+        x1 = int(min(fig.width, (cap_bbox[2] - fig_bbox[0]) * scale_x))
+        if x1 <= x0:
+            return fig
+        # 去除caption区域，确保tile是纯图（与 rectangle 一样包含右/下边界）
+        masked = fig.copy()
+        masked.paste("white", (x0, y0, min(x1 + 1, fig.width), min(y1 + 1, fig.height)))
+        return masked
     
     # 没有明确的bbox时，不要盲目裁剪！
     # 盲目裁剪会切掉图表的轴标签、图例等重要信息
@@ -1374,6 +1690,17 @@ def choose_columns(tiles: list[Image.Image], cfg: RenderConfig) -> int:
     return max(1, cfg.masonry_columns)
 
 
+@dataclass(slots=True)
+class _PlannedTile:
+    """pack_tiles_hybrid / pack_tiles_masonry 中一个待渲染 tile 的排版计划（坐标相对内容区左上角）。"""
+    tile: Image.Image
+    caption: str
+    x: float
+    y: float
+    w: float
+    h: float
+
+
 def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size: tuple[int, int], cfg: RenderConfig):
     """
     改进的hybrid布局：按高度装箱分页，而不是固定tiles_per_page。
@@ -1388,6 +1715,8 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
     available_w = max(1, canvas_w - 2 * padding)
     available_h = max(1, canvas_h - 2 * padding)
     col_w = (available_w - gutter) / 2.0
+    # 如果 caption_image_spacing 为 0，使用与图片相同的 gutter 间距
+    caption_spacing = cfg.caption_image_spacing if cfg.caption_image_spacing > 0 else gutter
 
     def scaled_size(img: Image.Image, target_w: float) -> tuple[int, int]:
         """计算缩放后尺寸，确保宽度不超过target_w"""
@@ -1403,7 +1732,7 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
 
     pages: list[Image.Image] = []
     stats: list[dict[str, float]] = []
-    current: list[dict] = []
+    current: list[_PlannedTile] = []
     used_h = 0.0
 
     def flush_page():
@@ -1417,15 +1746,14 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
         if len(current) > 0:
             # 找到最后一个元素的位置和高度
             last_item = current[-1]
-            last_y = last_item["y"]
-            last_h = last_item["h"]
-            last_caption = last_item.get("caption", "")
-            caption_spacing = cfg.caption_image_spacing if cfg.caption_image_spacing > 0 else gutter
+            last_y = last_item.y
+            last_h = last_item.h
+            last_caption = last_item.caption
             last_caption_h = 0
             if last_caption:
-                temp_bar = render_caption_bar(last_caption, int(last_item["w"]), cfg)
-                if temp_bar:
-                    last_caption_h = temp_bar.height + caption_spacing
+                bar_h = measure_caption_height(last_caption, int(last_item.w), cfg)
+                if bar_h:
+                    last_caption_h = bar_h + caption_spacing
             total_content_height = last_y + last_h + last_caption_h
         
         # 对于单图页面，如果内容高度小于可用高度，垂直居中
@@ -1440,29 +1768,26 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
                 vertical_offset = max(0.0, vertical_offset)
         
         for p in current:
-            tile = p["tile"]
-            caption = p.get("caption", "")
-            resample = Image.Resampling.LANCZOS if hasattr(Image, "Resampling") else getattr(Image, "LANCZOS", getattr(Image, "BICUBIC", 3))
+            tile = p.tile
+            caption = p.caption
             # 计算实际渲染位置和尺寸（应用垂直居中偏移）
-            x = int(p["x"] + padding)
-            y = int(p["y"] + padding + vertical_offset)
+            x = int(p.x + padding)
+            y = int(p.y + padding + vertical_offset)
             x_final = max(0, x)
             y_final = max(0, y)
-            w_plan = int(p["w"])
-            h_plan = int(p["h"])
+            w_plan = int(p.w)
+            h_plan = int(p.h)
             
             # 关键原则：图像区域和caption区域永远是两个独立排版块
             # caption只在图外占位，绝不画进图里
             
             # 计算caption所需空间（使用计划宽度，确保文本完整）
             caption_space = 0
-            # 如果 caption_image_spacing 为 0，使用与图片相同的 gutter 间距
-            caption_spacing = cfg.caption_image_spacing if cfg.caption_image_spacing > 0 else gutter
             if caption:
-                temp_bar = render_caption_bar(caption, w_plan, cfg)
-                if temp_bar:
+                bar_h = measure_caption_height(caption, w_plan, cfg)
+                if bar_h:
                     # caption是独立的块，需要完整的空间（高度+间距）
-                    caption_space = temp_bar.height + caption_spacing
+                    caption_space = bar_h + caption_spacing
             
             # 计算图片实际可渲染尺寸（考虑边界和caption空间）
             # 图片和caption是独立的块，图片不能占用caption的空间
@@ -1487,7 +1812,7 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
             
             # 渲染图片区域（独立的排版块）
             if w_final > 0 and h_final > 0:
-                tile_img = tile.resize((w_final, h_final), resample)
+                tile_img = _resize_image(tile, (w_final, h_final))
                 page.paste(tile_img, (x_final, y_final))
                 content_area += float(w_final) * float(h_final)
                 
@@ -1495,37 +1820,41 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
                 if caption:
                     # 使用计划宽度w_plan，确保caption文本有足够的宽度显示
                     caption_width = w_plan
-                    bar = render_caption_bar(caption, caption_width, cfg)
+                    # 只取排版信息（已缓存），文字在确定位置后直接画到 page 上，不单独分配 bar 图像
+                    bar_h, bar_lines, bar_line_heights = measure_caption_bar(caption, caption_width, cfg)
+                    bar = bool(bar_lines)
                     if bar:
                         # caption位置：图片下方 + 间距（caption绝不画进图里）
                         caption_y = y_final + h_final + caption_spacing
                         caption_x = x_final
                         
                         # 确保caption不会超出画布，避免覆盖下方内容
-                        if caption_y + bar.height > canvas_h:
+                        if caption_y + bar_h > canvas_h:
                             # caption会超出画布，需要调整
                             # 方案：如果还有空间，向上调整caption位置（减少图片高度）
-                            max_caption_y = canvas_h - bar.height
+                            max_caption_y = canvas_h - bar_h
                             if max_caption_y > y_final:
                                 # 可以向上调整，减少图片高度，为caption留出空间
                                 h_final = max(1, max_caption_y - y_final - caption_spacing)
                                 # 重新渲染图片（调整后的高度）
-                                tile_img = tile.resize((w_final, h_final), resample)
+                                tile_img = _resize_image(tile, (w_final, h_final))
                                 page.paste(tile_img, (x_final, y_final))
                                 caption_y = y_final + h_final + caption_spacing
                             else:
                                 # 没有足够空间，不渲染caption（避免覆盖）
-                                bar = None
+                                bar = False
                         
                         if bar:
                             # 边界保护：如果caption bar超出右边界，调整x坐标
-                            if caption_x + bar.width > canvas_w:
-                                caption_x = max(0, canvas_w - bar.width)
+                            if caption_x + caption_width > canvas_w:
+                                caption_x = max(0, canvas_w - caption_width)
                             
                             # 确保caption在画布内才渲染（caption是独立的块）
-                            if caption_y + bar.height <= canvas_h and caption_x + bar.width <= canvas_w:
-                                page.paste(bar, (caption_x, caption_y))
-                                content_area += float(bar.width) * float(bar.height)
+                            if caption_y + bar_h <= canvas_h and caption_x + caption_width <= canvas_w:
+                                draw_caption_bar_onto(
+                                    page, (caption_x, caption_y), bar_lines, bar_line_heights, caption_width, bar_h, cfg
+                                )
+                                content_area += float(caption_width) * float(bar_h)
         fill_ratio = content_area / float(canvas_w * canvas_h) if canvas_w * canvas_h else 0.0
         pages.append(page)
         stats.append({"tiles": len(current), "fill_ratio": fill_ratio, "height_used": used_h})
@@ -1540,11 +1869,10 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
             if pending_left is not None:
                 w, h = scaled_size(pending_left, col_w)
                 bar_h = 0
-                caption_spacing = cfg.caption_image_spacing if cfg.caption_image_spacing > 0 else gutter
                 if pending_left_caption:
-                    bar = render_caption_bar(pending_left_caption, int(w), cfg)
-                    if bar:
-                        bar_h = bar.height + caption_spacing  # caption是独立的块，需要完整空间
+                    cap_h = measure_caption_height(pending_left_caption, int(w), cfg)
+                    if cap_h:
+                        bar_h = cap_h + caption_spacing  # caption是独立的块，需要完整空间
                 total_h = h + bar_h  # 图片高度 + caption高度（独立块）
                 # 按高度装箱：如果放不下就换页
                 # 关键修复：确保包括caption在内的总高度不会超出可用空间
@@ -1553,7 +1881,7 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
                     current.clear()
                     used_h = 0.0
                 x = max(0.0, (available_w - w) / 2.0)  # 确保x >= 0
-                current.append({"tile": pending_left, "caption": pending_left_caption, "x": x, "y": used_h, "w": w, "h": h})
+                current.append(_PlannedTile(pending_left, pending_left_caption, x, used_h, w, h))
                 used_h += total_h + gutter
                 pending_left = None
                 pending_left_caption = ""
@@ -1562,11 +1890,10 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
             # 确保宽度不超过available_w
             w = min(w, int(available_w))
             bar_h = 0
-            caption_spacing = cfg.caption_image_spacing if cfg.caption_image_spacing > 0 else gutter
             if caption:
-                bar = render_caption_bar(caption, int(w), cfg)
-                if bar:
-                    bar_h = bar.height + caption_spacing  # caption是独立的块，需要完整空间
+                cap_h = measure_caption_height(caption, int(w), cfg)
+                if cap_h:
+                    bar_h = cap_h + caption_spacing  # caption是独立的块，需要完整空间
             total_h = h + bar_h  # 图片高度 + caption高度（独立块）
             # 按高度装箱：如果放不下就换页
             # 关键修复：确保包括caption在内的总高度不会超出可用空间
@@ -1574,7 +1901,7 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
                 flush_page()
                 current.clear()
                 used_h = 0.0
-            current.append({"tile": tile, "caption": caption, "x": 0.0, "y": used_h, "w": w, "h": h})
+            current.append(_PlannedTile(tile, caption, 0.0, used_h, w, h))
             used_h += total_h + gutter
         else:
             # 窄图：两列布局
@@ -1588,16 +1915,15 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
                 w1 = min(w1, int(col_w))
                 w2 = min(w2, int(col_w))
                 bar_h1 = 0
-                caption_spacing = cfg.caption_image_spacing if cfg.caption_image_spacing > 0 else gutter
                 if pending_left_caption:
-                    bar1 = render_caption_bar(pending_left_caption, int(w1), cfg)
-                    if bar1:
-                        bar_h1 = bar1.height + caption_spacing  # caption是独立的块
+                    cap_h1 = measure_caption_height(pending_left_caption, int(w1), cfg)
+                    if cap_h1:
+                        bar_h1 = cap_h1 + caption_spacing  # caption是独立的块
                 bar_h2 = 0
                 if caption:
-                    bar2 = render_caption_bar(caption, int(w2), cfg)
-                    if bar2:
-                        bar_h2 = bar2.height + caption_spacing  # caption是独立的块
+                    cap_h2 = measure_caption_height(caption, int(w2), cfg)
+                    if cap_h2:
+                        bar_h2 = cap_h2 + caption_spacing  # caption是独立的块
                 # 行高取两列中较大的（图片+caption，都是独立块）
                 row_h = max(h1 + bar_h1, h2 + bar_h2)
                 # 按高度装箱：如果放不下就换页
@@ -1606,8 +1932,8 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
                     flush_page()
                     current.clear()
                     used_h = 0.0
-                current.append({"tile": pending_left, "caption": pending_left_caption, "x": 0.0, "y": used_h, "w": w1, "h": h1})
-                current.append({"tile": tile, "caption": caption, "x": col_w + gutter, "y": used_h, "w": w2, "h": h2})
+                current.append(_PlannedTile(pending_left, pending_left_caption, 0.0, used_h, w1, h1))
+                current.append(_PlannedTile(tile, caption, col_w + gutter, used_h, w2, h2))
                 used_h += row_h + gutter
                 pending_left = None
                 pending_left_caption = ""
@@ -1617,11 +1943,10 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
         w, h = scaled_size(pending_left, col_w)
         w = min(w, int(col_w))  # 确保宽度不超过列宽
         bar_h = 0
-        caption_spacing = cfg.caption_image_spacing if cfg.caption_image_spacing > 0 else gutter
         if pending_left_caption:
-            bar = render_caption_bar(pending_left_caption, int(w), cfg)
-            if bar:
-                bar_h = bar.height + caption_spacing  # caption是独立的块，需要完整空间
+            cap_h = measure_caption_height(pending_left_caption, int(w), cfg)
+            if cap_h:
+                bar_h = cap_h + caption_spacing  # caption是独立的块，需要完整空间
         total_h = h + bar_h  # 图片高度 + caption高度（独立块）
         # 按高度装箱：如果放不下就换页
         # 关键修复：确保包括caption在内的总高度不会超出可用空间
@@ -1630,13 +1955,14 @@ def pack_tiles_hybrid(tiles: list[Image.Image], captions: list[str], canvas_size
             current.clear()
             used_h = 0.0
         x = max(0.0, (available_w - w) / 2.0)  # 确保x >= 0
-        current.append({"tile": pending_left, "caption": pending_left_caption, "x": x, "y": used_h, "w": w, "h": h})
+        current.append(_PlannedTile(pending_left, pending_left_caption, x, used_h, w, h))
         used_h += total_h + gutter
 
     flush_page()
     return pages, stats
 
 
+@functools.lru_cache(maxsize=128)
 def _px_to_css_px(px: float, dpi: int) -> float:
     """
     Convert "image pixel at dpi" to CSS px.
@@ -1648,41 +1974,20 @@ def _px_to_css_px(px: float, dpi: int) -> float:
 
 
 def _path_to_file_url(p: Path) -> str:
-    # Path.as_uri() handles Windows paths correctly (file:///D:/...)
-    return p.resolve().as_uri()
+    # abspath 只做字符串拼接；resolve() 要逐级 stat，按绝对路径缓存结果
+    return _abs_path_to_file_url(os.path.abspath(p))
 
 
-def _write_html_masonry_document(
-    html_path: Path,
-    tiles_dir: Path,
-    tile_files: list[str],
-    captions: list[str],
-    tile_is_wide: list[bool],
-    canvas_size_px: tuple[int, int],
-    cfg: RenderConfig,
-) -> None:
-    """
-    Write a single HTML document that paginates into fixed-size pages when printed.
-    Layout:
-      - multi-column flow
-      - .wide tiles span all columns
-      - figure kept intact (no split across columns/pages where possible)
-    """
-    canvas_w_px, canvas_h_px = canvas_size_px
-    w_in = canvas_w_px / float(cfg.dpi)
-    h_in = canvas_h_px / float(cfg.dpi)
-
-    padding_px = max(1, int(canvas_w_px * cfg.masonry_padding_ratio))
-    gutter_px = max(1, int(canvas_w_px * cfg.masonry_gutter_ratio))
-    padding_css = _px_to_css_px(padding_px, cfg.dpi)
-    gutter_css = _px_to_css_px(gutter_px, cfg.dpi)
+@functools.lru_cache(maxsize=256)
+def _abs_path_to_file_url(abs_path: str) -> str:
+    # Path.as_uri() handles Windows paths correctly (file:///D:/...)
+    return Path(abs_path).resolve().as_uri()
 
-    # Match PIL-ish caption sizing in physical units.
-    caption_font_css = max(8.0, _px_to_css_px(cfg.caption_font_size, cfg.dpi))
-    caption_pad_css = max(2.0, _px_to_css_px(cfg.caption_bar_padding, cfg.dpi))
 
-    # Use a safe default font stack, keep it consistent across machines.
-    css = f"""
+# Use a safe default font stack, keep it consistent across machines.
+# 模板在导入时 dedent 一次，每篇论文只做 format 替换
+_MASONRY_CSS_TEMPLATE = textwrap.dedent(
+    """
     @page {{
       size: {w_in:.6f}in {h_in:.6f}in;
       margin: 0;
@@ -1705,7 +2010,7 @@ def _write_html_masonry_document(
     }}
 
     main {{
-      column-count: {max(1, int(cfg.masonry_columns))};
+      column-count: {columns};
       column-gap: {gutter_css:.3f}px;
       column-fill: auto;
     }}
@@ -1730,10 +2035,10 @@ def _write_html_masonry_document(
     }}
 
     figure.tile figcaption {{
-      margin-top: {_px_to_css_px(cfg.caption_image_spacing, cfg.dpi):.3f}px;
+      margin-top: {caption_spacing_css:.3f}px;
       padding: {caption_pad_css:.3f}px;
-      background: rgb({cfg.caption_bg[0]}, {cfg.caption_bg[1]}, {cfg.caption_bg[2]});
-      color: rgb({cfg.caption_color[0]}, {cfg.caption_color[1]}, {cfg.caption_color[2]});
+      background: rgb({bg_r}, {bg_g}, {bg_b});
+      color: rgb({fg_r}, {fg_g}, {fg_b});
       font-size: {caption_font_css:.3f}px;
       line-height: 1.22;
       box-sizing: border-box;
@@ -1742,59 +2047,146 @@ def _write_html_masonry_document(
       overflow: hidden;
       display: -webkit-box;
       -webkit-box-orient: vertical;
-      -webkit-line-clamp: {max(1, int(cfg.caption_max_lines))};
+      -webkit-line-clamp: {max_lines};
     }}
     """
-    css = textwrap.dedent(css).strip()
-
-    parts: list[str] = []
-    parts.append("<!doctype html>")
-    parts.append('<html lang="en">')
-    parts.append("<head>")
-    parts.append('<meta charset="utf-8" />')
-    parts.append('<meta name="viewport" content="width=device-width, initial-scale=1" />')
-    parts.append("<title>select_image layout</title>")
-    parts.append("<style>")
-    parts.append(css)
-    parts.append("</style>")
-    parts.append("</head>")
-    parts.append("<body>")
-    parts.append("<main>")
+).strip()
+
+
+def _write_html_masonry_document(
+    html_path: Path,
+    tiles_dir: Path,
+    tile_files: list[str],
+    captions: list[str],
+    tile_is_wide: list[bool],
+    canvas_size_px: tuple[int, int],
+    cfg: RenderConfig,
+) -> None:
+    """
+    Write a single HTML document that paginates into fixed-size pages when printed.
+    Layout:
+      - multi-column flow
+      - .wide tiles span all columns
+      - figure kept intact (no split across columns/pages where possible)
+    """
+    canvas_w_px, canvas_h_px = canvas_size_px
+    w_in = canvas_w_px / float(cfg.dpi)
+    h_in = canvas_h_px / float(cfg.dpi)
+
+    padding_px = max(1, int(canvas_w_px * cfg.masonry_padding_ratio))
+    gutter_px = max(1, int(canvas_w_px * cfg.masonry_gutter_ratio))
+    padding_css = _px_to_css_px(padding_px, cfg.dpi)
+    gutter_css = _px_to_css_px(gutter_px, cfg.dpi)
+
+    # Match PIL-ish caption sizing in physical units.
+    caption_font_css = max(8.0, _px_to_css_px(cfg.caption_font_size, cfg.dpi))
+    caption_pad_css = max(2.0, _px_to_css_px(cfg.caption_bar_padding, cfg.dpi))
+    caption_spacing_css = _px_to_css_px(cfg.caption_image_spacing, cfg.dpi)
+
+    css = _MASONRY_CSS_TEMPLATE.format(
+        w_in=w_in,
+        h_in=h_in,
+        padding_css=padding_css,
+        gutter_css=gutter_css,
+        columns=max(1, int(cfg.masonry_columns)),
+        caption_spacing_css=caption_spacing_css,
+        caption_pad_css=caption_pad_css,
+        bg_r=cfg.caption_bg[0],
+        bg_g=cfg.caption_bg[1],
+        bg_b=cfg.caption_bg[2],
+        fg_r=cfg.caption_color[0],
+        fg_g=cfg.caption_color[1],
+        fg_b=cfg.caption_color[2],
+        caption_font_css=caption_font_css,
+        max_lines=max(1, int(cfg.caption_max_lines)),
+    )
 
+    # 固定的头尾各拼成一个字符串，每个 tile 只生成一个字符串，减少小字符串的分配
+    parts: list[str] = [
+        "<!doctype html>\n"
+        '<html lang="en">\n'
+        "<head>\n"
+        '<meta charset="utf-8" />\n'
+        '<meta name="viewport" content="width=device-width, initial-scale=1" />\n'
+        "<title>select_image layout</title>\n"
+        f"<style>\n{css}\n</style>\n"
+        "</head>\n"
+        "<body>\n"
+        "<main>"
+    ]
+
+    n_wide = len(tile_is_wide)
+    n_caps = len(captions)
+    # 目录名只需转义一次；tile 文件名由 _save_tiles 生成（tile_XXXX.png），不含需要转义的字符
+    tiles_prefix = urllib.parse.quote(tiles_dir.name) + "/"
     for i, fname in enumerate(tile_files):
-        is_wide = tile_is_wide[i] if i < len(tile_is_wide) else False
-        cap = captions[i] if i < len(captions) else ""
-        cls = "tile wide" if is_wide else "tile"
+        cls = "tile wide" if i < n_wide and tile_is_wide[i] else "tile"
+        cap = captions[i] if i < n_caps else ""
         # Use relative path under the HTML file.
-        src = urllib.parse.quote(f"{tiles_dir.name}/{fname}")
-        parts.append(f'<figure class="{cls}">')
-        parts.append(f'<img src="{src}" />')
+        src = tiles_prefix + fname
         if cap:
-            parts.append(f"<figcaption>{html.escape(cap)}</figcaption>")
-        parts.append("</figure>")
+            parts.append(
+                f'<figure class="{cls}">\n<img src="{src}" />\n<figcaption>{html.escape(cap)}</figcaption>\n</figure>'
+            )
+        else:
+            parts.append(f'<figure class="{cls}">\n<img src="{src}" />\n</figure>')
 
-    parts.append("</main>")
-    parts.append("</body>")
-    parts.append("</html>")
+    parts.append("</main>\n</body>\n</html>")
 
-    html_path.write_text("\n".join(parts), encoding="utf-8")
+    # 一次性编码后按字节写出，不经过 TextIOWrapper
+    html_path.write_bytes("\n".join(parts).encode("utf-8"))
 
 
-def _print_html_to_pdf(html_path: Path, pdf_path: Path, canvas_size_px: tuple[int, int], cfg: RenderConfig) -> None:
-    """
-    Use Playwright+Chromium to print the HTML into a fixed-size PDF.
-    """
+# 进程内共享的 Playwright + Chromium：首次使用时启动，之后每篇论文只开关 page，进程退出时统一关闭
+_PLAYWRIGHT = None
+_BROWSER = None
+
+
+def _close_shared_browser() -> None:
+    global _PLAYWRIGHT, _BROWSER
+    try:
+        if _BROWSER is not None:
+            _BROWSER.close()
+        if _PLAYWRIGHT is not None:
+            _PLAYWRIGHT.stop()
+    except Exception:
+        pass
+    _BROWSER = None
+    _PLAYWRIGHT = None
+
+
+def _get_shared_browser(engine: str):
+    """返回进程内复用的 headless Chromium，避免每篇论文都启动一次浏览器进程。"""
+    global _PLAYWRIGHT, _BROWSER
+    if _BROWSER is not None and _BROWSER.is_connected():
+        return _BROWSER
+    _close_shared_browser()
     try:
         from playwright.sync_api import sync_playwright  # type: ignore
     except Exception as e:  # pragma: no cover
         raise RuntimeError(
-            "Playwright is required for --layout-engine html.\n"
+            f"Playwright is required for --layout-engine {engine}.\n"
             "Install:\n"
             "  pip install playwright\n"
             "  python -m playwright install chromium\n"
             f"Import error: {e!r}"
         ) from e
+    _PLAYWRIGHT = sync_playwright().start()
+    try:
+        _BROWSER = _PLAYWRIGHT.chromium.launch(headless=True)
+    except Exception:
+        _close_shared_browser()
+        raise
+    return _BROWSER
+
 
+atexit.register(_close_shared_browser)
+
+
+def _print_html_to_pdf(html_path: Path, pdf_path: Path, canvas_size_px: tuple[int, int], cfg: RenderConfig) -> None:
+    """
+    Use Playwright+Chromium to print the HTML into a fixed-size PDF.
+    """
     canvas_w_px, canvas_h_px = canvas_size_px
     w_in = canvas_w_px / float(cfg.dpi)
     h_in = canvas_h_px / float(cfg.dpi)
@@ -1802,9 +2194,8 @@ def _print_html_to_pdf(html_path: Path, pdf_path: Path, canvas_size_px: tuple[in
     url = _path_to_file_url(html_path)
     pdf_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+    page = _get_shared_browser("html").new_page()
+    try:
         page.goto(url, wait_until="networkidle")
         page.emulate_media(media="print")
         page.pdf(
@@ -1815,7 +2206,40 @@ def _print_html_to_pdf(html_path: Path, pdf_path: Path, canvas_size_px: tuple[in
             margin={"top": "0in", "right": "0in", "bottom": "0in", "left": "0in"},
             prefer_css_page_size=True,
         )
-        browser.close()
+    finally:
+        page.close()
+
+
+def _save_tiles(tiles: list[Image.Image], tiles_dir: Path, ext: str = "png") -> list[Path]:
+    """
+    把 tile 依次存为 tiles_dir/tile_XXXX.<ext>，返回与 tiles 一一对应的路径。
+    这些文件只是排版中间文件：PNG 用最低压缩级别换取编码速度，BMP 则完全不压缩；
+    Pillow 编码时释放 GIL，用线程池并发写出。
+    """
+    paths = [tiles_dir / f"tile_{i:04d}.{ext}" for i in range(len(tiles))]
+    save_kwargs = {"optimize": False, "compress_level": 1} if ext == "png" else {}
+
+    def save_one(i: int) -> None:
+        tiles[i].save(paths[i], **save_kwargs)
+
+    if len(tiles) <= 1:
+        for i in range(len(tiles)):
+            save_one(i)
+    else:
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 4, len(tiles))) as ex:
+            # list() 让任意一张保存失败的异常在这里抛出
+            list(ex.map(save_one, range(len(tiles))))
+    return paths
+
+
+def _tile_wide_flags(tiles: list[Image.Image], wide_ratio: float) -> list[bool]:
+    """逐 tile 判断宽高比是否达到 wide_ratio；有 numpy 时一次向量化算完。"""
+    if np is None:
+        return [tile.width / max(1.0, float(tile.height)) >= wide_ratio for tile in tiles]
+    n = len(tiles)
+    widths = np.fromiter((t.width for t in tiles), dtype=np.float64, count=n)
+    heights = np.fromiter((t.height for t in tiles), dtype=np.float64, count=n)
+    return (widths / np.maximum(heights, 1.0) >= wide_ratio).tolist()
 
 
 def render_tiles_via_html_to_png(
@@ -1837,14 +2261,8 @@ def render_tiles_via_html_to_png(
     tiles_dir = out_dir / "tiles"
     tiles_dir.mkdir(parents=True, exist_ok=True)
 
-    tile_files: list[str] = []
-    tile_is_wide: list[bool] = []
-    for i, tile in enumerate(tiles):
-        fname = f"tile_{i:04d}.png"
-        tile.save(tiles_dir / fname)
-        tile_files.append(fname)
-        ratio = tile.width / max(1.0, float(tile.height))
-        tile_is_wide.append(ratio >= cfg.wide_ratio)
+    tile_files = [p.name for p in _save_tiles(tiles, tiles_dir)]
+    tile_is_wide = _tile_wide_flags(tiles, cfg.wide_ratio)
 
     html_path = out_dir / "layout.html"
     pdf_path = out_dir / "layout.pdf"
@@ -1861,46 +2279,88 @@ def render_tiles_via_html_to_png(
     _print_html_to_pdf(html_path=html_path, pdf_path=pdf_path, canvas_size_px=canvas_size_px, cfg=cfg)
 
     # Rasterize each PDF page into PNGs matching the cover dpi.
-    doc = fitz.open(pdf_path)
-    zoom = cfg.dpi / 72.0
+    page_count = _rasterize_pdf_pages(pdf_path, out_dir, start_idx, cfg.dpi)
+    return [{"page": float(i + 1), "tiles": float(len(tiles))} for i in range(page_count)]
+
+
+def _pixmap_to_image(pix) -> Image.Image:
+    """
+    把 alpha=False 的 RGB Pixmap 转成 PIL 图像。
+    直接从 samples_mv（memoryview）读取，省去 pix.samples 先复制出一份 bytes；旧版 PyMuPDF 无 samples_mv 时退回 samples。
+    """
+    buf = getattr(pix, "samples_mv", None)
+    if buf is None:
+        buf = pix.samples
+    return Image.frombuffer("RGB", (pix.width, pix.height), buf, "raw", "RGB", pix.stride, 1)
+
+
+def _rasterize_pdf_pages(pdf_path: Path, out_dir: Path, start_idx: int, dpi: int) -> int:
+    """
+    把 PDF 每一页按 dpi 栅格化为 out_dir/<start_idx + i>.png，返回页数。
+    MuPDF 的全局上下文不是线程安全的（即使每个线程各开一份 Document），这里逐页串行渲染；
+    并行只在进程级（--workers）进行。
+    """
+    zoom = dpi / 72.0
     mat = fitz.Matrix(zoom, zoom)
-    stats: list[dict[str, float]] = []
-    for i in range(doc.page_count):
-        page = doc.load_page(i)
-        pix = page.get_pixmap(matrix=mat, alpha=False)
-        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
-        img.save(out_dir / f"{(start_idx + i):02d}.png")
-        stats.append({"page": float(i + 1), "tiles": float(len(tiles))})
-    doc.close()
-    return stats
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        for i in range(page_count):
+            pix = doc.load_page(i).get_pixmap(matrix=mat, alpha=False)
+            # MuPDF 直接从像素缓冲编码 PNG，不经过 PIL Image
+            pix.save(str(out_dir / f"{(start_idx + i):02d}.png"))
+    return page_count
 
 
 def _wrap_lines_pdf(text: str, font_name: str, font_size_pt: float, max_width_pt: float, max_lines: int) -> list[str]:
     """
     Wrap text into lines by measuring with ReportLab stringWidth.
+    同一 caption 在排版估高和最终绘制时会以相同参数各换行一次，结果按参数缓存。
+    """
+    return list(_wrap_lines_pdf_cached(text, font_name, font_size_pt, max_width_pt, max_lines))
+
+
+@functools.lru_cache(maxsize=8192)
+def _pdf_text_units(text: str, font_name: str) -> float:
     """
+    text 在 font_name 下的字宽（1000 单位/em，即字号 1000 时的 stringWidth）。
+    caption 里的词高度重复，按 (词, 字体) 缓存；标准字体字宽为整数，取整去掉 *0.001*1000 的浮点误差。
+    """
+    from reportlab.pdfbase import pdfmetrics  # type: ignore
+
+    return round(pdfmetrics.stringWidth(text, font_name, 1000.0), 6)
+
+
+@functools.lru_cache(maxsize=1024)
+def _wrap_lines_pdf_cached(text: str, font_name: str, font_size_pt: float, max_width_pt: float, max_lines: int) -> tuple[str, ...]:
     try:
         from reportlab.pdfbase import pdfmetrics  # type: ignore
     except Exception:
         # Fallback: rough wrap by character count
         max_chars = max(1, int(max_width_pt / max(font_size_pt, 1.0) * 1.6))
         lines = textwrap.wrap(text, width=max_chars)
-        return lines[:max_lines]
+        return tuple(lines[:max_lines])
 
     words = text.replace("\n", " ").split()
     if not words:
-        return []
+        return ()
     lines: list[str] = []
     current: list[str] = []
     truncated = False
+    # 宽度可加：整行宽度 = (各词字宽单位之和 + 空格单位) * 0.001 * 字号，与 stringWidth 的算法一致，
+    # 因此只需逐词累加，不必每加一个词就重新测量整行
+    space_units = _pdf_text_units(" ", font_name)
+    line_units = 0.0
     for w in words:
-        test = " ".join(current + [w])
-        if pdfmetrics.stringWidth(test, font_name, font_size_pt) <= max_width_pt:
+        word_units = _pdf_text_units(w, font_name)
+        test_units = line_units + space_units + word_units if current else word_units
+        if test_units * 0.001 * font_size_pt <= max_width_pt:
             current.append(w)
+            line_units = test_units
             continue
         if current:
             lines.append(" ".join(current))
         current = [w]
+        line_units = word_units
         if len(lines) >= max_lines:
             truncated = True
             break
@@ -1915,7 +2375,7 @@ def _wrap_lines_pdf(text: str, font_name: str, font_size_pt: float, max_width_pt
         while pdfmetrics.stringWidth(last + ellipsis, font_name, font_size_pt) > max_width_pt and last:
             last = last[:-1].rstrip()
         lines[-1] = (last + ellipsis) if last else ellipsis
-    return lines
+    return tuple(lines)
 
 
 def _pack_tiles_justified_rows(
@@ -1949,6 +2409,14 @@ def _pack_tiles_justified_rows(
     row_tiles: list[tuple[int, float]] = []
     row_ratio_sum = 0.0
 
+    # caption 估高用到的换算量只依赖 cfg，在行循环外算一次
+    dpi = cfg.dpi
+    font_size_pt = cfg.caption_font_size * 72.0 / dpi
+    cap_pad_pt = cfg.caption_bar_padding * 2 * 72.0 / dpi
+    line_h_px = cfg.caption_font_size * 1.22
+    cap_pad_px = cfg.caption_bar_padding * 2
+    n_caps = len(captions)
+
     def emit_row(row_tiles_local: list[tuple[int, float]], row_ratio_sum_local: float, row_height: float):
         nonlocal used_h, current_page
         if not row_tiles_local:
@@ -1967,15 +2435,13 @@ def _pack_tiles_justified_rows(
         for idx, ratio in row_tiles_local:
             w = row_h * ratio
             h = row_h
-            cap = captions[idx] if idx < len(captions) else ""
+            cap = captions[idx] if idx < n_caps else ""
             # estimate caption height in px based on line count
             if cap:
-                max_width_pt = (w * 72.0 / cfg.dpi) - (cfg.caption_bar_padding * 2 * 72.0 / cfg.dpi)
-                font_size_pt = cfg.caption_font_size * 72.0 / cfg.dpi
+                max_width_pt = (w * 72.0 / dpi) - cap_pad_pt
                 lines = _wrap_lines_pdf(cap, "Helvetica", font_size_pt, max(1.0, max_width_pt), cfg.caption_max_lines)
-                line_h_px = (cfg.caption_font_size * 1.22)
                 text_h_px = max(1, len(lines)) * line_h_px
-                cap_h_px = text_h_px + cfg.caption_bar_padding * 2
+                cap_h_px = text_h_px + cap_pad_px
                 cap_total_px = cap_h_px + cfg.caption_image_spacing
             else:
                 cap_h_px = 0.0
@@ -2067,12 +2533,9 @@ def render_tiles_via_reportlab_to_png(
 
     tiles_dir = out_dir / "tiles_reportlab"
     tiles_dir.mkdir(parents=True, exist_ok=True)
-    tile_paths: list[Path] = []
-    for i, tile in enumerate(tiles):
-        fname = f"tile_{i:04d}.png"
-        path = tiles_dir / fname
-        tile.save(path)
-        tile_paths.append(path)
+    # ReportLab 会用 PIL 解码后自行重新压缩，中间文件用 BMP 省去一次 zlib 编码和解码；
+    # BMP 不压缩、体积大，PDF 写出后即删除整个目录
+    tile_paths = _save_tiles(tiles, tiles_dir, ext="bmp")
 
     pages = _pack_tiles_justified_rows(tiles, captions, canvas_size_px, cfg)
 
@@ -2087,15 +2550,26 @@ def render_tiles_via_reportlab_to_png(
     pdf_path = out_dir / "layout_reportlab.pdf"
     c = rl_canvas.Canvas(str(pdf_path), pagesize=(w_pt, h_pt))
 
+    # 以下换算量与 cfg 相关但与 tile 无关，放在绘制循环外只算一次
+    dpi = cfg.dpi
     font_name = "Helvetica"
-    font_size_pt = cfg.caption_font_size * 72.0 / cfg.dpi
-    pad_pt = cfg.caption_bar_padding * 72.0 / cfg.dpi
-    caption_spacing_pt = cfg.caption_image_spacing * 72.0 / cfg.dpi
+    font_size_pt = cfg.caption_font_size * 72.0 / dpi
+    pad_pt = cfg.caption_bar_padding * 72.0 / dpi
+    line_h_pt = font_size_pt * 1.22
+    caption_bg_rgb = tuple(v / 255.0 for v in cfg.caption_bg[:3])
+    caption_color_rgb = tuple(v / 255.0 for v in cfg.caption_color[:3])
+    caption_image_spacing = cfg.caption_image_spacing
+    caption_max_lines = cfg.caption_max_lines
+    n_tiles = len(tile_paths)
+    n_caps = len(captions)
 
     for page_idx, placements in enumerate(pages):
+        # 先画完本页所有图片，再统一画 caption 背景和文字：每页只切换一次填充色/字体，
+        # 避免每个 tile 重复输出相同的 PDF 状态指令（caption 与图片互不重叠，绘制顺序不影响结果）
+        caption_boxes: list[tuple[str, float, float, float, float]] = []
         for p in placements:
             idx = int(p["tile_idx"])
-            if idx < 0 or idx >= len(tile_paths):
+            if idx < 0 or idx >= n_tiles:
                 continue
             img_path = tile_paths[idx]
             x_px = padding_px + p["x"]
@@ -2104,56 +2578,50 @@ def render_tiles_via_reportlab_to_png(
             h_px = p["h"]
 
             # Convert to bottom-left coordinates in points
-            x = x_px * 72.0 / cfg.dpi
-            y = (canvas_h_px - (y_px_top + h_px)) * 72.0 / cfg.dpi
-            w = w_px * 72.0 / cfg.dpi
-            h = h_px * 72.0 / cfg.dpi
+            x = x_px * 72.0 / dpi
+            y = (canvas_h_px - (y_px_top + h_px)) * 72.0 / dpi
+            w = w_px * 72.0 / dpi
+            h = h_px * 72.0 / dpi
 
+            # 每个 tile 只绘制一次，ImageReader 在绘制时才构造；预先为全部 tile 构造省不了什么，
+            # 反而让解码后的图像一直驻留到 PDF 写完
             c.drawImage(ImageReader(str(img_path)), x, y, width=w, height=h, preserveAspectRatio=False, mask="auto")
 
-            cap = captions[idx] if idx < len(captions) else ""
+            cap = captions[idx] if idx < n_caps else ""
             if cap:
                 cap_h_px = p.get("cap_h", 0.0)
                 if cap_h_px > 0:
-                    cap_h_pt = cap_h_px * 72.0 / cfg.dpi
-                    cap_x = x
-                    cap_y_top_px = y_px_top + h_px + cfg.caption_image_spacing
-                    cap_y = (canvas_h_px - (cap_y_top_px + cap_h_px)) * 72.0 / cfg.dpi
-                    cap_w = w
-
-                    # background rect
-                    c.setFillColorRGB(cfg.caption_bg[0] / 255.0, cfg.caption_bg[1] / 255.0, cfg.caption_bg[2] / 255.0)
-                    c.rect(cap_x, cap_y, cap_w, cap_h_pt, stroke=0, fill=1)
-
-                    # text
-                    c.setFillColorRGB(cfg.caption_color[0] / 255.0, cfg.caption_color[1] / 255.0, cfg.caption_color[2] / 255.0)
-                    c.setFont(font_name, font_size_pt)
-                    max_width_pt = max(1.0, cap_w - pad_pt * 2)
-                    lines = _wrap_lines_pdf(cap, font_name, font_size_pt, max_width_pt, cfg.caption_max_lines)
-                    line_h_pt = font_size_pt * 1.22
-                    text_x = cap_x + pad_pt
-                    text_y = cap_y + cap_h_pt - pad_pt - line_h_pt
-                    for line in lines:
-                        c.drawString(text_x, text_y, line)
-                        text_y -= line_h_pt
+                    cap_h_pt = cap_h_px * 72.0 / dpi
+                    cap_y_top_px = y_px_top + h_px + caption_image_spacing
+                    cap_y = (canvas_h_px - (cap_y_top_px + cap_h_px)) * 72.0 / dpi
+                    caption_boxes.append((cap, x, cap_y, w, cap_h_pt))
+
+        if caption_boxes:
+            # background rects
+            c.setFillColorRGB(*caption_bg_rgb)
+            for _, cap_x, cap_y, cap_w, cap_h_pt in caption_boxes:
+                c.rect(cap_x, cap_y, cap_w, cap_h_pt, stroke=0, fill=1)
+
+            # text
+            c.setFillColorRGB(*caption_color_rgb)
+            c.setFont(font_name, font_size_pt)
+            for cap, cap_x, cap_y, cap_w, cap_h_pt in caption_boxes:
+                max_width_pt = max(1.0, cap_w - pad_pt * 2)
+                lines = _wrap_lines_pdf(cap, font_name, font_size_pt, max_width_pt, caption_max_lines)
+                text_x = cap_x + pad_pt
+                text_y = cap_y + cap_h_pt - pad_pt - line_h_pt
+                for line in lines:
+                    c.drawString(text_x, text_y, line)
+                    text_y -= line_h_pt
 
         c.showPage()
 
     c.save()
+    shutil.rmtree(tiles_dir, ignore_errors=True)
 
     # Rasterize to PNG
-    doc = fitz.open(pdf_path)
-    zoom = cfg.dpi / 72.0
-    mat = fitz.Matrix(zoom, zoom)
-    stats: list[dict[str, float]] = []
-    for i in range(doc.page_count):
-        page = doc.load_page(i)
-        pix = page.get_pixmap(matrix=mat, alpha=False)
-        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
-        img.save(out_dir / f"{(start_idx + i):02d}.png")
-        stats.append({"page": float(i + 1), "tiles": float(len(tiles))})
-    doc.close()
-    return stats
+    page_count = _rasterize_pdf_pages(pdf_path, out_dir, start_idx, cfg.dpi)
+    return [{"page": float(i + 1), "tiles": float(len(tiles))} for i in range(page_count)]
 
 
 def pack_tiles_masonry(tiles: list[Image.Image], canvas_size: tuple[int, int], cfg: RenderConfig):
@@ -2174,7 +2642,10 @@ def pack_tiles_masonry(tiles: list[Image.Image], canvas_size: tuple[int, int], c
 
     def layout_page(page_tiles: list[Image.Image], scale: float):
         col_heights = [0.0 for _ in range(cols)]
-        placements: list[dict[str, object]] = []
+        placements: list[_PlannedTile] = []
+        # 各列左边界与 tile 无关，预先算好
+        stride = col_w + gutter
+        col_x = [i * stride for i in range(cols)]
         for tile in page_tiles:
             base_scale = col_w / float(tile.width)
             # 修复：确保最终宽度不超过列宽
@@ -2194,13 +2665,18 @@ def pack_tiles_masonry(tiles: list[Image.Image], canvas_size: tuple[int, int], c
                 scale_fit = col_w / float(tile.width)
                 tw = int(col_w)
                 th = max(1, int(tile.height * scale_fit))
-            col_idx = min(range(cols), key=lambda i: col_heights[i])
-            y = col_heights[col_idx]
+            # 取当前最矮的列（并列时取最左），手写线性扫描代替 min(key=lambda)
+            col_idx = 0
+            y = col_heights[0]
+            for i in range(1, cols):
+                if col_heights[i] < y:
+                    col_idx = i
+                    y = col_heights[i]
             # 确保x坐标不会导致重叠
-            x = max(0.0, col_idx * (col_w + gutter) + (col_w - tw) / 2.0)
+            x = max(0.0, col_x[col_idx] + (col_w - tw) / 2.0)
             # 确保不会超出列边界
-            x = min(x, col_idx * (col_w + gutter) + col_w - tw)
-            placements.append({"x": x, "y": y, "w": tw, "h": th, "tile": tile})
+            x = min(x, col_x[col_idx] + col_w - tw)
+            placements.append(_PlannedTile(tile, "", x, y, tw, th))
             col_heights[col_idx] += th + gutter
         return placements, col_heights
 
@@ -2221,31 +2697,40 @@ def pack_tiles_masonry(tiles: list[Image.Image], canvas_size: tuple[int, int], c
             scale_fit = min(available_w / float(tile.width), available_h / float(tile.height))
             tw = max(1, int(tile.width * scale_fit))
             th = max(1, int(tile.height * scale_fit))
-            placements = [{"x": (available_w - tw) / 2, "y": (available_h - th) / 2, "w": tw, "h": th, "tile": tile}]
+            placements = [_PlannedTile(tile, "", (available_w - tw) / 2, (available_h - th) / 2, tw, th)]
             h_used = th
 
-        page = Image.new("RGB", (canvas_w, canvas_h), "white")
+        # 有 numpy 时直接写入整页 uint8 缓冲（切片赋值），最后一次性转回 Image，省去 paste 的模式/遮罩检查
+        if np is not None:
+            page_arr = np.full((canvas_h, canvas_w, 3), 255, dtype=np.uint8)
+            page = None
+        else:
+            page_arr = None
+            page = Image.new("RGB", (canvas_w, canvas_h), "white")
         content_area = 0.0
         for p in placements:
-            tile_img = p.get("tile")
+            tile_img = p.tile
             if isinstance(tile_img, Image.Image):
-                if hasattr(Image, "Resampling"):
-                    resample = Image.Resampling.LANCZOS
-                else:
-                    resample = getattr(Image, "LANCZOS", getattr(Image, "BICUBIC", 3))
-                w = float(p["w"])
-                h = float(p["h"])
-                x = float(p["x"])
-                y = float(p["y"])
+                w = float(p.w)
+                h = float(p.h)
+                x = float(p.x)
+                y = float(p.y)
                 # 边界保护：确保不会超出画布
                 x_final = max(0, int(x + padding))
                 y_final = max(0, int(y + padding))
                 w_final = min(int(w), canvas_w - x_final)
                 h_final = min(int(h), canvas_h - y_final)
                 if w_final > 0 and h_final > 0:
-                    tile = tile_img.resize((w_final, h_final), resample)
-                    page.paste(tile, (x_final, y_final))
+                    tile = tile_img.resize((w_final, h_final), _RESAMPLE_LANCZOS)
+                    if page_arr is not None:
+                        if tile.mode != "RGB":
+                            tile = tile.convert("RGB")
+                        page_arr[y_final : y_final + h_final, x_final : x_final + w_final] = np.asarray(tile)
+                    else:
+                        page.paste(tile, (x_final, y_final))
                     content_area += w_final * h_final
+        if page_arr is not None:
+            page = Image.fromarray(page_arr)
         pages.append(page)
         fill_ratio = content_area / float(canvas_w * canvas_h) if canvas_w * canvas_h else 0.0
         stats.append({"tiles": len(placements), "fill_ratio": fill_ratio, "height_used": h_used})
@@ -2254,12 +2739,20 @@ def pack_tiles_masonry(tiles: list[Image.Image], canvas_size: tuple[int, int], c
 
 
 def render_first_page(pdf_path: Path, dpi: int) -> Image.Image:
-    doc = fitz.open(pdf_path)
-    page = doc.load_page(0)
     zoom = dpi / 72.0
     mat = fitz.Matrix(zoom, zoom)
-    pix = page.get_pixmap(matrix=mat, alpha=False)
-    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    # with 保证文档及时关闭，批量运行时不依赖 GC 释放
+    with fitz.open(pdf_path) as doc:
+        pix = doc.load_page(0).get_pixmap(matrix=mat, alpha=False)
+    return _pixmap_to_image(pix)
+
+
+def first_page_size(pdf_path: Path, dpi: int) -> tuple[int, int]:
+    """首页按 dpi 渲染后的像素尺寸（与 render_first_page(...).size 一致），只读页面尺寸，不做栅格化。"""
+    zoom = dpi / 72.0
+    with fitz.open(pdf_path) as doc:
+        irect = (doc.load_page(0).rect * fitz.Matrix(zoom, zoom)).irect
+    return irect.width, irect.height
 
 
 def resolve_output_dir(file_list_root: Path, date_str: str, stem: str) -> Path:
@@ -2271,7 +2764,7 @@ def process_paper(paper_dir: Path, pdf_path: Path, out_dir: Path, cfg: RenderCon
     md_path = find_md_path(paper_dir, stem)
     if md_path is None:
         return {"stem": stem, "error": "md_not_found"}
-    entries = parse_md_images(md_path)
+    entries = parse_md_images(md_path, cfg)
     content_path = next(iter(paper_dir.glob("*_content_list.json")), None)
     figures: list[dict] = []
     captions: list[dict] = []
@@ -2287,10 +2780,13 @@ def process_paper(paper_dir: Path, pdf_path: Path, out_dir: Path, cfg: RenderCon
     figure_groups = group_figures_by_proximity(entries, figures, captions)
 
     out_dir.mkdir(parents=True, exist_ok=True)
-    cover = render_first_page(pdf_path, cfg.dpi)
-    canvas_size = cover.size
     if cfg.save_cover:
+        cover = render_first_page(pdf_path, cfg.dpi)
+        canvas_size = cover.size
         cover.save(out_dir / "01.png")
+    else:
+        # 不输出封面时只需要画布尺寸，不必栅格化整页
+        canvas_size = first_page_size(pdf_path, cfg.dpi)
 
     tiles: list[Image.Image] = []
     captions_list: list[str] = []
@@ -2313,7 +2809,7 @@ def process_paper(paper_dir: Path, pdf_path: Path, out_dir: Path, cfg: RenderCon
         
         # Stage 3: 拼接 group 内的子图
         try:
-            composed_image, group_caption = compose_figure_group(group, paper_dir, cfg)
+            composed_image, group_caption = compose_figure_group(group, paper_dir, cfg, max_size=canvas_size)
         except (FileNotFoundError, ValueError) as e:
             skipped["group_compose_error"] = skipped.get("group_compose_error", 0) + 1
             continue
@@ -2327,7 +2823,7 @@ def process_paper(paper_dir: Path, pdf_path: Path, out_dir: Path, cfg: RenderCon
             continue
         
         # 对 group caption 进行最终纯化验证
-        purified_caption, is_valid = purify_caption(group_caption)
+        purified_caption, is_valid, _ = purify_caption(group_caption)
         if not is_valid:
             # Caption 不可信，清空（避免正文污染）
             purified_caption = ""
@@ -2386,6 +2882,10 @@ def process_paper(paper_dir: Path, pdf_path: Path, out_dir: Path, cfg: RenderCon
     return report
 
 
+# --workers 0 时的进程数上限：每个进程同时持有解码后的图片与打开的 PDF，内存随进程数增长
+_MAX_AUTO_WORKERS = 4
+
+
 def run() -> None:
     ap = argparse.ArgumentParser("select_image_mineru")
     ap.add_argument("--date", default="")
@@ -2418,6 +2918,8 @@ def run() -> None:
     ap.add_argument("--heading-negative", default="method,approach,architecture,model")
     ap.add_argument("--caption-positive", default="result,experiment,ablation,evaluation,performance,accuracy,roc,ece,benchmark")
     ap.add_argument("--caption-negative", default="")
+    ap.add_argument("--workers", type=int, default=select_image_workers, help="并行处理论文的进程数（默认串行，0 表示 min(4, CPU 核数)）")
+    ap.add_argument("--prune-by-heading", action="store_true", default=False, help="results_only 时在解析阶段跳过负向章节的图片")
     args = ap.parse_args()
 
     mineru_root = Path(args.mineru_root)
@@ -2448,10 +2950,11 @@ def run() -> None:
         caption_strip_min_px=args.caption_strip_min_px,
         caption_image_spacing=args.caption_image_spacing,
         results_only=args.results_only,
-        heading_positive=[k.strip() for k in args.heading_positive.split(",") if k.strip()],
-        heading_negative=[k.strip() for k in args.heading_negative.split(",") if k.strip()],
-        caption_positive=[k.strip() for k in args.caption_positive.split(",") if k.strip()],
-        caption_negative=[k.strip() for k in args.caption_negative.split(",") if k.strip()],
+        heading_positive=split_keywords(args.heading_positive),
+        heading_negative=split_keywords(args.heading_negative),
+        caption_positive=split_keywords(args.caption_positive),
+        caption_negative=split_keywords(args.caption_negative),
+        prune_by_heading=args.prune_by_heading,
     )
 
     if not mineru_dir.exists():
@@ -2460,7 +2963,8 @@ def run() -> None:
         raise SystemExit(f"pdf dir not found: {pdf_root}")
 
     print("============开始选择论文图片==============", flush=True)
-    reports = []
+    reports: list[dict | None] = []
+    jobs: list[tuple[int, Path, Path, Path]] = []
     for paper_dir in list_paper_dirs(mineru_dir):
         stem = paper_dir.name
         pdf_path = pdf_root / f"{stem}.pdf"
@@ -2468,8 +2972,43 @@ def run() -> None:
             reports.append({"stem": stem, "error": "pdf_not_found"})
             continue
         out_dir = resolve_output_dir(output_root, date_str, stem)
-        report = process_paper(paper_dir, pdf_path, out_dir, cfg)
-        reports.append(report)
+        jobs.append((len(reports), paper_dir, pdf_path, out_dir))
+        reports.append(None)  # 占位，保持与目录顺序一致
+
+    # 论文之间相互独立，按进程并行（PyMuPDF 文档等对象只在各自进程内创建）
+    # 单篇失败只记录到该篇的 report，不中断整批
+    workers = int(args.workers) if args.workers is not None else 1
+    if workers <= 0:
+        workers = min(_MAX_AUTO_WORKERS, os.cpu_count() or 1)
+    workers = max(1, min(workers, len(jobs) or 1))
+    total = len(jobs)
+    done = 0
+    if workers == 1:
+        for slot, paper_dir, pdf_path, out_dir in jobs:
+            try:
+                reports[slot] = process_paper(paper_dir, pdf_path, out_dir, cfg)
+            except Exception as e:
+                print(f"\n[SELECT_IMAGE] error on {paper_dir.name}: {e!r}", flush=True)
+                reports[slot] = {"stem": paper_dir.name, "error": f"exception: {e!r}"}
+            done += 1
+            print(f"\r[SELECT_IMAGE] progress done={done}/{total}", end="", flush=True)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            future_map = {
+                ex.submit(process_paper, paper_dir, pdf_path, out_dir, cfg): (slot, paper_dir.name)
+                for slot, paper_dir, pdf_path, out_dir in jobs
+            }
+            for fut in as_completed(future_map):
+                slot, stem = future_map[fut]
+                try:
+                    reports[slot] = fut.result()
+                except Exception as e:
+                    print(f"\n[SELECT_IMAGE] error on {stem}: {e!r}", flush=True)
+                    reports[slot] = {"stem": stem, "error": f"exception: {e!r}"}
+                done += 1
+                print(f"\r[SELECT_IMAGE] progress done={done}/{total}", end="", flush=True)
+    if total:
+        print("", flush=True)
 
     summary = {
         "date": date_str,
@@ -3,16 +3,29 @@ import json
 import logging
 import os
 import re
+import shutil
 import sys
+import threading
 import time
 import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import List
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 可选加速：orjson 解析轮询响应比标准库 json 快数倍；未安装时退回 json
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from config.config import minerU_Token, SELECTED_MINERU_DIR, MANIFEST_FILENAME  # noqa: E402
+from Controller.json_io import write_json  # noqa: E402
 
 
 def setup_logging():
@@ -30,12 +43,30 @@ def ensure_dir(p: Path) -> Path:
     return p
 
 
+_DATE_DIR_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
 def find_latest_manifest(root_dir: Path) -> Path:
     if not root_dir.exists():
         raise FileNotFoundError(f"input root not found: {root_dir}")
+    # 常规布局是 root/<YYYY-MM-DD>/manifest：按日期倒序只检查各日期目录，找不到时才递归扫描整棵树
+    with os.scandir(root_dir) as it:
+        dated = sorted((e.name for e in it if _DATE_DIR_RE.fullmatch(e.name) and e.is_dir()), reverse=True)
+    for name in dated:
+        candidate = root_dir / name / MANIFEST_FILENAME
+        if candidate.is_file():
+            return candidate
+    candidates = list(root_dir.rglob(MANIFEST_FILENAME))
+    # 嵌套更深的日期目录：按目录名（ISO 日期字符串序即时间序）取最新，只对同名日期目录比较 mtime
+    dated_candidates = [p for p in candidates if _DATE_DIR_RE.fullmatch(p.parent.name)]
+    if dated_candidates:
+        newest = max(p.parent.name for p in dated_candidates)
+        candidates = [p for p in dated_candidates if p.parent.name == newest]
+        if len(candidates) == 1:
+            return candidates[0]
     latest = None
     latest_mtime = 0.0
-    for p in root_dir.rglob(MANIFEST_FILENAME):
+    for p in candidates:
         try:
             mtime = p.stat().st_mtime
         except OSError:
@@ -60,34 +91,58 @@ def load_manifest(path: Path) -> tuple[List[dict], str]:
     return items, date_str
 
 
-def pick_first_md(zip_path: Path) -> str:
+def extract_and_pick_md(zip_path: Path, dest_dir: Path) -> str:
+    """
+    解压整个 zip 到 dest_dir，并返回层级最浅（同层取路径最短）的 .md 文本。
+    只打开一次 zip：中央目录只解析一次，md 也直接从已解压的文件读取，不再二次解压。
+    """
+    dest_dir.mkdir(parents=True, exist_ok=True)
     with zipfile.ZipFile(zip_path, "r") as zf:
         names = [n for n in zf.namelist() if n.lower().endswith(".md")]
         if not names:
             raise RuntimeError(f"no .md in zip: {zip_path}")
-        names.sort(key=lambda s: (s.count("/"), len(s)))
-        name = names[0]
-        raw = zf.read(name)
-    return raw.decode("utf-8", errors="replace")
+        name = min(names, key=lambda s: (s.count("/"), len(s)))
+        zf.extractall(dest_dir, members=[n for n in zf.namelist() if n != name])
+        # extract 返回清理后的实际落盘路径，直接读回，避免再解压一次 md
+        extracted = zf.extract(name, dest_dir)
+    return Path(extracted).read_bytes().decode("utf-8", errors="replace")
 
 
-def extract_zip(zip_path: Path, dest_dir: Path) -> None:
-    dest_dir.mkdir(parents=True, exist_ok=True)
-    with zipfile.ZipFile(zip_path, "r") as zf:
-        zf.extractall(dest_dir)
+def parse_json_response(r: requests.Response) -> dict:
+    """解析 JSON 响应体：优先 orjson 直接解析 bytes，失败或未安装时走标准库。"""
+    if orjson is not None:
+        try:
+            return orjson.loads(r.content)
+        except orjson.JSONDecodeError:
+            pass
+    return r.json()
+
+
+_POOL_SIZE = 32
+
+
+def mount_pooled_adapter(session: requests.Session, max_retries: Retry | int = 0) -> requests.Session:
+    """给 session 挂上更大的连接池，长时间轮询/并发传输时复用 keep-alive 连接，避免反复 TLS 握手。"""
+    adapter = HTTPAdapter(pool_connections=_POOL_SIZE, pool_maxsize=_POOL_SIZE, max_retries=max_retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 
 class MinerUClient:
     def __init__(self, base_url: str, token: str) -> None:
         self.base_url = base_url.rstrip("/")
-        self.session = requests.Session()
+        self.session = mount_pooled_adapter(
+            requests.Session(),
+            Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=["GET"]),
+        )
         self.session.headers.update({"Authorization": f"Bearer {token}", "Content-Type": "application/json", "Accept": "*/*"})
 
     def _post(self, path: str, payload: dict) -> dict:
         url = f"{self.base_url}{path}"
         r = self.session.post(url, json=payload, timeout=(20, 120))
         r.raise_for_status()
-        data = r.json()
+        data = parse_json_response(r)
         if data.get("code") != 0:
             raise RuntimeError(f"MinerU API error: {data}")
         return data
@@ -96,7 +151,7 @@ class MinerUClient:
         url = f"{self.base_url}{path}"
         r = self.session.get(url, timeout=(20, 120))
         r.raise_for_status()
-        data = r.json()
+        data = parse_json_response(r)
         if data.get("code") != 0:
             raise RuntimeError(f"MinerU API error: {data}")
         return data
@@ -110,6 +165,19 @@ class MinerUClient:
         return self._get(f"/api/v4/extract-results/batch/{batch_id}")
 
 
+_thread_local = threading.local()
+
+
+def thread_session() -> requests.Session:
+    """每个线程一个 Session：并发上传/下载时各自复用连接池，互不共享。
+    重试由上传/下载函数自己的退避循环负责，这里不再叠加 urllib3 层的重试。"""
+    s = getattr(_thread_local, "session", None)
+    if s is None:
+        s = mount_pooled_adapter(requests.Session())
+        _thread_local.session = s
+    return s
+
+
 def backoff_sleep(attempt: int, base: float = 1.0, cap: float = 10.0) -> None:
     time.sleep(min(cap, base * (2 ** (attempt - 1))))
 
@@ -119,7 +187,9 @@ def upload_to_presigned_url(file_path: Path, put_url: str, max_retries: int = 6)
     for attempt in range(1, max_retries + 1):
         try:
             with file_path.open("rb") as f:
-                r = requests.put(put_url, data=f, timeout=(30, 900))
+                # requests 把带 .read 的文件对象按块流式发送（Content-Length 取自文件大小），
+                # 不会整体读入内存，无需 mmap
+                r = thread_session().put(put_url, data=f, timeout=(30, 900))
             r.raise_for_status()
             return
         except Exception as e:
@@ -128,40 +198,60 @@ def upload_to_presigned_url(file_path: Path, put_url: str, max_retries: int = 6)
     raise RuntimeError(f"upload failed: {file_path.name}. last={last!r}")
 
 
-def wait_batch_done(client: MinerUClient, batch_id: str, expected_total: int, timeout_sec: int = 900, poll_sec: int = 3) -> List[dict]:
+def wait_batch_done(
+    client: MinerUClient,
+    batch_id: str,
+    expected_total: int,
+    timeout_sec: int = 900,
+    poll_sec: float = 1.0,
+    poll_max_sec: float = 15.0,
+    label: str = "parse",
+) -> List[dict]:
+    """
+    轮询批次直到全部 done/failed。间隔自适应：状态分布不变时按 1.5 倍放大到 poll_max_sec，
+    状态有变化或只剩最后 10% 时回到 poll_sec，减少长批次里无意义的 API 调用。
+    """
     deadline = time.time() + timeout_sec
+    interval = poll_sec
+    prev_states: dict[str, int] | None = None
     while time.time() < deadline:
         last = client.get_batch_results(batch_id)
         data = last.get("data") or {}
         items = data.get("extract_result") or []
         if not isinstance(items, list):
             items = []
-        states: dict[str, int] = {}
-        done_or_failed = 0
-        for it in items:
-            st = str(it.get("state") or "unknown").lower()
-            states[st] = states.get(st, 0) + 1
-            if st in ("done", "failed"):
-                done_or_failed += 1
-        print(f"\r[parse] {done_or_failed}/{expected_total} {states}", end="", flush=True)
+        states = dict(Counter(str(it.get("state") or "unknown").lower() for it in items))
+        done_or_failed = states.get("done", 0) + states.get("failed", 0)
+        # 状态分布没变就不重复刷新进度行
+        if states != prev_states:
+            sys.stdout.write(f"\r[{label}] {done_or_failed}/{expected_total} {states}")
+            sys.stdout.flush()
         if expected_total > 0 and done_or_failed >= expected_total:
             print()
             return [it for it in items if isinstance(it, dict)]
-        time.sleep(poll_sec)
+        if states != prev_states or (expected_total - done_or_failed) * 10 <= expected_total:
+            interval = poll_sec
+        else:
+            interval = min(poll_max_sec, interval * 1.5)
+        prev_states = states
+        time.sleep(max(0.0, min(interval, deadline - time.time())))
     raise TimeoutError("batch not finished in time")
 
 
+_DOWNLOAD_CHUNK = 4 * 1024 * 1024
+
+
 def download_zip(zip_url: str, token: str, dest: Path, max_retries: int = 6) -> None:
     last: Exception | None = None
     headers = {"Authorization": f"Bearer {token}"}
     for attempt in range(1, max_retries + 1):
         try:
-            with requests.get(zip_url, headers=headers, stream=True, timeout=(30, 900)) as r:
+            with thread_session().get(zip_url, headers=headers, stream=True, timeout=(30, 900)) as r:
                 r.raise_for_status()
-                with dest.open("wb") as f:
-                    for chunk in r.iter_content(chunk_size=1024 * 128):
-                        if chunk:
-                            f.write(chunk)
+                # 直接从底层响应流按 4 MiB 块拷贝（仍按 Content-Encoding 解压），省去 iter_content 生成器开销
+                r.raw.decode_content = True
+                with dest.open("wb", buffering=_DOWNLOAD_CHUNK) as f:
+                    shutil.copyfileobj(r.raw, f, length=_DOWNLOAD_CHUNK)
             return
         except Exception as e:
             last = e
@@ -169,6 +259,29 @@ def download_zip(zip_url: str, token: str, dest: Path, max_retries: int = 6) ->
     raise RuntimeError(f"download zip failed. last={last!r}")
 
 
+def converted_stems(out_root: Path) -> set[str]:
+    """一次 scandir 列出 out_root 下已有 <stem>/<stem>.md 的 stem，代替逐个 PDF 去 stat。"""
+    stems: set[str] = set()
+    with os.scandir(out_root) as it:
+        for e in it:
+            if e.is_dir() and os.path.isfile(os.path.join(e.path, f"{e.name}.md")):
+                stems.add(e.name)
+    return stems
+
+
+def process_one_result(p: Path, zip_url: str, out_root: Path, token: str) -> None:
+    """下载一篇论文的结果 zip，解压到 out_root/<stem>/ 并写出 <stem>.md。"""
+    zip_path = out_root / f"{p.stem}.zip"
+    download_zip(zip_url, token, zip_path)
+    dest_dir = out_root / p.stem
+    md_text = extract_and_pick_md(zip_path, dest_dir)
+    (dest_dir / f"{p.stem}.md").write_text(md_text, encoding="utf-8")
+
+
+# 进度行每 N 次才 flush 一次，循环结束时再补一次
+_PROGRESS_FLUSH_EVERY = 8
+
+
 def find_latest_selected_dir(root: Path) -> tuple[Path, str]:
     if not root.exists():
         raise SystemExit(f"input root not found: {root}")
@@ -176,7 +289,7 @@ def find_latest_selected_dir(root: Path) -> tuple[Path, str]:
     for d in root.iterdir():
         if not d.is_dir():
             continue
-        if re.fullmatch(r"\d{4}-\d{2}-\d{2}", d.name):
+        if _DATE_DIR_RE.fullmatch(d.name):
             cand.append(d.name)
     if not cand:
         raise SystemExit(f"no dated subdir found in {root}")
@@ -192,12 +305,17 @@ def run():
     ap.add_argument("--date", default="")
     ap.add_argument("--limit", type=int, default=None)
     ap.add_argument("--manifest", default="")
-    ap.add_argument("--outdir", default=SELECTED_MINERU_DIR)
+    ap.add_argument("--outdir", default=str(SELECTED_MINERU_DIR))
     ap.add_argument("--base-url", default=os.environ.get("MINERU_BASE_URL", "https://mineru.net"))
     ap.add_argument("--model-version", default=os.environ.get("MINERU_MODEL_VERSION", "vlm"))
     ap.add_argument("--timeout-sec", type=int, default=900)
-    ap.add_argument("--poll-sec", type=int, default=3)
+    ap.add_argument("--poll-sec", type=float, default=1.0, help="轮询批次状态的初始/最小间隔（秒）")
+    ap.add_argument("--poll-max-sec", type=float, default=15.0, help="状态长时间不变时轮询间隔的上限（秒）")
     ap.add_argument("--upload-retries", type=int, default=6)
+    ap.add_argument("--upload-workers", type=int, default=8, help="并发上传的线程数")
+    ap.add_argument("--batch-chunk", type=int, default=50, help="每个 MinerU 批次包含的论文数（0 表示全部放进一个批次）")
+    ap.add_argument("--batch-workers", type=int, default=4, help="并行推进的 MinerU 批次数")
+    ap.add_argument("--extract-workers", type=int, default=0, help="并发下载+解压结果的线程数（0 表示与 --upload-workers 相同）")
     args = ap.parse_args()
 
     token = (minerU_Token or "").strip()
@@ -238,7 +356,10 @@ def run():
     print("============开始对精选 PDF 做 MinerU 解析==============", flush=True)
 
     out_root = ensure_dir(Path(args.outdir) / date_str)
-    pdfs_to_upload = [p for p in pdfs if not (out_root / p.stem / f"{p.stem}.md").exists()]
+    converted = converted_stems(out_root)
+    # 已转换的在这里就记为 skipped，最后写 manifest 时只查 statuses，不再碰文件系统
+    statuses: dict[str, str] = {p.stem: "skipped" for p in pdfs if p.stem in converted}
+    pdfs_to_upload = [p for p in pdfs if p.stem not in statuses]
     if not pdfs_to_upload:
         logger.info("All selected PDFs already converted, skip upload and parse")
         logger.info("Out dir: %s", str(out_root))
@@ -256,32 +377,77 @@ def run():
                 for p in pdfs
             ],
         }
-        manifest_path.write_text(json.dumps(manifest_payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        write_json(manifest_path, manifest_payload)
         return
 
     client = MinerUClient(args.base_url, token)
-    files_payload = [{"name": p.name, "data_id": p.stem} for p in pdfs_to_upload]
-    applied = client.apply_upload_urls(files_payload, model_version=args.model_version, extra={}).get("data") or {}
-    urls = applied.get("file_urls") or []
-    batch_id = applied.get("batch_id") or ""
-    if not batch_id or not urls or len(urls) != len(pdfs_to_upload):
-        raise SystemExit("Failed to apply upload URLs")
-
     total = len(pdfs_to_upload)
-    done = 0
-    for i, p in enumerate(pdfs_to_upload):
-        upload_to_presigned_url(p, urls[i], max_retries=args.upload_retries)
-        done += 1
-        print(f"\r[upload] {done}/{total}", end="", flush=True)
-    print()
-
-    results = wait_batch_done(client, batch_id, expected_total=total, timeout_sec=args.timeout_sec, poll_sec=args.poll_sec)
+    _write = sys.stdout.write
+    workers = max(1, int(args.upload_workers or 0))
+    chunk_size = max(1, int(args.batch_chunk or 0) or total)
+    chunks = [pdfs_to_upload[i : i + chunk_size] for i in range(0, total, chunk_size)]
+    uploaded = 0
+    progress_lock = threading.Lock()
+
+    def on_uploaded() -> None:
+        nonlocal uploaded
+        with progress_lock:
+            uploaded += 1
+            _write(f"\r[upload] {uploaded}/{total}")
+            if uploaded % _PROGRESS_FLUSH_EVERY == 0 or uploaded == total:
+                sys.stdout.flush()
+
+    def process_batch(idx: int, chunk: List[Path]) -> List[dict]:
+        files_payload = [{"name": p.name, "data_id": p.stem} for p in chunk]
+        applied = client.apply_upload_urls(files_payload, model_version=args.model_version, extra={}).get("data") or {}
+        urls = applied.get("file_urls") or []
+        batch_id = applied.get("batch_id") or ""
+        if not batch_id or not urls or len(urls) != len(chunk):
+            raise RuntimeError("Failed to apply upload URLs")
+        # 上传受网络往返延迟限制，多线程重叠各文件的 PUT
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = [ex.submit(upload_to_presigned_url, p, urls[i], args.upload_retries) for i, p in enumerate(chunk)]
+            for fut in as_completed(futures):
+                fut.result()
+                on_uploaded()
+        label = "parse" if len(chunks) == 1 else f"parse {idx + 1}/{len(chunks)}"
+        return wait_batch_done(
+            client,
+            batch_id,
+            expected_total=len(chunk),
+            timeout_sec=args.timeout_sec,
+            poll_sec=args.poll_sec,
+            poll_max_sec=args.poll_max_sec,
+            label=label,
+        )
+
+    # 按 --batch-chunk 拆成多个 MinerU 批次并行推进：各批次的申请、上传、轮询互相重叠；
+    # 某个批次失败只标记该批次的论文，不影响其他批次
+    failed_batches: list[tuple[List[Path], str]] = []
+    results: List[dict] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(len(chunks), int(args.batch_workers or 0) or 1))) as ex:
+        future_map = {ex.submit(process_batch, i, chunk): chunk for i, chunk in enumerate(chunks)}
+        for fut in as_completed(future_map):
+            try:
+                results.extend(fut.result())
+            except Exception as e:
+                failed_batches.append((future_map[fut], f"{e!r}"))
+    _write("\n")
+    sys.stdout.flush()
+    for chunk, err in failed_batches:
+        logger.warning("batch of %d papers failed: %s", len(chunk), err)
+        for p in chunk:
+            statuses[p.stem] = "batch_failed"
+    if len(failed_batches) == len(chunks):
+        raise SystemExit("All MinerU batches failed")
     by_name = {str(it.get("file_name") or ""): it for it in results}
     by_dataid = {str(it.get("data_id") or ""): it for it in results}
 
     wrote = 0
-    statuses: dict[str, str] = {}
+    to_fetch: list[tuple[Path, str]] = []
     for p in pdfs_to_upload:
+        if p.stem in statuses:
+            continue
         it = by_dataid.get(p.stem) or by_name.get(p.name)
         if not it:
             print(f"[skip] no result item for {p.name}")
@@ -297,16 +463,22 @@ def run():
             print(f"[skip] {p.name} has no full_zip_url")
             statuses[p.stem] = "no_zip_url"
             continue
-        zip_path = out_root / f"{p.stem}.zip"
-        download_zip(zip_url, token, zip_path)
-        dest_dir = out_root / p.stem
-        extract_zip(zip_path, dest_dir)
-        md_text = pick_first_md(zip_path)
-        (dest_dir / f"{p.stem}.md").write_text(md_text, encoding="utf-8")
-        wrote += 1
-        statuses[p.stem] = "done"
-        print(f"\r[write] {wrote}/{total}", end="", flush=True)
-    print()
+        to_fetch.append((p, zip_url))
+
+    # 各篇结果互相独立：下载走网络，zlib 解压在 C 层释放 GIL，线程池即可让两者跨论文重叠
+    extract_workers = max(1, int(args.extract_workers or 0) or workers)
+    with ThreadPoolExecutor(max_workers=extract_workers) as ex:
+        future_map = {ex.submit(process_one_result, p, zip_url, out_root, token): p for p, zip_url in to_fetch}
+        for fut in as_completed(future_map):
+            p = future_map[fut]
+            fut.result()
+            wrote += 1
+            statuses[p.stem] = "done"
+            _write(f"\r[write] {wrote}/{total}")
+            if wrote % _PROGRESS_FLUSH_EVERY == 0:
+                sys.stdout.flush()
+    _write("\n")
+    sys.stdout.flush()
     logger.info("Done. wrote=%d, total=%d", wrote, total)
     logger.info("Out dir: %s", str(out_root))
     manifest_items = []
@@ -316,14 +488,11 @@ def run():
                 "arxiv_id": p.stem,
                 "selected_pdf": str(p),
                 "md_path": str(out_root / p.stem / f"{p.stem}.md"),
-                "status": statuses.get(p.stem, "skipped" if (out_root / p.stem / f"{p.stem}.md").exists() else "unknown"),
+                "status": statuses.get(p.stem, "unknown"),
             }
         )
     manifest_path = out_root / MANIFEST_FILENAME
-    manifest_path.write_text(
-        json.dumps({"date": date_str, "total": len(pdfs), "items": manifest_items}, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+    write_json(manifest_path, {"date": date_str, "total": len(pdfs), "items": manifest_items})
     print("============结束精选 PDF 的 MinerU 解析==============", flush=True)
 
 
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import argparse
-import json
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List
 
 import sys
 
@@ -18,16 +19,33 @@ from config.config import (  # noqa: E402
     summary_batch_temperature,
     DATA_ROOT,
 )
+from Controller.json_io import dumps_line  # noqa: E402
 
 
 def list_md_files(root: Path) -> List[Path]:
-    return sorted(root.glob("*.md"))
+    # scandir 的 DirEntry 自带类型信息，一次目录读取即可，无需逐个 stat
+    with os.scandir(root) as it:
+        names = [e.name for e in it if e.name.endswith(".md") and e.is_file()]
+    names.sort()
+    return [root / n for n in names]
 
 
 def today_str() -> str:
     return datetime.now().date().isoformat()
 
 
+def is_date_dir_name(name: str) -> bool:
+    """YYYY-MM-DD 形式的目录名；纯字符判断，不走正则。"""
+    return (
+        len(name) == 10
+        and name[4] == "-"
+        and name[7] == "-"
+        and name[:4].isdigit()
+        and name[5:7].isdigit()
+        and name[8:].isdigit()
+    )
+
+
 def build_custom_id(stem: str, used: Dict[str, int]) -> str:
     if stem not in used:
         used[stem] = 1
@@ -36,6 +54,29 @@ def build_custom_id(stem: str, used: Dict[str, int]) -> str:
     return f"{stem}-{used[stem]}"
 
 
+def iter_md_texts(files: List[Path], workers: int = 8, window: int = 32) -> Iterator[str]:
+    """
+    按 files 顺序产出每个 md 的文本；后台线程预读后面最多 window 个文件，读盘与编码/写出重叠。
+    与 read_text(errors="ignore") 结果一致（同样做通用换行转换）。
+    """
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        pending: deque = deque()
+        it = iter(files)
+        for p in it:
+            pending.append(ex.submit(p.read_bytes))
+            if len(pending) >= window:
+                break
+        while pending:
+            raw = pending.popleft().result()
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append(ex.submit(nxt.read_bytes))
+            yield raw.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+
+
+_WRITE_BATCH_BYTES = 4 * 1024 * 1024
+
+
 def run() -> None:
     ap = argparse.ArgumentParser("selectpaper_to_jsonl")
     ap.add_argument("--input-dir", default=str(Path(DATA_ROOT) / "selectedpaper_to_mineru"))
@@ -61,16 +102,11 @@ def run() -> None:
             in_dir = candidate
             date_str = today
         else:
-            subdirs = []
-            for d in in_root.iterdir():
-                if d.is_dir():
-                    name = d.name
-                    if len(name) == 10 and name[4] == "-" and name[7] == "-":
-                        subdirs.append(d)
-            if subdirs:
-                subdirs.sort(key=lambda p: p.name)
-                in_dir = subdirs[-1]
-                date_str = in_dir.name
+            with os.scandir(in_root) as it:
+                dated = [e.name for e in it if is_date_dir_name(e.name) and e.is_dir()]
+            if dated:
+                date_str = max(dated)
+                in_dir = in_root / date_str
             else:
                 in_dir = in_root
                 date_str = today
@@ -86,9 +122,11 @@ def run() -> None:
     out_path = out_dir / f"{date_str}.jsonl"
 
     used_ids: Dict[str, int] = {}
-    with out_path.open("w", encoding="utf-8") as f:
-        for p in files:
-            md_text = p.read_text(encoding="utf-8", errors="ignore")
+    # 行先攒在内存里，满 4 MiB 再 join 成一块写出；单篇 md 常有数 MB，逐行 write 会产生大量系统调用
+    buf: List[bytes] = []
+    buflen = 0
+    with out_path.open("wb") as f:
+        for p, md_text in zip(files, iter_md_texts(files)):
             custom_id = build_custom_id(p.stem, used_ids)
             line = {
                 "custom_id": custom_id,
@@ -103,7 +141,15 @@ def run() -> None:
                     "temperature": summary_batch_temperature,
                 },
             }
-            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            data = dumps_line(line)
+            buf.append(data)
+            buflen += len(data)
+            if buflen >= _WRITE_BATCH_BYTES:
+                f.write(b"".join(buf))
+                buf.clear()
+                buflen = 0
+        if buf:
+            f.write(b"".join(buf))
 
     print(f"[JSONL] saved: {out_path}", flush=True)
 
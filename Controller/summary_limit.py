@@ -1,20 +1,41 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import functools
 import json
 import os
 import re
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict
+from typing import Awaitable, List, Tuple, Optional, Dict, Set
 
-from openai import OpenAI
+try:
+    from blake3 import blake3 as _hasher
+except ImportError:  # pragma: no cover
+    from hashlib import blake2b as _hasher
+
+# 可选加速：orjson 直接解析 bytes，比标准库 json 快数倍；未安装时退回 json
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# 可选：tiktoken 按真实 BPE 计数，中文约为 UTF-8 字节数的 1/3，裁剪更少；
+# 未安装或编码表无法加载（需联网下载一次）时退回字节数估算
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover
+    tiktoken = None
+
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, BadRequestError, RateLimitError
 
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from Controller.llm_http import dashscope_http_client  # noqa: E402
+from Controller.llm_rate_limit import RateLimiter  # noqa: E402
 from config.config import (  # noqa: E402
     qwen_api_key,
     summary_limit_base_url,
@@ -24,6 +45,9 @@ from config.config import (  # noqa: E402
     summary_limit_input_hard_limit,
     summary_limit_input_safety_margin,
     summary_limit_concurrency,
+    summary_limit_rpm,
+    summary_limit_tpm,
+    summary_limit_cache_dir,
     summary_limit_section_limit_intro,
     summary_limit_section_limit_method,
     summary_limit_section_limit_findings,
@@ -36,6 +60,8 @@ from config.config import (  # noqa: E402
     summary_limit_prompt_structure_check,
     summary_limit_prompt_structure_rewrite,
     summary_limit_prompt_headline,
+    summary_limit_prompt_batch_rewrite,
+    summary_tokenizer_name,
     DATA_ROOT,
 )
 
@@ -62,9 +88,46 @@ SECTION_PROMPTS = {
 }
 
 
+# 逐行处理的正则在模块加载时编译一次，避免每次调用都走 re 模块的缓存查找
+_RE_HEADING_HASH = re.compile(r"^#+\s*")
+_RE_LEADING_SYMBOLS = re.compile(r"^[^\w\u4e00-\u9fff]+")
+_RE_HRULE = re.compile(r"^-{3,}\s*$")
+_RE_BOLD = re.compile(r"\*\*(.*?)\*\*")
+_RE_TITLE_LINE = re.compile(r"^(?:📖\s*)?标题\s*:\s*(.+)$", re.IGNORECASE)
+_RE_SOURCE_LINE = re.compile(r"^(?:🌐\s*)?(?:来源|source)\s*:\s*(.+)$", re.IGNORECASE)
+_RE_INSTITUTION_LINE = re.compile(r"^(?:机构|作者机构|单位|机构名)\s*:\s*(.+)$", re.IGNORECASE)
+_RE_INSTITUTION_LABEL = re.compile(r"^(?:机构|作者机构|单位|机构名)$", re.IGNORECASE)
+_RE_TITLE_LABEL = re.compile(r"^标题$", re.IGNORECASE)
+_RE_SOURCE_LABEL = re.compile(r"^(?:来源|source)$", re.IGNORECASE)
+_RE_BULLET = re.compile(r"^(?:[-*•]|🔹|🔸)\s*")
+_RE_NUMBERED = re.compile(r"^\d+[.)]\s*")
+_RE_ARXIV_ID = re.compile(r"(\d{4}\.\d{4,5})(v\d+)?")
+_RE_VERSION_SUFFIX = re.compile(r"v\d+$")
+
+# 标题行识别：normalize_heading 的前导清理（strip / 去 # / 去前导符号 / 去冒号横线）剥掉的恰好是
+# 开头一整段非 \w、非汉字字符，因此合成一条锚定正则，匹配到的标签再查表得到 section key
+_LABEL_TO_KEY = {lbl: key for key, labels in SECTION_LABELS.items() for lbl in labels}
+_RE_HEADING_LABEL = re.compile(
+    r"^[^\w\u4e00-\u9fff]*(" + "|".join(map(re.escape, _LABEL_TO_KEY)) + ")"
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _token_encoder():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(summary_tokenizer_name)
+    except Exception:
+        return None
+
+
 def approx_input_tokens(text: str) -> int:
     if not text:
         return 0
+    enc = _token_encoder()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
     return len(text.encode("utf-8", errors="ignore"))
 
 
@@ -72,69 +135,234 @@ def crop_to_input_tokens(text: str, limit_tokens: int) -> str:
     budget = int(limit_tokens)
     if budget <= 0:
         return ""
+    # 每个 BPE token 至少覆盖 1 个字节，字节数不超预算时 token 数必然也不超，无需分词
     b = text.encode("utf-8", errors="ignore")
     if len(b) <= budget:
         return text
+    enc = _token_encoder()
+    if enc is not None:
+        # 只编码一次，按 token 切开后解码，末尾被截断的半个字符直接丢弃
+        tokens = enc.encode(text, disallowed_special=())
+        if len(tokens) <= budget:
+            return text
+        return enc.decode_bytes(tokens[:budget]).decode("utf-8", errors="ignore")
     return b[:budget].decode("utf-8", errors="ignore")
 
 
+@functools.lru_cache(maxsize=32)
+def prompt_tokens(prompt: str) -> int:
+    """系统提示词来自 config 常量（或其固定组合），token 数按字符串缓存，只在首次用到时编码一次。"""
+    return approx_input_tokens(prompt)
+
+
 def list_md_files(root: Path) -> List[Path]:
-    return sorted(root.glob("*.md"))
+    # 一次 scandir 读目录，不像 glob 那样逐个 stat
+    with os.scandir(root) as it:
+        files = [Path(e.path) for e in it if e.name.endswith(".md")]
+    return sorted(files, key=lambda p: p.name)
+
+
+def list_md_stems(root: Path) -> Set[str]:
+    """root 下已有 .md 的 stem 集合，用于按集合成员跳过已生成的输出。"""
+    with os.scandir(root) as it:
+        return {e.name[:-3] for e in it if e.name.endswith(".md")}
 
 
 def today_str() -> str:
     return datetime.now().date().isoformat()
 
 
+_GATHER_PEEK = 4096
+_GATHER_NL = os.linesep.encode("ascii")  # 与原先文本模式写出的换行保持一致
+_GATHER_BANNER = b"#" * 100 + _GATHER_NL
+
+
+def stripped_byte_span(src, size: int) -> Optional[Tuple[int, int]]:
+    """
+    只读文件首尾各 4 KiB，算出 strip() 之后正文的字节区间 [start, end)。
+    首尾空白超出窥视窗口，或边缘是 ASCII 以外的空白字符时返回 None，交给按文本读取的慢路径。
+    """
+    if size == 0:
+        return 0, 0
+    head = src.read(min(size, _GATHER_PEEK))
+    start = len(head) - len(head.lstrip())
+    if start == len(head):
+        return None if size > len(head) else (0, 0)
+    if size > _GATHER_PEEK:
+        src.seek(size - _GATHER_PEEK)
+        tail = src.read(_GATHER_PEEK)
+        tail_base = size - _GATHER_PEEK
+    else:
+        tail, tail_base = head, 0
+    tail_body = tail.rstrip()
+    if not tail_body:
+        return None
+    end = tail_base + len(tail_body)
+    first_char = head[start : start + 4].decode("utf-8", errors="ignore")[:1]
+    last_char = tail_body[-4:].decode("utf-8", errors="ignore")[-1:]
+    if first_char.isspace() or last_char.isspace():
+        return None
+    return start, end
+
+
+def copy_byte_range(src, out, start: int, count: int) -> None:
+    """
+    把 src 的 [start, start+count) 原样写入 out；Linux 上用 sendfile 在内核态拷贝。
+    macOS 等平台的 os.sendfile 只能写 socket，不走这条路；sendfile 报错时也退回普通读写。
+    """
+    out.flush()
+    if sys.platform.startswith("linux"):
+        out_fd, src_fd = out.fileno(), src.fileno()
+        try:
+            while count > 0:
+                sent = os.sendfile(out_fd, src_fd, start, count)
+                if sent == 0:
+                    break
+                start += sent
+                count -= sent
+            return
+        except OSError:
+            pass
+    src.seek(start)
+    while count > 0:
+        chunk = src.read(min(count, 1 << 20))
+        if not chunk:
+            break
+        out.write(chunk)
+        count -= len(chunk)
+
+
 def write_gather(single_dir: Path, gather_dir: Path, date_str: str) -> Path:
+    """
+    把各篇 md 拼成一个 gather 文件：正文按字节区间直接拷贝，不再整篇解码再编码。
+    single 目录里的文件由 process_one 以 UTF-8 写出，原样拷贝与按文本读写的结果一致；
+    被外部改写成非法 UTF-8 的文件，其字节会原样进入 gather（旧实现按 errors="ignore" 丢弃）。
+    """
     files = list_md_files(single_dir)
     gather_dir.mkdir(parents=True, exist_ok=True)
     gather_path = gather_dir / f"{date_str}.txt"
-    with gather_path.open("w", encoding="utf-8") as f:
+    with gather_path.open("wb") as out:
         first = True
         for p in files:
-            text = p.read_text(encoding="utf-8", errors="ignore").strip()
-            if not text:
-                continue
-            if not first:
-                f.write("\n")
-            first = False
-            f.write("#" * 100 + "\n")
-            f.write(f"{p.name}\n")
-            f.write("#" * 100 + "\n")
-            f.write(text)
-            f.write("\n")
+            with p.open("rb") as src:
+                size = os.fstat(src.fileno()).st_size
+                span = stripped_byte_span(src, size)
+                body = None
+                if span is None:
+                    body = p.read_text(encoding="utf-8", errors="ignore").strip()
+                    if not body:
+                        continue
+                    body = body.replace("\n", os.linesep).encode("utf-8")
+                elif span[0] == span[1]:
+                    continue
+                if not first:
+                    out.write(_GATHER_NL)
+                first = False
+                out.write(_GATHER_BANNER + p.name.encode("utf-8") + _GATHER_NL + _GATHER_BANNER)
+                if body is None:
+                    copy_byte_range(src, out, span[0], span[1] - span[0])
+                else:
+                    out.write(body)
+                out.write(_GATHER_NL)
     return gather_path
 
 
-def make_client() -> OpenAI:
+def make_client(workers: int = 8) -> AsyncOpenAI:
     key = (qwen_api_key or "").strip()
     if not key:
         raise SystemExit("qwen_api_key missing in config.config")
     base = (summary_limit_base_url or "").strip()
     if not base:
         raise SystemExit("summary_limit_base_url missing in config.config")
-    return OpenAI(api_key=key, base_url=base)
+    # SDK 自带重试会绕过限速器并与 chat_once 的退避叠加，统一由 chat_once 负责重试
+    return AsyncOpenAI(api_key=key, base_url=base, max_retries=0, http_client=dashscope_http_client(workers))
+
+
+_RATE_LIMITER: Optional[RateLimiter] = None
+_RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError)
+
+
+async def chat_once(client: AsyncOpenAI, sys_prompt: str, user_content: str, max_retries: int = 5, **kwargs):
+    """
+    发一次 chat completion：先按预估 token 数占用限速额度，
+    遇到 429/超时/连接错误按指数退避（1,2,4,8…s，上限 60s）重试，其余错误直接抛出。
+    """
+    est_tokens = prompt_tokens(sys_prompt) + approx_input_tokens(user_content) + int(kwargs.get("max_tokens") or 0)
+    for attempt in range(1, max_retries + 1):
+        if _RATE_LIMITER is not None:
+            await _RATE_LIMITER.acquire(est_tokens)
+        try:
+            return await client.chat.completions.create(
+                model=summary_limit_model,
+                messages=[
+                    {"role": "system", "content": sys_prompt},
+                    {"role": "user", "content": user_content},
+                ],
+                stream=False,
+                **kwargs,
+            )
+        except _RETRYABLE_ERRORS:
+            if attempt >= max_retries:
+                raise
+            await asyncio.sleep(min(60.0, 2.0 ** (attempt - 1)))
+
+
+# 提示词或调用方式变化时递增，使旧缓存整体失效
+PROMPT_VERSION = "1"
+_RESPONSE_CACHE_DIR: Optional[Path] = None
+
+
+def response_cache_key(sys_prompt: str, user_content: str, kwargs: Dict[str, object]) -> str:
+    h = _hasher()
+    payload = json.dumps(
+        [PROMPT_VERSION, summary_limit_model, sys_prompt, user_content, sorted(kwargs.items())],
+        ensure_ascii=False,
+    )
+    h.update(payload.encode("utf-8"))
+    return h.hexdigest()
+
+
+async def cached_chat(client: AsyncOpenAI, sys_prompt: str, user_content: str, **kwargs) -> str:
+    """
+    chat_once 的磁盘缓存版本，返回回复文本。
+    键为 (PROMPT_VERSION, 模型, 系统提示词, 用户内容, 调用参数) 的哈希；
+    只缓存正常结束（finish_reason=stop）的非空回复，截断或空回复下次仍会重新请求。
+    """
+    cache_path = None
+    if _RESPONSE_CACHE_DIR is not None:
+        key = response_cache_key(sys_prompt, user_content, kwargs)
+        cache_path = _RESPONSE_CACHE_DIR / key[:2] / f"{key}.json"
+        try:
+            return json.loads(cache_path.read_text(encoding="utf-8"))["text"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    resp = await chat_once(client, sys_prompt, user_content, **kwargs)
+    choice = resp.choices[0] if resp.choices else None
+    text = (choice.message.content if choice else "") or ""
+    if cache_path is not None and text and getattr(choice, "finish_reason", None) == "stop":
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"text": text, "finish_reason": "stop"}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, cache_path)
+    return text
 
 
 def non_ws_len(text: str) -> int:
-    return len(re.sub(r"\s+", "", text))
+    # str.split() 与 \s 判定的空白字符完全一致，分段长度求和由 C 实现，无需生成去空白的新串
+    return sum(map(len, text.split()))
 
 
 def normalize_heading(line: str) -> str:
     raw = line.strip()
-    raw = re.sub(r"^#+\s*", "", raw)
-    raw = re.sub(r"^[^\w\u4e00-\u9fff]+", "", raw)
+    raw = _RE_HEADING_HASH.sub("", raw)
+    raw = _RE_LEADING_SYMBOLS.sub("", raw)
     raw = raw.lstrip(":：- ").strip()
     return raw
 
 
 def heading_key(line: str) -> Optional[str]:
-    norm = normalize_heading(line)
-    for key, labels in SECTION_LABELS.items():
-        if norm.startswith(labels[0]) or norm.startswith(labels[1]):
-            return key
-    return None
+    m = _RE_HEADING_LABEL.match(line)
+    return _LABEL_TO_KEY[m.group(1)] if m else None
 
 
 def split_sections(lines: List[str]) -> Tuple[List[str], List[Tuple[str, str, List[str]]]]:
@@ -178,9 +406,24 @@ def ensure_section_spacing(text: str) -> str:
     return "\n".join(out).rstrip() + "\n"
 
 
-def normalize_style(text: str) -> str:
+def normalize_lines(text: str, space_sections: bool = False) -> Tuple[List[str], Optional[int]]:
+    """
+    normalize_style 的逐行实现，返回 (带换行符的行列表, 标题行上方待压缩 headline 的下标)。
+    space_sections=True 时在同一遍里顺带完成 ensure_section_spacing 的空行插入；
+    headline 下标在这一遍里一并确定，apply_headline_limit 不必再扫描全文。
+    """
     lines = text.splitlines()
     out: List[str] = []
+    title_at: Optional[int] = None
+
+    def push(s: str) -> None:
+        nonlocal title_at
+        if space_sections and out and out[-1].strip() and heading_key(s):
+            out.append("")
+        if title_at is None and s.strip().startswith("📖标题"):
+            title_at = len(out)
+        out.append(s)
+
     i = 0
     while i < len(lines):
         raw = lines[i].strip()
@@ -188,63 +431,63 @@ def normalize_style(text: str) -> str:
             out.append("")
             i += 1
             continue
-        if re.match(r"^-{3,}\s*$", raw):
+        if _RE_HRULE.match(raw):
             i += 1
             continue
-        line = re.sub(r"^#+\s*", "", raw).strip()
-        line = re.sub(r"\*\*(.*?)\*\*", r"\1", line)
+        line = _RE_HEADING_HASH.sub("", raw).strip()
+        line = _RE_BOLD.sub(r"\1", line)
         line = line.replace("：", ":")
 
-        m = re.match(r"^(?:📖\s*)?标题\s*:\s*(.+)$", line, re.IGNORECASE)
+        m = _RE_TITLE_LINE.match(line)
         if m:
-            out.append(f"📖标题：{m.group(1).strip()}")
+            push(f"📖标题：{m.group(1).strip()}")
             i += 1
             continue
-        m = re.match(r"^(?:🌐\s*)?(?:来源|source)\s*:\s*(.+)$", line, re.IGNORECASE)
+        m = _RE_SOURCE_LINE.match(line)
         if m:
-            out.append(f"🌐来源：{m.group(1).strip()}")
+            push(f"🌐来源：{m.group(1).strip()}")
             i += 1
             continue
-        m = re.match(r"^(?:机构|作者机构|单位|机构名)\s*:\s*(.+)$", line, re.IGNORECASE)
+        m = _RE_INSTITUTION_LINE.match(line)
         if m:
-            out.append(f"{m.group(1).strip()}")
+            push(f"{m.group(1).strip()}")
             i += 1
             continue
 
-        if re.match(r"^(?:机构|作者机构|单位|机构名)$", line, re.IGNORECASE):
+        if _RE_INSTITUTION_LABEL.match(line):
             content = ""
             j = i + 1
             while j < len(lines):
                 candidate = lines[j].strip()
                 if candidate:
-                    content = re.sub(r"\*\*(.*?)\*\*", r"\1", candidate)
+                    content = _RE_BOLD.sub(r"\1", candidate)
                     break
                 j += 1
-            out.append(content)
+            push(content)
             i = j + 1
             continue
-        if re.match(r"^标题$", line, re.IGNORECASE):
+        if _RE_TITLE_LABEL.match(line):
             content = ""
             j = i + 1
             while j < len(lines):
                 candidate = lines[j].strip()
                 if candidate:
-                    content = re.sub(r"\*\*(.*?)\*\*", r"\1", candidate)
+                    content = _RE_BOLD.sub(r"\1", candidate)
                     break
                 j += 1
-            out.append(f"📖标题：{content}" if content else "📖标题：")
+            push(f"📖标题：{content}" if content else "📖标题：")
             i = j + 1
             continue
-        if re.match(r"^(?:来源|source)$", line, re.IGNORECASE):
+        if _RE_SOURCE_LABEL.match(line):
             content = ""
             j = i + 1
             while j < len(lines):
                 candidate = lines[j].strip()
                 if candidate:
-                    content = re.sub(r"\*\*(.*?)\*\*", r"\1", candidate)
+                    content = _RE_BOLD.sub(r"\1", candidate)
                     break
                 j += 1
-            out.append(f"🌐来源：{content}" if content else "🌐来源：")
+            push(f"🌐来源：{content}" if content else "🌐来源：")
             i = j + 1
             continue
 
@@ -252,51 +495,79 @@ def normalize_style(text: str) -> str:
         if key == "intro":
             if out and out[-1].strip():
                 out.append("")
-            out.append("🛎️文章简介")
+            push("🛎️文章简介")
             i += 1
             continue
         if key == "method":
             if out and out[-1].strip():
                 out.append("")
-            out.append("📝重点思路")
+            push("📝重点思路")
             i += 1
             continue
         if key == "findings":
             if out and out[-1].strip():
                 out.append("")
-            out.append("🔎分析总结")
+            push("🔎分析总结")
             i += 1
             continue
         if key == "opinion":
             if out and out[-1].strip():
                 out.append("")
-            out.append("💡个人观点")
+            push("💡个人观点")
             i += 1
             continue
 
-        if re.match(r"^(?:[-*•]|🔹|🔸)\s*", line) or re.match(r"^\d+[.)]\s*", line):
-            content = re.sub(r"^(?:[-*•]|🔹|🔸)\s*", "", line)
-            content = re.sub(r"^\d+[.)]\s*", "", content)
-            content = re.sub(r"\*\*(.*?)\*\*", r"\1", content).strip()
+        if _RE_BULLET.match(line) or _RE_NUMBERED.match(line):
+            content = _RE_BULLET.sub("", line)
+            content = _RE_NUMBERED.sub("", content)
+            content = _RE_BOLD.sub(r"\1", content).strip()
             if content:
-                out.append(f"🔸{content}")
+                push(f"🔸{content}")
             i += 1
             continue
 
-        out.append(line)
+        push(line)
         i += 1
-    return "\n".join(out).strip() + "\n"
+    # 等价于 "\n".join(out).strip() + "\n" 再按行切开：去掉首尾空白行，首行去左侧空白、末行去右侧空白
+    lo = 0
+    while lo < len(out) and not out[lo].strip():
+        lo += 1
+    if lo == len(out):
+        return ["\n"], None
+    hi = len(out) - 1
+    while not out[hi].strip():
+        hi -= 1
+    result = [f"{line}\n" for line in out[lo : hi + 1]]
+    result[0] = result[0].lstrip()
+    result[-1] = result[-1].rstrip() + "\n"
+    headline_idx = None
+    if title_at is not None:
+        for idx in range(title_at - 1, lo - 1, -1):
+            if out[idx].strip():
+                headline_idx = idx - lo
+                break
+    return result, headline_idx
 
 
-def rewrite_block(client: OpenAI, text: str, sys_prompt: str, limit_chars: int, max_retries: int = 3) -> str:
+def normalize_style(text: str) -> str:
+    return "".join(normalize_lines(text)[0])
+
+
+def normalize_and_space(text: str) -> str:
+    """等价于 ensure_section_spacing(normalize_style(text))，只走一遍。"""
+    return "".join(normalize_lines(text, space_sections=True)[0])
+
+
+async def rewrite_block(client: AsyncOpenAI, text: str, sys_prompt: str, limit_chars: int, max_retries: int = 3) -> str:
     content = text.strip()
-    if not content:
+    # 本地计数已在上限内时直接返回，不发请求
+    if not content or non_ws_len(content) <= limit_chars:
         return content
     for _ in range(max_retries):
         hard_limit = int(summary_limit_input_hard_limit)
         safety_margin = int(summary_limit_input_safety_margin)
         limit_total = hard_limit - safety_margin
-        sys_tokens = approx_input_tokens(sys_prompt)
+        sys_tokens = prompt_tokens(sys_prompt)
         user_budget = max(1, limit_total - sys_tokens)
         user_content = crop_to_input_tokens(content, user_budget)
         kwargs = {}
@@ -304,16 +575,7 @@ def rewrite_block(client: OpenAI, text: str, sys_prompt: str, limit_chars: int,
             kwargs["temperature"] = float(summary_limit_temperature)
         if summary_limit_max_tokens is not None:
             kwargs["max_tokens"] = int(summary_limit_max_tokens)
-        resp = client.chat.completions.create(
-            model=summary_limit_model,
-            messages=[
-                {"role": "system", "content": sys_prompt},
-                {"role": "user", "content": user_content},
-            ],
-            stream=False,
-            **kwargs,
-        )
-        new_text = resp.choices[0].message.content if resp.choices else ""
+        new_text = await cached_chat(client, sys_prompt, user_content, **kwargs)
         if not new_text:
             new_text = content
         content = new_text.strip()
@@ -322,7 +584,49 @@ def rewrite_block(client: OpenAI, text: str, sys_prompt: str, limit_chars: int,
     return content
 
 
-def compress_headline(client: OpenAI, text: str) -> str:
+def parse_json_object(text: str) -> Optional[dict]:
+    raw = text.strip()
+    if raw.startswith("```"):
+        raw = raw.strip("`").strip()
+        if raw.lower().startswith("json"):
+            raw = raw[4:]
+    try:
+        obj = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except ValueError:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+async def rewrite_blocks_batched(client: AsyncOpenAI, blocks: Dict[str, Tuple[str, int]]) -> Dict[str, str]:
+    """
+    一次请求同时压缩多个超长段落：输入 {段落名: {limit, text}} 的 JSON，要求按 JSON 返回。
+    各段沿用自己的精简提示词，拼进同一个系统提示词里；返回成功解析出的段落，解析失败返回空 dict，
+    由调用方逐段回退到 rewrite_block。
+    """
+    header = (summary_limit_prompt_batch_rewrite or "").strip()
+    if not header:
+        return {}
+    sys_prompt = header + "".join(f"\n\n【{key}】\n{SECTION_PROMPTS[key].strip()}" for key in blocks)
+    user_content = json.dumps({key: {"limit": limit, "text": text} for key, (text, limit) in blocks.items()}, ensure_ascii=False)
+    budget = int(summary_limit_input_hard_limit) - int(summary_limit_input_safety_margin) - prompt_tokens(sys_prompt)
+    if approx_input_tokens(user_content) > budget:
+        # 裁剪会破坏 JSON，超预算时直接逐段处理
+        return {}
+    kwargs: Dict[str, object] = {"response_format": {"type": "json_object"}}
+    if summary_limit_temperature is not None:
+        kwargs["temperature"] = float(summary_limit_temperature)
+    if summary_limit_max_tokens is not None:
+        kwargs["max_tokens"] = int(summary_limit_max_tokens)
+    try:
+        reply = await cached_chat(client, sys_prompt, user_content, **kwargs)
+    except BadRequestError:
+        # 服务端不支持 JSON 模式等情况
+        return {}
+    obj = parse_json_object(reply) or {}
+    return {key: value.strip() for key, value in obj.items() if key in blocks and isinstance(value, str) and value.strip()}
+
+
+async def compress_headline(client: AsyncOpenAI, text: str) -> str:
     sys_prompt = (summary_limit_prompt_headline or "").strip()
     content = text.strip()
     if not sys_prompt or not content:
@@ -330,46 +634,28 @@ def compress_headline(client: OpenAI, text: str) -> str:
     hard_limit = int(summary_limit_input_hard_limit)
     safety_margin = int(summary_limit_input_safety_margin)
     limit_total = hard_limit - safety_margin
-    sys_tokens = approx_input_tokens(sys_prompt)
+    sys_tokens = prompt_tokens(sys_prompt)
     user_budget = max(1, limit_total - sys_tokens)
     user_content = crop_to_input_tokens(content, user_budget)
-    resp = client.chat.completions.create(
-        model=summary_limit_model,
-        messages=[
-            {"role": "system", "content": sys_prompt},
-            {"role": "user", "content": user_content},
-        ],
-        stream=False,
-        max_tokens=summary_limit_max_tokens or 2048,
-        temperature=0,
-    )
-    new_text = resp.choices[0].message.content if resp.choices else ""
+    new_text = await cached_chat(client, sys_prompt, user_content, max_tokens=summary_limit_max_tokens or 2048, temperature=0)
     return new_text.strip() if new_text else text
 
 
-def apply_headline_limit(client: OpenAI, lines: List[str]) -> List[str]:
-    title_idx = None
-    for idx, line in enumerate(lines):
-        if line.strip().startswith("📖标题"):
-            title_idx = idx
-            break
-    if title_idx is None:
+async def apply_headline_limit(client: AsyncOpenAI, lines: List[str], headline_idx: Optional[int]) -> List[str]:
+    """headline_idx 为 📖标题 行上方最近的非空行（由 normalize_lines 给出），超长时交给模型压缩。"""
+    if headline_idx is None:
         return lines
-    for prev_idx in range(title_idx - 1, -1, -1):
-        candidate = lines[prev_idx].strip()
-        if not candidate:
-            continue
-        if non_ws_len(candidate) <= summary_limit_headline_limit:
-            return lines
-        lines[prev_idx] = compress_headline(client, candidate) + "\n"
+    candidate = lines[headline_idx].strip()
+    if non_ws_len(candidate) <= summary_limit_headline_limit:
         return lines
+    lines[headline_idx] = await compress_headline(client, candidate) + "\n"
     return lines
 
 
 def extract_arxiv_id(source: str) -> Optional[str]:
     if not source:
         return None
-    m = re.search(r"(\d{4}\.\d{4,5})(v\d+)?", source)
+    m = _RE_ARXIV_ID.search(source)
     if not m:
         return None
     version = m.group(2) or ""
@@ -380,10 +666,18 @@ def load_pdf_info_map(date_str: str) -> Dict[str, Dict[str, str]]:
     info_path = Path(DATA_ROOT) / "pdf_info" / f"{date_str}.json"
     if not info_path.exists():
         return {}
-    try:
-        data = json.loads(info_path.read_text(encoding="utf-8", errors="ignore"))
-    except json.JSONDecodeError:
-        return {}
+    data = None
+    if orjson is not None:
+        # 直接解析原始字节，省去先解码成 str；非法 UTF-8 等情况交给下面的宽松路径
+        try:
+            data = orjson.loads(info_path.read_bytes())
+        except orjson.JSONDecodeError:
+            data = None
+    if data is None:
+        try:
+            data = json.loads(info_path.read_text(encoding="utf-8", errors="ignore"))
+        except json.JSONDecodeError:
+            return {}
     if not isinstance(data, list):
         return {}
     out: Dict[str, Dict[str, str]] = {}
@@ -395,7 +689,27 @@ def load_pdf_info_map(date_str: str) -> Dict[str, Dict[str, str]]:
         if not arxiv_id:
             continue
         out[arxiv_id] = item
-    return out
+    # 额外登记去掉版本号的别名（不覆盖原本就不带版本号的条目），
+    # 无版本号的 md 文件名也能一次 get 命中带版本号的 pdf_info 记录
+    by_id: Dict[str, Dict[str, str]] = {}
+    for arxiv_id, item in out.items():
+        base = _RE_VERSION_SUFFIX.sub("", arxiv_id)
+        if base != arxiv_id:
+            by_id.setdefault(base, item)
+    by_id.update(out)
+    return by_id
+
+
+_TOP_META_PREFIXES = ("📖标题", "标题", "🌐来源", "来源")
+
+
+def _with_institution(first_line: str, instution: str) -> str:
+    """把首行改写为「机构：…」，原有的「笔记标题：」/「标题：」前缀去掉。"""
+    for label in ("笔记标题", "标题"):
+        if first_line.startswith(label):
+            rest = first_line[len(label):].lstrip("：:")
+            return f"{instution}：{rest}".rstrip()
+    return f"{instution}：{first_line}".rstrip()
 
 
 def inject_pdf_info(text: str, md_path: Path, pdf_info_map: Dict[str, Dict[str, str]]) -> str:
@@ -403,9 +717,9 @@ def inject_pdf_info(text: str, md_path: Path, pdf_info_map: Dict[str, Dict[str,
         return text
     key = md_path.stem
     info = pdf_info_map.get(key)
-    if info is None:
-        key_no_version = re.sub(r"v\d+$", "", key)
-        info = pdf_info_map.get(key_no_version)
+    if info is None and key[-1:].isdigit() and "v" in key:
+        # 带版本号的文件名没有精确命中时，回退到去掉版本号的键
+        info = pdf_info_map.get(_RE_VERSION_SUFFIX.sub("", key))
     if not info:
         return text
 
@@ -413,83 +727,96 @@ def inject_pdf_info(text: str, md_path: Path, pdf_info_map: Dict[str, Dict[str,
     source = str(info.get("source", "") or "").strip()
     instution = str(info.get("instution", "") or "").strip()
 
-    lines = text.splitlines()
-    first_idx = None
-    for idx, line in enumerate(lines):
-        if line.strip():
-            first_idx = idx
-            break
-    if first_idx is None:
-        first_idx = 0
-        lines.insert(0, "笔记标题：")
-
-    first_line = lines[first_idx].strip()
-    if instution:
-        if first_line.startswith("笔记标题"):
-            rest = first_line[len("笔记标题"):].lstrip("：:")
-            lines[first_idx] = f"{instution}：{rest}".rstrip()
-        elif first_line.startswith("标题"):
-            rest = first_line[len("标题"):].lstrip("：:")
-            lines[first_idx] = f"{instution}：{rest}".rstrip()
-        else:
-            lines[first_idx] = f"{instution}：{first_line}".rstrip()
-
-    # Remove existing title/source lines before the first section header
-    top_end = len(lines)
-    for idx, line in enumerate(lines):
-        if heading_key(line):
-            top_end = idx
-            break
-    filtered: List[str] = []
-    for idx, line in enumerate(lines):
-        if idx < top_end:
-            s = line.strip()
-            if s.startswith("📖标题") or s.startswith("标题") or s.startswith("🌐来源") or s.lower().startswith("source") or s.startswith("来源"):
-                continue
-        filtered.append(line)
-    lines = filtered
-
     insert_lines: List[str] = []
     if title:
         insert_lines.append(f"📖标题：{title}")
     if source:
         insert_lines.append(f"🌐来源：{source}")
 
-    if insert_lines:
-        insert_at = min(first_idx + 1, len(lines))
-        lines[insert_at:insert_at] = insert_lines
+    # 一遍扫描：首个非空行加机构前缀；首个段落标题之前的旧标题/来源行丢弃；
+    # 输出满 first_idx+1 行（即首行之后）时插入新的标题/来源行
+    out: List[str] = []
+    first_idx: Optional[int] = None
+    seen_heading = False
+    inserted = not insert_lines
+    for idx, line in enumerate(text.splitlines()):
+        if first_idx is None and line.strip():
+            first_idx = idx
+            if instution:
+                line = _with_institution(line.strip(), instution)
+        if not seen_heading:
+            if heading_key(line):
+                seen_heading = True
+            elif line.strip().startswith(_TOP_META_PREFIXES) or line.strip().lower().startswith("source"):
+                continue
+        out.append(line)
+        if not inserted and first_idx is not None and len(out) == first_idx + 1:
+            out.extend(insert_lines)
+            inserted = True
+    if not inserted:
+        out.extend(insert_lines)
+
+    return "\n".join(out).rstrip() + "\n"
 
-    return "\n".join(lines).rstrip() + "\n"
 
+_SECTION_ORDER = ["intro", "method", "findings", "opinion"]
 
-def structure_matches_example(client: OpenAI, text: str) -> bool:
-    sys_prompt = (summary_limit_prompt_structure_check or "").strip()
-    if not sys_prompt:
+
+def structure_locally_ok(prefix: List[str], sections: List[Tuple[str, str, List[str]]]) -> bool:
+    """
+    按结构校验提示词的规则在本地判断：开头是「机构：概括」行，随后有 📖标题 / 🌐来源 行，
+    四个段落标题齐全且顺序正确。能确认时返回 True，无法确认时返回 False 交给模型判断。
+    """
+    if [key for key, _, _ in sections] != _SECTION_ORDER:
+        return False
+    head = [line.strip() for line in prefix if line.strip()]
+    if len(head) < 3:
+        return False
+    first = head[0]
+    if first.startswith(("📖标题", "🌐来源")) or not (":" in first or "：" in first):
+        return False
+    return any(h.startswith("📖标题") for h in head[1:]) and any(h.startswith("🌐来源") for h in head[1:])
+
+
+def structure_known_ok(
+    text: str,
+    split: Optional[Tuple[List[str], List[Tuple[str, str, List[str]]]]] = None,
+) -> Optional[bool]:
+    """
+    不调模型能确定的结构校验结果；需要模型判断时返回 None。
+    调用方已对同一文本做过 split_sections 时传入 split，省掉一次逐行标题匹配。
+    """
+    if not (summary_limit_prompt_structure_check or "").strip():
         return True
     content = text.strip()
     if not content:
         return False
+    # 已规范化的摘要大多能在本地确认结构，省掉一次模型往返
+    if structure_locally_ok(*(split if split is not None else split_sections(content.splitlines()))):
+        return True
+    # 规则要求四个段落标题都在；任一标题文字根本没出现时答案必然是 NO，无需问模型
+    if any(plain not in content for _emoji, plain in SECTION_LABELS.values()):
+        return False
+    return None
+
+
+async def structure_matches_example(client: AsyncOpenAI, text: str, known: Optional[bool]) -> bool:
+    """known 为调用方已算出的 structure_known_ok 结果，为 None 时才问模型。"""
+    if known is not None:
+        return known
+    sys_prompt = (summary_limit_prompt_structure_check or "").strip()
+    content = text.strip()
     hard_limit = int(summary_limit_input_hard_limit)
     safety_margin = int(summary_limit_input_safety_margin)
     limit_total = hard_limit - safety_margin
-    sys_tokens = approx_input_tokens(sys_prompt)
+    sys_tokens = prompt_tokens(sys_prompt)
     user_budget = max(1, limit_total - sys_tokens)
     user_content = crop_to_input_tokens(content, user_budget)
-    resp = client.chat.completions.create(
-        model=summary_limit_model,
-        messages=[
-            {"role": "system", "content": sys_prompt},
-            {"role": "user", "content": user_content},
-        ],
-        stream=False,
-        max_tokens=8,
-        temperature=0,
-    )
-    reply = resp.choices[0].message.content.strip().upper() if resp.choices else ""
+    reply = (await cached_chat(client, sys_prompt, user_content, max_tokens=8, temperature=0)).strip().upper()
     return reply.startswith("YES")
 
 
-def restructure_to_example(client: OpenAI, text: str) -> str:
+async def restructure_to_example(client: AsyncOpenAI, text: str) -> str:
     sys_prompt = (summary_limit_prompt_structure_rewrite or "").strip()
     if not sys_prompt:
         return text
@@ -499,25 +826,51 @@ def restructure_to_example(client: OpenAI, text: str) -> str:
     hard_limit = int(summary_limit_input_hard_limit)
     safety_margin = int(summary_limit_input_safety_margin)
     limit_total = hard_limit - safety_margin
-    sys_tokens = approx_input_tokens(sys_prompt)
+    sys_tokens = prompt_tokens(sys_prompt)
     user_budget = max(1, limit_total - sys_tokens)
     user_content = crop_to_input_tokens(content, user_budget)
-    resp = client.chat.completions.create(
-        model=summary_limit_model,
-        messages=[
-            {"role": "system", "content": sys_prompt},
-            {"role": "user", "content": user_content},
-        ],
-        stream=False,
-        max_tokens=summary_limit_max_tokens or 2048,
-        temperature=0,
-    )
-    new_text = resp.choices[0].message.content if resp.choices else ""
+    new_text = await cached_chat(client, sys_prompt, user_content, max_tokens=summary_limit_max_tokens or 2048, temperature=0)
     return new_text.strip() if new_text else text
 
 
-def process_one(
-    client: OpenAI,
+async def shrink_sections(client: AsyncOpenAI, sections: List[Tuple[str, str, List[str]]]) -> Tuple[List[str], bool]:
+    """压缩超出字数上限的各节正文，返回 (各节正文, 是否有改写)。"""
+    blocks: List[str] = []
+    over: Dict[int, Tuple[str, int, str]] = {}
+    for idx, (key, _heading, content_lines) in enumerate(sections):
+        block_text = "".join(content_lines).strip()
+        blocks.append(block_text)
+        limit = SECTION_LIMITS.get(key, 0)
+        if limit and non_ws_len(block_text) > limit:
+            sys_prompt = SECTION_PROMPTS.get(key, "")
+            if sys_prompt:
+                over[idx] = (key, limit, sys_prompt)
+    # 多个段落超长且段落名不重复时先合并成一次请求，省掉重复的请求开销与共享上下文的预填充
+    batched: Dict[str, str] = {}
+    over_keys = [key for key, _, _ in over.values()]
+    if len(over_keys) >= 2 and len(set(over_keys)) == len(over_keys):
+        batched = await rewrite_blocks_batched(
+            client, {key: (blocks[idx], limit) for idx, (key, limit, _) in over.items()}
+        )
+    pending: Dict[int, Awaitable[str]] = {}
+    for idx, (key, limit, sys_prompt) in over.items():
+        first_try = batched.get(key)
+        if first_try is None:
+            pending[idx] = rewrite_block(client, blocks[idx], sys_prompt, limit_chars=limit)
+        elif non_ws_len(first_try) <= limit:
+            blocks[idx] = first_try
+        else:
+            # 合并请求已算作第一次尝试，仍超长的段落在其结果上继续单独改写
+            pending[idx] = rewrite_block(client, first_try, sys_prompt, limit_chars=limit, max_retries=2)
+    # 仍需单独改写的各节同时进行，单篇耗时从各节之和降为最慢的一节
+    if pending:
+        for idx, new_block in zip(pending, await asyncio.gather(*pending.values())):
+            blocks[idx] = new_block
+    return blocks, bool(over)
+
+
+async def process_one(
+    client: AsyncOpenAI,
     md_path: Path,
     out_path: Path,
     pdf_info_map: Dict[str, Dict[str, str]],
@@ -528,27 +881,42 @@ def process_one(
         return md_path, ""
     status = "copied"
     text = inject_pdf_info(text, md_path, pdf_info_map)
-    base_text = normalize_style(text)
-    lines = base_text.splitlines(keepends=True)
-    lines = apply_headline_limit(client, lines)
+    lines, headline_idx = normalize_lines(text)
     base_text = "".join(lines)
-    if structure_matches_example(client, base_text):
+    orig_prefix, orig_sections = split_sections(lines)
+    # 本地结构判断只算一次，快速路径与 structure_matches_example 共用
+    known = structure_known_ok(base_text, (orig_prefix, orig_sections))
+    shrunk: Optional[Tuple[List[str], bool]] = None
+    if (
+        orig_sections
+        and known
+        and (headline_idx is None or headline_idx < len(orig_prefix))
+    ):
+        # 结构已在本地确认、标题行又在首个段落之前：标题压缩与各节压缩互不依赖，全部同时发出
+        lines, shrunk = await asyncio.gather(
+            apply_headline_limit(client, list(lines), headline_idx),
+            shrink_sections(client, orig_sections),
+        )
+        structure_ok = True
+    else:
+        # 标题压缩与结构检查互不依赖（结构检查只看各节标题与顺序），两个请求同时发出
+        lines, structure_ok = await asyncio.gather(
+            apply_headline_limit(client, list(lines), headline_idx),
+            structure_matches_example(client, base_text, known),
+        )
+    base_text = "".join(lines)
+    if structure_ok:
         prefix, sections = split_sections(lines)
         if sections:
+            if shrunk is None or sections != orig_sections:
+                shrunk = await shrink_sections(client, sections)
+            blocks, rewritten_any = shrunk
             out_lines: List[str] = []
             out_lines.extend(prefix)
-            rewritten_any = False
-            for key, heading, content_lines in sections:
+            for (_key, heading, _content_lines), block_text in zip(sections, blocks):
                 if out_lines and out_lines[-1].strip():
                     out_lines.append("\n")
                 out_lines.append(heading)
-                block_text = "".join(content_lines).strip()
-                limit = SECTION_LIMITS.get(key, 0)
-                if limit and non_ws_len(block_text) > limit:
-                    sys_prompt = SECTION_PROMPTS.get(key, "")
-                    if sys_prompt:
-                        block_text = rewrite_block(client, block_text, sys_prompt, limit_chars=limit)
-                        rewritten_any = True
                 if block_text:
                     if not block_text.endswith("\n"):
                         block_text += "\n"
@@ -556,8 +924,8 @@ def process_one(
             out_text = ensure_section_spacing("".join(out_lines))
             status = "rewritten" if rewritten_any else "copied"
     else:
-        out_text = restructure_to_example(client, base_text)
-        out_text = ensure_section_spacing(normalize_style(out_text))
+        out_text = await restructure_to_example(client, base_text)
+        out_text = normalize_and_space(out_text)
         status = "rewritten"
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
@@ -565,12 +933,74 @@ def process_one(
     return md_path, status
 
 
+_PROGRESS_INTERVAL = 0.2
+
+
+async def process_all(
+    client: AsyncOpenAI,
+    to_run: List[Path],
+    single_dir: Path,
+    pdf_info_map: Dict[str, Dict[str, str]],
+    workers: int,
+    cache_dir: str = "",
+) -> Tuple[int, int]:
+    """
+    所有文件共用一个 AsyncOpenAI 客户端，Semaphore 限制同时在途的文件数；
+    每个在途请求只是一个协程，不再占用一个线程。返回 (copied, rewritten)。
+    """
+    global _RATE_LIMITER, _RESPONSE_CACHE_DIR
+    _RATE_LIMITER = RateLimiter(summary_limit_rpm, summary_limit_tpm)
+    _RESPONSE_CACHE_DIR = Path(cache_dir) if cache_dir else None
+    sem = asyncio.Semaphore(workers)
+
+    async def guarded(p: Path) -> Tuple[Path, str, Optional[BaseException]]:
+        async with sem:
+            try:
+                _, status = await process_one(client, p, single_dir / f"{p.stem}.md", pdf_info_map)
+                return p, status, None
+            except Exception as e:
+                return p, "", e
+
+    total = len(to_run)
+    start = time.monotonic()
+    last_print = 0.0
+    done = 0
+    empty = 0
+    copied = 0
+    rewritten = 0
+    try:
+        tasks = [asyncio.create_task(guarded(p)) for p in to_run]
+        for fut in asyncio.as_completed(tasks):
+            src, status, err = await fut
+            if err is not None:
+                print(f"\r[SUMMARY_LIMIT] error on {src.name}: {err!r}", end="", flush=True)
+            elif not status:
+                empty += 1
+            elif status == "copied":
+                copied += 1
+            elif status == "rewritten":
+                rewritten += 1
+            done += 1
+            now = time.monotonic()
+            # 进度行最多每 0.2s 刷新一次，最后一条必定输出
+            if now - last_print >= _PROGRESS_INTERVAL or done == total:
+                last_print = now
+                elapsed = now - start
+                rate = done / elapsed if elapsed > 0 else 0.0
+                sys.stdout.write(f"\r[SUMMARY_LIMIT] progress done={done}/{total} empty={empty} rate={rate:.2f}/s")
+                sys.stdout.flush()
+    finally:
+        await client.close()
+    return copied, rewritten
+
+
 def run() -> None:
     ap = argparse.ArgumentParser("summary_limit")
     ap.add_argument("--input-dir", default=str(Path(DATA_ROOT) / "paper_summary" / "single"))
     ap.add_argument("--out-root", default=str(Path(DATA_ROOT) / "summary_limit"))
     ap.add_argument("--date", default="")
     ap.add_argument("--concurrency", type=int, default=summary_limit_concurrency)
+    ap.add_argument("--cache-dir", default=str(summary_limit_cache_dir or ""), help="LLM 回复缓存目录，空字符串表示不缓存")
     args = ap.parse_args()
 
     in_root = Path(args.input_dir)
@@ -618,12 +1048,8 @@ def run() -> None:
 
     pdf_info_map = load_pdf_info_map(date_str)
 
-    to_run: List[Path] = []
-    for p in files:
-        out_path = single_dir / f"{p.stem}.md"
-        if out_path.exists():
-            continue
-        to_run.append(p)
+    existing = list_md_stems(single_dir)
+    to_run: List[Path] = [p for p in files if p.stem not in existing]
 
     total = len(to_run)
     if total == 0:
@@ -632,37 +1058,10 @@ def run() -> None:
         print(f"[SUMMARY_LIMIT] gather_path={gather_path}", flush=True)
         return
 
-    client = make_client()
     workers = max(1, int(args.concurrency or 0))
+    client = make_client(workers)
     print(f"[SUMMARY_LIMIT] input_dir={in_dir} total={total} concurrency={workers}", flush=True)
-
-    start = time.monotonic()
-    done = 0
-    empty = 0
-    copied = 0
-    rewritten = 0
-
-    with ThreadPoolExecutor(max_workers=workers) as ex:
-        future_map = {
-            ex.submit(process_one, client, p, single_dir / f"{p.stem}.md", pdf_info_map): p
-            for p in to_run
-        }
-        for fut in as_completed(future_map):
-            src = future_map[fut]
-            try:
-                _, status = fut.result()
-                if not status:
-                    empty += 1
-                elif status == "copied":
-                    copied += 1
-                elif status == "rewritten":
-                    rewritten += 1
-            except Exception as e:
-                print(f"\r[SUMMARY_LIMIT] error on {src.name}: {e!r}", end="", flush=True)
-            done += 1
-            elapsed = time.monotonic() - start
-            rate = done / elapsed if elapsed > 0 else 0.0
-            print(f"\r[SUMMARY_LIMIT] progress done={done}/{total} empty={empty} rate={rate:.2f}/s", end="", flush=True)
+    copied, rewritten = asyncio.run(process_all(client, to_run, single_dir, pdf_info_map, workers, args.cache_dir))
 
     print()
     gather_path = write_gather(single_dir, gather_dir, date_str)
@@ -1,4 +1,6 @@
+import importlib
 import os
+import stat
 import sys
 import subprocess
 from datetime import datetime
@@ -27,25 +29,39 @@ STEP_OUTPUT_PATHS = {
     # zotero_push has no local dated output; no entry so it is never skipped by output check
 }
 
+# step -> (module under Controller/, entry callable). Steps run in-process so the
+# interpreter and heavy imports (openai, httpx, ...) are paid once per pipeline.
 STEPS = {
-    "arxiv_search": [sys.executable, "-u", os.path.join(ROOT, "Controller", "arxiv_search04.py")],
-    "paperList_remove_duplications": [sys.executable, "-u", os.path.join(ROOT, "Controller", "paperList_remove_duplications.py")],
-    "llm_select_theme": [sys.executable, "-u", os.path.join(ROOT, "Controller", "llm_select_theme.py")],
-    "paper_theme_filter": [sys.executable, "-u", os.path.join(ROOT, "Controller", "paper_theme_filter.py")],
-    "pdf_download": [sys.executable, "-u", os.path.join(ROOT, "Controller", "pdf_download.py")],
-    "pdf_split": [sys.executable, "-u", os.path.join(ROOT, "Controller", "pdf_split.py")],
-    "pdfsplite_to_minerU": [sys.executable, "-u", os.path.join(ROOT, "Controller", "pdfsplite_to_minerU.py")],
-    "pdf_info": [sys.executable, "-u", os.path.join(ROOT, "Controller", "pdf_info.py")],
-    "instutions_filter": [sys.executable, "-u", os.path.join(ROOT, "Controller", "instutions_filter.py")],
-    "selectpaper": [sys.executable, "-u", os.path.join(ROOT, "Controller", "selectpaper.py")],
-    "selectedpaper_to_mineru": [sys.executable, "-u", os.path.join(ROOT, "Controller", "selectedpaper_to_mineru.py")],
-    "paper_summary": [sys.executable, "-u", os.path.join(ROOT, "Controller", "paper_summary.py")],
-    "summary_limit": [sys.executable, "-u", os.path.join(ROOT, "Controller", "summary_limit.py")],
-    "select_image": [sys.executable, "-u", os.path.join(ROOT, "Controller", "select_image.py")],
-    "file_collect": [sys.executable, "-u", os.path.join(ROOT, "Controller", "file_collect.py")],
-    "zotero_push": [sys.executable, "-u", os.path.join(ROOT, "Controller", "zotero_push.py")],
+    "arxiv_search": ("arxiv_search04", "run"),
+    "paperList_remove_duplications": ("paperList_remove_duplications", "run"),
+    "llm_select_theme": ("llm_select_theme", "run"),
+    "paper_theme_filter": ("paper_theme_filter", "run"),
+    "pdf_download": ("pdf_download", "run"),
+    "pdf_split": ("pdf_split", "run"),
+    "pdfsplite_to_minerU": ("pdfsplite_to_minerU", "run"),
+    "pdf_info": ("pdf_info", "main"),
+    "instutions_filter": ("instutions_filter", "main"),
+    "selectpaper": ("selectpaper", "main"),
+    "selectedpaper_to_mineru": ("selectedpaper_to_mineru", "run"),
+    "paper_summary": ("paper_summary", "run"),
+    "summary_limit": ("summary_limit", "run"),
+    "select_image": ("select_image", "run"),
+    "file_collect": ("file_collect", "run"),
+    "zotero_push": ("zotero_push", "main"),
 }
 
+# Steps whose entry always ends with sys.exit / SystemExit(code) keep running in a
+# child interpreter, so their exit code is handled exactly as before.
+SUBPROCESS_STEPS = {"zotero_push"}
+
+# Steps started in a child process and left running while the pipeline moves on;
+# value = the step that reads their output and waits for them first. select_image
+# (PDF rendering + figure packing, CPU/disk bound) only needs selectedpaper_to_mineru,
+# so it overlaps paper_summary / summary_limit, which mostly wait on the LLM API.
+BACKGROUND_STEPS = {"select_image": "file_collect"}
+# Seconds a background child gets to exit after SIGTERM when a foreground step fails.
+BACKGROUND_TERMINATE_TIMEOUT = 10
+
 
 PIPELINES = {
     "default": [
@@ -60,9 +76,9 @@ PIPELINES = {
         "instutions_filter",
         "selectpaper",
         "selectedpaper_to_mineru",
+        "select_image",
         "paper_summary",
         "summary_limit",
-        "select_image",
         "file_collect",
         "zotero_push",
     ],
@@ -78,9 +94,9 @@ PIPELINES = {
         "instutions_filter",
         "selectpaper",
         "selectedpaper_to_mineru",
+        "select_image",
         "paper_summary",
         "summary_limit",
-        "select_image",
         "file_collect",
         "zotero_push",
     ],
@@ -91,19 +107,70 @@ def step_output_exists(step: str, date_str: str) -> bool:
     if step not in STEP_OUTPUT_PATHS:
         return False
     path = STEP_OUTPUT_PATHS[step](date_str)
-    if os.path.isfile(path):
-        return True
-    if os.path.isdir(path):
-        return True
-    return False
+    # One stat instead of isfile + isdir (each of which stats again).
+    try:
+        mode = os.stat(path).st_mode
+    except (OSError, ValueError):
+        return False
+    return stat.S_ISREG(mode) or stat.S_ISDIR(mode)
 
 
 def run_step(name, extra_args=None, env=None):
     if name not in STEPS:
         raise SystemExit(f"Unknown step: {name}")
-    cmd = STEPS[name] + (extra_args or [])
-    r = subprocess.run(cmd, check=True, env=env)
-    return r.returncode
+    module, func = STEPS[name]
+    extra_args = list(extra_args or [])
+    if name in SUBPROCESS_STEPS:
+        cmd = [sys.executable, "-u", os.path.join(ROOT, "Controller", f"{module}.py")] + extra_args
+        r = subprocess.run(cmd, check=True, env=env)
+        return r.returncode
+
+    if env is not None:
+        os.environ.update(env)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    entry = getattr(importlib.import_module(f"Controller.{module}"), func)
+    # Steps parse their own CLI via argparse, so hand them argv as the child process saw it.
+    saved_argv = sys.argv
+    sys.argv = [os.path.join(ROOT, "Controller", f"{module}.py")] + extra_args
+    try:
+        entry()
+    except SystemExit as e:
+        # Same outcome as a failing child: exit 0 is success, anything else stops the pipeline.
+        if e.code in (None, 0):
+            return 0
+        if not isinstance(e.code, int):
+            print(e.code, file=sys.stderr, flush=True)
+        raise subprocess.CalledProcessError(e.code if isinstance(e.code, int) else 1, sys.argv) from e
+    finally:
+        sys.argv = saved_argv
+        sys.stdout.flush()
+    return 0
+
+
+def start_step(name, extra_args=None, env=None):
+    module, _ = STEPS[name]
+    cmd = [sys.executable, "-u", os.path.join(ROOT, "Controller", f"{module}.py")] + list(extra_args or [])
+    return subprocess.Popen(cmd, env=env)
+
+
+def wait_background(procs):
+    for name, proc in procs:
+        code = proc.wait()
+        print(f"DONE background step: {name} (exit {code})", flush=True)
+        if code != 0:
+            raise subprocess.CalledProcessError(code, proc.args)
+
+
+def stop_background(proc):
+    if proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=BACKGROUND_TERMINATE_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
 
 
 def detect_selected_count():
@@ -151,21 +218,39 @@ def main(argv=None):
     if not steps:
         raise SystemExit(f"Unknown pipeline: {pipeline}")
     print(f"START pipeline '{pipeline}' with {len(steps)} step(s) RUN_DATE={run_date}", flush=True)
-    for i, step in enumerate(steps):
-        if i == 0:
-            step_args = extra
-        else:
-            step_args = []
-        if step_output_exists(step, run_date):
-            print(f"SKIP step: {step} (output exists for {run_date})", flush=True)
-            continue
-        print(f"RUN step: {step}", flush=True)
-        run_step(step, step_args, env=env)
-        if step == "arxiv_search":
-            selected = detect_selected_count()
-            if selected == 0:
-                print("[PIPELINE] No papers selected in current window; stop after arxiv_search.", flush=True)
-                return
+    # join step -> [(name, Popen)] of background steps it has to wait for
+    background = {}
+    try:
+        for i, step in enumerate(steps):
+            wait_background(background.pop(step, []))
+            if i == 0:
+                step_args = extra
+            else:
+                step_args = []
+            if step_output_exists(step, run_date):
+                print(f"SKIP step: {step} (output exists for {run_date})", flush=True)
+                continue
+            if step in BACKGROUND_STEPS:
+                print(f"START background step: {step}", flush=True)
+                proc = start_step(step, step_args, env=env)
+                background.setdefault(BACKGROUND_STEPS[step], []).append((step, proc))
+                continue
+            print(f"RUN step: {step}", flush=True)
+            run_step(step, step_args, env=env)
+            if step == "arxiv_search":
+                selected = detect_selected_count()
+                if selected == 0:
+                    print("[PIPELINE] No papers selected in current window; stop after arxiv_search.", flush=True)
+                    return
+        for join_step in list(background):
+            wait_background(background.pop(join_step))
+    finally:
+        # Only left non-empty when a foreground step failed: stop the children
+        # instead of waiting minutes for work nobody will collect, but never
+        # leave an orphaned process behind.
+        for procs in background.values():
+            for _, proc in procs:
+                stop_background(proc)
 
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@
 - 部分参数可被命令行覆盖（如 --page-size 等）
 """
 
-import os
+from pathlib import Path
 
 """
 ========================
@@ -22,35 +22,42 @@ SEARCH_CATEGORIES = ["cs.CL", "cs.LG", "cs.AI", "stat.ML"]
 # [Controller/arxiv_search.py] 请求 User-Agent
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0 Safari/537.36"
 
-# [全局] 数据根目录
-DATA_ROOT = "data"
+# [全局] 数据根目录；下方各目录均为预先拼好的 pathlib.Path，调用方直接用 `/` 拼文件名
+DATA_ROOT = Path("data")
 
 # [Controller/arxiv_search.py] 输出文件目录与文件名格式
-OUTPUT_DIR = os.path.join(DATA_ROOT, "arxivList", "md")
-ARXIV_JSON_DIR = os.path.join(DATA_ROOT, "arxivList", "json")
+OUTPUT_DIR = DATA_ROOT / "arxivList" / "md"
+ARXIV_JSON_DIR = DATA_ROOT / "arxivList" / "json"
 FILENAME_FMT = "%Y-%m-%d.md"
 JSON_FILENAME_FMT = "%Y-%m-%d.json"
 MANIFEST_FILENAME = "_manifest.json"
 
 # [Controller/llm_select_theme.py] 主题相关性筛选输出目录
-LLM_SELECT_THEME_DIR = os.path.join(DATA_ROOT, "llm_select_theme")
+LLM_SELECT_THEME_DIR = DATA_ROOT / "llm_select_theme"
 
 # [Controller/paper_theme_filter.py] 主题过滤输出目录
-PAPER_THEME_FILTER_DIR = os.path.join(DATA_ROOT, "paper_theme_filter")
+PAPER_THEME_FILTER_DIR = DATA_ROOT / "paper_theme_filter"
 
 # [Controller/paperList_remove_duplications.py] 去重输出目录
-PAPER_DEDUP_DIR = os.path.join(DATA_ROOT, "paperList_remove_duplications")
+PAPER_DEDUP_DIR = DATA_ROOT / "paperList_remove_duplications"
+# [Controller/paperList_remove_duplications.py] 已处理论文集合（SQLite，主键 (source, title)）；
+# 首次运行时自动导入旧的 config/paperList.json
+DEDUP_DB = DATA_ROOT / "dedup.sqlite"
 
 # [Controller/pdf_download.py] PDF 下载与预览目录
-PDF_OUTPUT_DIR = os.path.join(DATA_ROOT, "raw_pdf")
-PDF_PREVIEW_DIR = os.path.join(DATA_ROOT, "preview_pdf")
+PDF_OUTPUT_DIR = DATA_ROOT / "raw_pdf"
+PDF_PREVIEW_DIR = DATA_ROOT / "preview_pdf"
 
 # [Controller/pdfsplite_to_minerU.py] PDF 预处理/拆分输出目录
-PREVIEW_MINERU_DIR = os.path.join(DATA_ROOT, "preview_pdf_to_mineru")
-SELECTED_MINERU_DIR = os.path.join(DATA_ROOT, "selectedpaper_to_mineru")
+PREVIEW_MINERU_DIR = DATA_ROOT / "preview_pdf_to_mineru"
+SELECTED_MINERU_DIR = DATA_ROOT / "selectedpaper_to_mineru"
+
+# [Controller/select_image.py] 并行处理论文的进程数，默认 1（串行）。app.py 会让该步骤在后台与摘要步骤同时运行，
+# 每个进程还各自打开 PDF、可能启动浏览器，按机器余量显式调大；0 表示 min(4, CPU 核数)
+select_image_workers = 1
 
 # [Controller/file_collect.py] 文件收集输出目录
-FILE_COLLECT_DIR = os.path.join(DATA_ROOT, "file_collect")
+FILE_COLLECT_DIR = DATA_ROOT / "file_collect"
 
 # [Controller/arxiv_search.py] 分页与筛选参数
 PAGE_SIZE_DEFAULT = 200
@@ -86,6 +93,12 @@ qwen_api_key = ""
 # [全局] NVIDIA API Key（请从环境变量 NVIDIA_API_KEY 读取，或在本地未提交文件中配置）
 nvidia_api_key = ""
 
+# [Controller/llm_rate_limit.py] DashScope 账号级限速（每分钟请求数 / 每分钟 token 数，0 表示不限），
+# 主题评分、机构识别、摘要生成发请求前先占额度，而不是撞 429 后再退避重试
+dashscope_rpm_limit = 1200
+dashscope_tpm_limit = 1000000
+# [Controller/llm_http.py] DashScope 客户端启用 HTTP/2 多路复用（需安装 h2，见 requirements-perf.txt；未安装时自动用 HTTP/1.1）
+dashscope_http2 = True
 
 # [Controller/llm_select_theme.py] 主题相关性评分模型
 theme_select_base_url = "https://dashscope.aliyuncs.com/compatible-mode/v1"
@@ -93,6 +106,8 @@ theme_select_model = "qwen-plus"
 theme_select_max_tokens = 16
 theme_select_temperature = 1.0
 theme_select_concurrency = 8
+# [Controller/llm_select_theme.py] 每个请求打包评分的论文篇数（共用一次系统提示词预填充），1 表示逐篇请求
+theme_select_batch_size = 16
 
 # [Controller/pdf_info.py] 机构判别模型参数
 org_base_url = "https://dashscope.aliyuncs.com/compatible-mode/v1"
@@ -100,17 +115,25 @@ org_model = "qwen-plus"
 org_max_tokens = 2048
 org_temperature = 1.0
 pdf_info_concurrency = 8
+# [Controller/pdf_info.py] 给系统提示词打 cache_control 显式缓存标记：各篇请求共用同一段前缀，
+# 命中后这段预填充按缓存价计费、首 token 更快；服务端不支持时改为 False，退回普通字符串消息
+pdf_info_prompt_cache = True
+# [Controller/pdf_info.py] 回复缓存（SQLite）：键为 (预览页文本, 系统提示词, 模型与参数) 的哈希，
+# 重跑时内容不变的论文直接复用上次结果、不再请求模型；删除该文件即清空缓存
+PDF_INFO_CACHE = DATA_ROOT / "cache" / "pdf_info.sqlite"
 
 # [Controller/paper_summary.py] 摘要生成模型参数
 summary_base_url = "https://dashscope.aliyuncs.com/compatible-mode/v1"
-# summary_model = "qwen2.5-72b-instruct"
 summary_model = "qwen-plus"
 summary_max_tokens = 2048
 summary_temperature = 1.0
 # [Controller/paper_summary.py] 摘要输入长度控制（模型上下文窗口硬上限与安全边距）
 # 总输入预算 = summary_input_hard_limit - summary_input_safety_margin
-# 用户内容裁剪预算 = 总输入预算 - 系统提示词近似长度（按 UTF-8 字节近似 token）
+# 用户内容裁剪预算 = 总输入预算 - 系统提示词 token 数
 # 最终传入 ≈ 系统提示词 + 裁剪后的用户内容 ≤ 总输入预算
+# [Controller/paper_summary.py] [Controller/summary_limit.py] 计数用的 tiktoken 编码名；
+# 未安装 tiktoken 或编码表加载失败时退回按 UTF-8 字节近似 token（中文约多算 3 倍，裁剪偏多）
+summary_tokenizer_name = "cl100k_base"
 summary_input_hard_limit = 129024
 summary_input_safety_margin = 4096
 summary_concurrency = 16
@@ -122,11 +145,23 @@ summary_concurrency = 16
 summary_base_url_2 = "https://gptgod.cloud/v1"
 summary_gptgod_apikey = ""  # 请从环境变量 SUMMARY_GPTGOD_APIKEY 读取
 summary_model_2 = "claude-sonnet-4-5-all"
+# [Controller/paper_summary_claude.py] 系统提示词加 cache_control 显式缓存标记（同 pdf_info_prompt_cache）
+summary_claude_prompt_cache = True
 
 # [Controller/paper_summary.py] 摘要生成模型3（VectorEngine）
 summary_base_url_3 = "https://api.vectorengine.ai/v1"
 summary_apikey_3 = ""  # 请从环境变量 SUMMARY_APIKEY_3 读取
 summary_model_3 = "claude-opus-4-5-20251101"
+# [Controller/paper_summary.py] 实时摘要以流式（stream=True）接收；在途请求是否已开始输出 token 可见，
+# 对冲据此区分“慢但在生成”和“卡住”，长输出也不会因整段读超时失败
+summary_stream = True
+# [Controller/paper_summary.py] 实时摘要对冲：qwen 主请求发出 summary_hedge_delay_ms 仍未返回
+# （流式时为：仍未输出任何 token）时，依次向列表中其余服务商（claude=summary_base_url_2，
+# vectorengine=summary_base_url_3）补发同一请求，取最先返回的非空结果并取消其余请求；
+# 只作用于实时接口（不含 Batch API），未填 key 的服务商跳过，列表只剩 qwen 即关闭。
+# 非流式时延迟宜设在正常摘要耗时的长尾处，过小会让几乎每篇都双发、费用翻倍
+summary_hedge_providers = ["qwen", "claude"]
+summary_hedge_delay_ms = 20000
 
 # [Controller/summary_limit.py] 摘要精简模型参数
 summary_limit_base_url = "https://dashscope.aliyuncs.com/compatible-mode/v1"
@@ -134,6 +169,12 @@ summary_limit_model = "qwen-plus"
 summary_limit_max_tokens = 2048
 summary_limit_temperature = 1.0
 summary_limit_concurrency = 8
+# [Controller/summary_limit.py] 摘要精简请求限速（每分钟请求数 / 每分钟 token 数，0 表示不限）
+# token 按输入 token 数（同 summary_tokenizer_name 计数）+ max_tokens 预估，偏保守
+summary_limit_rpm = 600
+summary_limit_tpm = 5000000
+# [Controller/summary_limit.py] LLM 回复磁盘缓存目录（按提示词+内容哈希命中，重复运行不再请求），留空关闭
+summary_limit_cache_dir = DATA_ROOT / "summary_limit" / "cache"
 # [Controller/summary_limit.py] 摘要精简输入长度控制（模型上下文窗口硬上限与安全边距）
 # 总输入预算 = summary_limit_input_hard_limit - summary_limit_input_safety_margin
 summary_limit_input_hard_limit = 129024
@@ -157,8 +198,16 @@ summary_batch_model = "qwen-plus"
 summary_batch_temperature = 0.5
 summary_batch_completion_window = "24h"
 summary_batch_endpoint = "/v1/chat/completions"
-summary_batch_out_root = os.path.join(DATA_ROOT, "paper_summary_batch")
-summary_batch_jsonl_root = os.path.join(DATA_ROOT, "selectpaper_to_jsonl")
+summary_batch_out_root = DATA_ROOT / "paper_summary_batch"
+summary_batch_jsonl_root = DATA_ROOT / "selectpaper_to_jsonl"
+# [Controller/paper_summary.py] 待摘要篇数达到 summary_batch_min_items 时改走 Batch API（半价、不占实时 RPM/TPM），
+# 批量任务失败/过期或个别请求出错时，剩余论文回退到实时接口
+summary_prefer_batch = True
+summary_batch_min_items = 50
+summary_batch_poll_sec = 30
+# [Controller/paper_summary.py] 批量任务最长等待秒数（Batch API 完成窗口为 24h，流水线不能等这么久）：
+# 超时后取消该任务，已出结果的照常落盘，其余论文回退实时接口；0 表示一直等到任务结束
+summary_batch_max_wait_sec = 1800
 
 
 
@@ -170,14 +219,21 @@ summary_batch_jsonl_root = os.path.join(DATA_ROOT, "selectpaper_to_jsonl")
 """
 
 # [Controller/llm_select_theme.py] 主题相关性评分系统提示词
-theme_select_system_prompt = (
+# [Controller/llm_select_theme.py] 主题评分标准（逐篇与批量两种系统提示词共用）
+theme_select_criteria = (
     "你是论文主题相关性评分助手。"
     "请判断给定论文是否与以下主题相关："
     "大模型/LLM、算法与训练/推理、多模态、Agent/智能体、强化学习、SFT、GRPO、DPO、DAPO、SAPO等偏好优化、推理解码、模型评测，"
     "LangChain/LangGraph，工具调用/工具调度，上下文与记忆管理等相关变体。"
     "只根据给定的标题和摘要，输出主题相关性分数。"
     "分数范围 0 到 1，越相关越接近 1。"
-    "只输出一个数字，不要输出其他内容。"
+)
+theme_select_system_prompt = theme_select_criteria + "只输出一个数字，不要输出其他内容。"
+
+# [Controller/llm_select_theme.py] 批量评分系统提示词（独立的输出约定，不含“只输出一个数字”）
+theme_select_batch_system_prompt = theme_select_criteria + (
+    "用户会给出一个 JSON 对象，键为论文编号，值包含 title（标题）与 abstract（摘要）。"
+    "请对每篇论文分别评分，只输出一个 JSON 对象，键与输入完全相同，值为 0 到 1 的分数，不要输出其他内容。"
 )
 
 # [Controller/paper_summary.py] 摘要生成示例
@@ -273,6 +329,14 @@ summary_limit_prompt_structure_check = (
     "只输出 YES 或 NO，不要输出其他内容。"
 )
 
+# [Controller/summary_limit.py] 多段落合并精简提示词（各段落自己的精简规则会附在其后）
+summary_limit_prompt_batch_rewrite = (
+    "你是一名严谨的学术论文摘要编辑。用户会给出一个 JSON 对象，键为段落名（intro/method/findings/opinion），"
+    "值包含 text（该段原文）与 limit（去空白字符后的字数上限）。\n"
+    "请按下面对应段落各自的规则分别压缩每个段落，段落之间互不混用内容。\n"
+    "只输出一个 JSON 对象，键与输入完全相同，值为压缩后的正文字符串，不要输出其他内容。"
+)
+
 # [Controller/summary_limit.py] 摘要结构重排提示词
 summary_limit_prompt_structure_rewrite = (
     "你是一名摘要结构整理器。你的任务是把用户提供的文本整理为示例的结构与顺序，且不改内容。\n"